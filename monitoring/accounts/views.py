@@ -1,6 +1,7 @@
 # accounts/views.py
 import requests
 from django.conf import settings
+from monitoring import cloud
 from rest_framework.views import APIView
 from rest_framework import status
 from django.contrib.auth import get_user_model
@@ -61,7 +62,7 @@ class RegisterView(APIView):
             cloud_api_url = settings.CLOUD_API_LOGIN_URL  # e.g. "https://cloud.example.com/api/network-admin/login/"
 
             try:
-                cloud_response = requests.post(cloud_api_url, json=cloud_payload, timeout=5)
+                cloud_response = cloud.post(cloud_api_url, json=cloud_payload)
 
             except requests.RequestException as exc:
                 return Response(
@@ -23,8 +23,28 @@ app.conf.beat_schedule = {
         'task': 'network.tasks.ping_hosts',
         'schedule': 60.0,
     },
+    'probe-tick-every-5-seconds': {
+        'task': 'network.tasks.probe_tick',
+        'schedule': 5.0,
+    },
 'submit-ping-data-every-5-minutes': {
         'task': 'network.tasks.submit_ping_data',
         'schedule': crontab(minute='*/5'),
     },
+    'drain-upload-spool-every-minute': {
+        'task': 'network.tasks.drain_upload_spool',
+        'schedule': 60.0,
+    },
+    'replicate-cloud-sync-every-minute': {
+        'task': 'network.tasks.replicate_cloud_sync',
+        'schedule': 60.0,
+    },
+    'update-uptime-rollups-every-minute': {
+        'task': 'network.tasks.update_uptime_rollups',
+        'schedule': 60.0,
+    },
+    'enforce-ping-retention-daily': {
+        'task': 'network.tasks.enforce_ping_retention',
+        'schedule': crontab(hour=3, minute=0),
+    },
 }
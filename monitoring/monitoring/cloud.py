@@ -0,0 +1,71 @@
+"""
+Shared HTTP client for the cloud API.
+
+Each process keeps one pooled keep-alive requests.Session, so calls to
+CLOUD_API_URL reuse TCP/TLS connections instead of opening a new one per
+request. Pool size, default timeout and retry policy come from settings.
+"""
+import os
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    retry = Retry(
+        total=settings.CLOUD_HTTP_RETRIES,
+        backoff_factor=settings.CLOUD_HTTP_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        # POST is not idempotent: it is only retried when the connection
+        # could not be established, never after the request was sent.
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.CLOUD_HTTP_POOL_SIZE,
+        pool_maxsize=settings.CLOUD_HTTP_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Return this process's pooled session. A new one is built after a fork
+    (e.g. Celery prefork workers) so sockets are never shared between processes.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault("timeout", settings.CLOUD_HTTP_TIMEOUT)
+    return get_session().request(method, url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("post", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("put", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("delete", url, **kwargs)
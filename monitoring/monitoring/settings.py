@@ -168,6 +168,147 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CELERY_BROKER_URL=env("CELERY_BROKER_URL")
 
+# Redis cache (cloud tokens, sweep state); separate DB from the Celery broker
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': env("CACHE_URL", default="redis://redis:6379/1"),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            # Degrade to cache misses instead of failing requests if Redis is down
+            'IGNORE_EXCEPTIONS': True,
+        },
+    }
+}
+
+# Cloud API tokens are cached per user for CLOUD_TOKEN_TTL seconds (or the login's
+# expires_in, if shorter), minus a safety margin
+CLOUD_TOKEN_TTL = env.int("CLOUD_TOKEN_TTL", default=3600)
+CLOUD_TOKEN_EXPIRY_MARGIN = env.int("CLOUD_TOKEN_EXPIRY_MARGIN", default=60)
+
+# Pooled HTTP session used for all cloud API calls (monitoring/cloud.py)
+CLOUD_HTTP_POOL_SIZE = env.int("CLOUD_HTTP_POOL_SIZE", default=10)  # keep-alive connections per host
+CLOUD_HTTP_TIMEOUT = env.float("CLOUD_HTTP_TIMEOUT", default=5.0)  # seconds, default for every call
+CLOUD_INGEST_TIMEOUT = env.float("CLOUD_INGEST_TIMEOUT", default=10.0)  # seconds, ping data uploads
+CLOUD_HTTP_RETRIES = env.int("CLOUD_HTTP_RETRIES", default=2)
+CLOUD_HTTP_RETRY_BACKOFF = env.float("CLOUD_HTTP_RETRY_BACKOFF", default=0.5)
+
+# Cursor-based ping export to the cloud ingest endpoint
+CLOUD_EXPORT_BATCH_SIZE = env.int("CLOUD_EXPORT_BATCH_SIZE", default=5000)  # pings per ingest request
+CLOUD_EXPORT_MAX_BATCHES = env.int("CLOUD_EXPORT_MAX_BATCHES", default=20)  # batches per task run before requeueing
+CLOUD_EXPORT_SETTLE_SECONDS = env.int("CLOUD_EXPORT_SETTLE_SECONDS", default=30)  # skip pings younger than this
+# How far a ping committed after the cursor can lag behind the cursor's timestamp; the export and
+# rollup cursors only scan pings from their last timestamp minus this, so old chunks are skipped
+CURSOR_TIMESTAMP_MARGIN_SECONDS = env.int("CURSOR_TIMESTAMP_MARGIN_SECONDS", default=3600)
+CLOUD_INGEST_FORMAT = env("CLOUD_INGEST_FORMAT", default="json")  # "json" or "compact" (network/encoding.py)
+CLOUD_INGEST_COMPRESSION = env("CLOUD_INGEST_COMPRESSION", default="none")  # "none", "gzip" or "zstd"
+CLOUD_INGEST_GZIP_LEVEL = env.int("CLOUD_INGEST_GZIP_LEVEL", default=6)
+CLOUD_INGEST_ZSTD_LEVEL = env.int("CLOUD_INGEST_ZSTD_LEVEL", default=3)
+
+# Durable upload spool: undelivered batches per network, delivery rate and retry backoff (seconds)
+SPOOL_MAX_PENDING_BATCHES = env.int("SPOOL_MAX_PENDING_BATCHES", default=1000)
+SPOOL_DRAIN_MAX_BATCHES = env.int("SPOOL_DRAIN_MAX_BATCHES", default=10)  # per network per drain run
+SPOOL_RETRY_BACKOFF = env.int("SPOOL_RETRY_BACKOFF", default=30)
+SPOOL_RETRY_BACKOFF_MAX = env.int("SPOOL_RETRY_BACKOFF_MAX", default=3600)
+# Seconds an outbox row is claimed by the worker sending it (network/outbox.py); keep it above the
+# longest a cloud call can take, HTTP retries included
+OUTBOX_LEASE_SECONDS = env.int("OUTBOX_LEASE_SECONDS", default=120)
+
+# Ping sweep (fping) settings
+PING_SWEEP_CHUNK_SIZE = env.int("PING_SWEEP_CHUNK_SIZE", default=1024)  # targets per fping process
+PING_SWEEP_WORKERS = env.int("PING_SWEEP_WORKERS", default=4)  # fping processes run concurrently
+PING_SWEEP_RETRIES = env.int("PING_SWEEP_RETRIES", default=1)
+PING_SWEEP_TIMEOUT_MS = env.int("PING_SWEEP_TIMEOUT_MS", default=500)  # initial per-target timeout
+PING_SWEEP_INTERVAL_MS = env.int("PING_SWEEP_INTERVAL_MS", default=1)  # gap between packets to different targets
+PING_SWEEP_CHUNK_TIMEOUT = env.int("PING_SWEEP_CHUNK_TIMEOUT", default=50)  # seconds before an fping process is killed
+
+# Sweep sharding: ping_hosts fans each sweep out to this many ping_shard tasks (hosts split by id),
+# each holding a lock for at most PING_SHARD_LOCK_TIMEOUT seconds; sweep records are kept PING_SWEEP_HISTORY_DAYS
+PING_SWEEP_SHARDS = env.int("PING_SWEEP_SHARDS", default=4)
+PING_SHARD_LOCK_TIMEOUT = env.int("PING_SHARD_LOCK_TIMEOUT", default=300)
+PING_SHARD_EXPIRES = env.int("PING_SHARD_EXPIRES", default=55)  # seconds a queued shard task stays valid
+PING_SWEEP_HISTORY_DAYS = env.int("PING_SWEEP_HISTORY_DAYS", default=7)
+
+# Probe scheduling: "fixed" sweeps every host each minute (ping_hosts); "adaptive" gives each host
+# its own next-due time in Redis and probes only due hosts every PROBE_TICK_SECONDS (probe_tick)
+PING_SCHEDULER = env("PING_SCHEDULER", default="fixed")
+PROBE_INTERVAL = env.int("PROBE_INTERVAL", default=60)  # seconds, for device types not listed below
+PROBE_DEVICE_INTERVALS = env.dict(
+    "PROBE_DEVICE_INTERVALS", cast={"value": int}, default={"firewall": 15, "dns_server": 15},
+)
+PROBE_BACKOFF_AFTER = env.int("PROBE_BACKOFF_AFTER", default=10)  # unchanged results before an up host's interval doubles
+PROBE_MAX_INTERVAL = env.int("PROBE_MAX_INTERVAL", default=300)  # keep below PING_STATE_VALID_SECONDS
+PROBE_CONFIRMATIONS = env.int("PROBE_CONFIRMATIONS", default=2)  # extra probes before an up host is recorded down
+PROBE_CONFIRM_INTERVAL = env.int("PROBE_CONFIRM_INTERVAL", default=5)
+PROBE_TICK_SECONDS = 5  # matches the probe-tick beat schedule
+PROBE_TICK_BATCH = env.int("PROBE_TICK_BATCH", default=500)  # hosts per probe_hosts task
+PROBE_TICK_MAX_HOSTS = env.int("PROBE_TICK_MAX_HOSTS", default=20000)  # hosts dispatched per tick
+PROBE_LEASE_SECONDS = env.int("PROBE_LEASE_SECONDS", default=120)  # before a dispatched but lost host is due again
+PROBE_SCHEDULE_SYNC_SECONDS = env.int("PROBE_SCHEDULE_SYNC_SECONDS", default=60)
+
+# Probe backend used by ping_hosts: "fping" (subprocess sweep) or "async" (in-process ICMP/TCP)
+PROBE_BACKEND = env("PROBE_BACKEND", default="fping")
+PROBE_COUNT = env.int("PROBE_COUNT", default=3)  # requests per host per sweep, for RTT, loss and jitter
+PROBE_PERIOD_MS = env.int("PROBE_PERIOD_MS", default=200)  # gap between requests to the same host
+PROBE_CONCURRENCY = env.int("PROBE_CONCURRENCY", default=1000)  # async probes in flight
+PROBE_TIMEOUT = env.float("PROBE_TIMEOUT", default=2.0)  # seconds per async probe
+PROBE_TCP_PORTS = [int(port) for port in env.list("PROBE_TCP_PORTS", default=["80", "443", "22"])]
+
+# Ping result writes: rows per INSERT, and sweep size from which COPY is used instead (0 disables COPY)
+PING_BULK_BATCH_SIZE = env.int("PING_BULK_BATCH_SIZE", default=1000)
+PING_COPY_THRESHOLD = env.int("PING_COPY_THRESHOLD", default=5000)
+# "all" stores every result; "changes" stores only state transitions plus a heartbeat
+# per host every PING_HEARTBEAT_SECONDS
+PING_STORAGE_MODE = env("PING_STORAGE_MODE", default="all")
+PING_HEARTBEAT_SECONDS = env.int("PING_HEARTBEAT_SECONDS", default=900)
+# How long a stored state is trusted when rolling up uptime (network/rollups.py)
+PING_STATE_VALID_SECONDS = env.int("PING_STATE_VALID_SECONDS", default=PING_HEARTBEAT_SECONDS + 120)
+
+# Ping storage: TimescaleDB chunking/compression/retention (retention also applies on plain PostgreSQL)
+PING_CHUNK_INTERVAL_DAYS = env.int("PING_CHUNK_INTERVAL_DAYS", default=1)
+PING_COMPRESS_AFTER_DAYS = env.int("PING_COMPRESS_AFTER_DAYS", default=7)  # 0 disables compression
+PING_RETENTION_DAYS = env.int("PING_RETENTION_DAYS", default=0)  # 0 keeps raw pings forever
+PING_RETENTION_DELETE_BATCH = env.int("PING_RETENTION_DELETE_BATCH", default=10000)
+PING_RETENTION_SLEEP = env.float("PING_RETENTION_SLEEP", default=0.1)  # seconds between delete chunks
+PING_ARCHIVE_DIR = env("PING_ARCHIVE_DIR", default="")  # archive pruned pings here first; empty to just delete
+PING_ARCHIVE_FORMAT = env("PING_ARCHIVE_FORMAT", default="csv")  # "csv" (gzipped) or "parquet" (needs pyarrow)
+
+# Uptime rollups (network/rollups.py): pings folded per batch, batches per run, and bucket retention
+ROLLUP_BATCH_SIZE = env.int("ROLLUP_BATCH_SIZE", default=20000)
+ROLLUP_MAX_BATCHES = env.int("ROLLUP_MAX_BATCHES", default=10)
+ROLLUP_MINUTE_RETENTION_DAYS = env.int("ROLLUP_MINUTE_RETENTION_DAYS", default=7)  # 0 keeps forever
+ROLLUP_HOUR_RETENTION_DAYS = env.int("ROLLUP_HOUR_RETENTION_DAYS", default=180)  # 0 keeps forever
+
+# Live status snapshot (network/status.py): lifetime of each network's Redis hash, refreshed every sweep
+STATUS_SNAPSHOT_TTL = env.int("STATUS_SNAPSHOT_TTL", default=900)
+# Host transition stream (network/streams.py): keepalive comment interval in seconds and client reconnect delay
+STATUS_STREAM_KEEPALIVE = env.int("STATUS_STREAM_KEEPALIVE", default=15)
+STATUS_STREAM_RETRY_MS = env.int("STATUS_STREAM_RETRY_MS", default=5000)
+STATUS_STREAM_TOKEN_TTL = env.int("STATUS_STREAM_TOKEN_TTL", default=60)  # seconds a ?token= stream token is valid
+
+# List endpoints: default and maximum page size (?page_size=)
+LIST_PAGE_SIZE = env.int("LIST_PAGE_SIZE", default=100)
+LIST_MAX_PAGE_SIZE = env.int("LIST_MAX_PAGE_SIZE", default=1000)
+
+# Per-user caching of the network/host list and detail responses (network/response_cache.py)
+API_CACHE_TTL = env.int("API_CACHE_TTL", default=300)  # seconds; 0 disables the cache
+
+# Cloud sync of network/host CRUD: "sync" calls the cloud inside the request,
+# "async" commits locally and replicates through the outbox (network/cloud_sync.py)
+CLOUD_SYNC_MODE = env("CLOUD_SYNC_MODE", default="sync")
+CLOUD_SYNC_MAX_ENTRIES = env.int("CLOUD_SYNC_MAX_ENTRIES", default=50)  # per object per run
+CLOUD_SYNC_RETRY_BACKOFF = env.int("CLOUD_SYNC_RETRY_BACKOFF", default=30)  # seconds, doubles per failure
+CLOUD_SYNC_RETRY_BACKOFF_MAX = env.int("CLOUD_SYNC_RETRY_BACKOFF_MAX", default=3600)
+CLOUD_SYNC_MAX_ATTEMPTS = env.int("CLOUD_SYNC_MAX_ATTEMPTS", default=20)  # then the entry is marked failed
+
+# Bulk host endpoints: rows per request and parallel cloud calls
+BULK_MAX_ROWS = env.int("BULK_MAX_ROWS", default=1000)
+CLOUD_BULK_CONCURRENCY = env.int("CLOUD_BULK_CONCURRENCY", default=CLOUD_HTTP_POOL_SIZE)
+
+# Uptime API: points returned per series when not requested, and the upper bound
+UPTIME_DEFAULT_POINTS = env.int("UPTIME_DEFAULT_POINTS", default=100)
+UPTIME_MAX_POINTS = env.int("UPTIME_MAX_POINTS", default=500)
+
 # Ensure log directory exists
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 if not os.path.exists(LOG_DIR):
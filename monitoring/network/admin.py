@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Network, Host, Ping
+from .models import (
+    Network, Host, Ping, ExportCursor, UploadBatch, CloudSyncEntry, HostUptimeRollup, NetworkUptimeRollup,
+    SweepRun,
+)
 
 @admin.register(Network)
 class NetworkAdmin(admin.ModelAdmin):
@@ -20,3 +23,50 @@ class PingAdmin(admin.ModelAdmin):
     list_display = ('host', 'is_alive', 'timestamp', 'network')
     list_filter = ('is_alive', 'network')
     ordering = ('-timestamp',)
+
+
+@admin.register(SweepRun)
+class SweepRunAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'finished_at', 'shards', 'shards_done', 'shards_skipped', 'hosts', 'alive', 'abandoned')
+    ordering = ('-started_at',)
+
+
+@admin.register(ExportCursor)
+class ExportCursorAdmin(admin.ModelAdmin):
+    list_display = ('network', 'last_ping_id', 'last_timestamp', 'updated_at')
+    ordering = ('network',)
+
+
+@admin.register(UploadBatch)
+class UploadBatchAdmin(admin.ModelAdmin):
+    list_display = ('network', 'first_ping_id', 'last_ping_id', 'ping_count', 'attempts', 'next_attempt_at', 'created_at')
+    list_filter = ('network',)
+    exclude = ('body',)
+    ordering = ('id',)
+
+
+@admin.register(CloudSyncEntry)
+class CloudSyncEntryAdmin(admin.ModelAdmin):
+    list_display = ('object_type', 'object_id', 'action', 'user', 'attempts', 'next_attempt_at', 'failed_at',
+                    'created_at')
+    list_filter = ('object_type', 'action', ('failed_at', admin.EmptyFieldListFilter))
+    ordering = ('id',)
+    actions = ['retry']
+
+    @admin.action(description="Retry the selected entries")
+    def retry(self, request, queryset):
+        queryset.update(attempts=0, last_error='', next_attempt_at=None, failed_at=None)
+
+
+@admin.register(HostUptimeRollup)
+class HostUptimeRollupAdmin(admin.ModelAdmin):
+    list_display = ('host', 'granularity', 'bucket', 'alive_count', 'total_count', 'longest_outage')
+    list_filter = ('granularity', 'network')
+    ordering = ('-bucket',)
+
+
+@admin.register(NetworkUptimeRollup)
+class NetworkUptimeRollupAdmin(admin.ModelAdmin):
+    list_display = ('network', 'granularity', 'bucket', 'alive_count', 'total_count', 'longest_outage')
+    list_filter = ('granularity', 'network')
+    ordering = ('-bucket',)
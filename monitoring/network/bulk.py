@@ -0,0 +1,298 @@
+"""
+Bulk host create, update and delete.
+
+Every row is validated before anything is sent to the cloud; one invalid row
+rejects the whole request. The cloud API has no batch endpoint, so the rows
+are synced with parallel calls (CLOUD_BULK_CONCURRENCY at a time) over the
+pooled cloud session, all with one token. The rows the cloud accepted are
+then written locally in one transaction with bulk_create / bulk_update /
+a single DELETE, and each row gets its own result. If the local write of
+created hosts fails, they are deleted from the cloud again (or queued for
+deletion when that fails too).
+
+With CLOUD_SYNC_MODE = "async" the cloud calls are skipped; the rows are
+written locally and queued for replication in the same transaction (see
+network/cloud_sync.py).
+"""
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from .cloud_sync import enqueue, enqueue_many, enqueue_orphan_deletes, host_delete_payload, is_async
+from .models import Host, Network
+from .response_cache import invalidate_user
+from .serializers import HostSerializer
+from .utils import cloud_request
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Set by the server, never taken from a row.
+READ_ONLY = {'id', 'user', 'cloud_pk'}
+
+
+class BulkValidationError(Exception):
+    def __init__(self, errors):
+        super().__init__("Bulk request failed validation")
+        self.errors = errors
+
+
+def _check_size(rows):
+    if not isinstance(rows, list) or not rows:
+        raise BulkValidationError({"non_field_errors": ["Expected a non-empty list of hosts."]})
+    if len(rows) > settings.BULK_MAX_ROWS:
+        raise BulkValidationError({"non_field_errors": [f"At most {settings.BULK_MAX_ROWS} hosts per request."]})
+    if not all(isinstance(row, dict) for row in rows):
+        raise BulkValidationError({"non_field_errors": ["Each host must be an object."]})
+
+
+def _as_id(value):
+    """
+    Host ids arrive as ints from JSON and as strings from CSV.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _check_duplicates(rows, errors, field):
+    seen = {}
+    for i, row in enumerate(rows):
+        value = row.get(field)
+        if not value:
+            continue
+        if value in seen:
+            errors.setdefault(i, {})[field] = [f"Duplicate of row {seen[value]}."]
+        else:
+            seen[value] = i
+
+
+def _cloud_calls(user, token, calls):
+    """
+    Run (method, url, kwargs) cloud calls in parallel. Returns one
+    (response, error) tuple per call, in order.
+    """
+    def call(method, url, kwargs):
+        try:
+            return cloud_request(user, method, url, token, **kwargs), None
+        except requests.RequestException as exc:
+            return None, str(exc)
+
+    with ThreadPoolExecutor(max_workers=settings.CLOUD_BULK_CONCURRENCY) as pool:
+        return list(pool.map(lambda args: call(*args), calls))
+
+
+def _cloud_error(response, error, ok_statuses):
+    if response is None:
+        return error
+    if response.status_code not in ok_statuses:
+        return f"Cloud returned {response.status_code}: {response.text[:500]}"
+    return None
+
+
+def _discard_cloud_hosts(user, token, hosts):
+    """
+    Delete hosts the cloud created but that could not be saved locally, so
+    they are not left behind in the cloud. Deletes that fail are queued in
+    the cloud sync outbox, which retries them.
+    """
+    calls = [('delete', settings.CLOUD_HOST_DELETE_URL, {"data": host_delete_payload(host)}) for host in hosts]
+    orphans = [
+        host for host, (response, error) in zip(hosts, _cloud_calls(user, token, calls))
+        if _cloud_error(response, error, (200, 204, 404))
+    ]
+    if orphans:
+        logger.error(f"Queued cloud deletes of {len(orphans)} hosts that could not be saved locally")
+        enqueue_orphan_deletes(user, orphans)
+
+
+def bulk_create_hosts(user, token, rows):
+    """
+    Create hosts in networks administered by the user. Returns per-row results.
+    """
+    _check_size(rows)
+    networks = {network.pk: network for network in Network.objects.filter(admin=user)}
+    errors, validated = {}, []
+    for i, row in enumerate(rows):
+        serializer = HostSerializer(data={key: value for key, value in row.items() if key not in READ_ONLY})
+        if not serializer.is_valid():
+            errors[i] = serializer.errors
+            continue
+        network = serializer.validated_data.get('network')
+        if network is None or network.pk not in networks:
+            errors[i] = {"network": ["Required, and must be a network you administer."]}
+            continue
+        validated.append(serializer.validated_data)
+    _check_duplicates(rows, errors, 'ip_address')
+    _check_duplicates(rows, errors, 'mac_address')
+    if errors:
+        raise BulkValidationError(errors)
+
+    payloads = [{key: value for key, value in row.items() if key not in READ_ONLY} for row in rows]
+    if is_async():
+        hosts = [Host(**{**data, "user": user}) for data in validated]
+        with transaction.atomic():
+            Host.objects.bulk_create(hosts, batch_size=1000)
+            enqueue_many(user, hosts, 'create', payloads)
+            invalidate_user(user.pk)
+        return [
+            {"row": i, "status": "created", "id": host.pk, "cloud_pk": None}
+            for i, host in enumerate(hosts)
+        ]
+
+    calls = [
+        ('post', settings.CLOUD_HOST_CREATE_URL, {"json": {**payload, "network": data['network'].cloud_pk}})
+        for payload, data in zip(payloads, validated)
+    ]
+    results, hosts = [], []
+    for i, (data, (response, error)) in enumerate(zip(validated, _cloud_calls(user, token, calls))):
+        error = _cloud_error(response, error, (200, 201))
+        if error is None:
+            try:
+                cloud_pk = response.json()["id"]
+            except (ValueError, KeyError):
+                error = "Cloud response did not include the host id."
+        if error:
+            logger.error(f"Bulk host create row {i} failed on cloud: {error}")
+            results.append({"row": i, "status": "error", "error": error})
+            continue
+        hosts.append(Host(**{**data, "user": user, "cloud_pk": cloud_pk}))
+        results.append({"row": i, "status": "created"})
+
+    try:
+        with transaction.atomic():
+            Host.objects.bulk_create(hosts, batch_size=1000)
+            invalidate_user(user.pk)
+    except DatabaseError as exc:
+        # E.g. a host with the same address was created in the meantime.
+        logger.error(f"Bulk host create of {len(hosts)} cloud hosts failed locally: {exc}")
+        _discard_cloud_hosts(user, token, hosts)
+        error = "Saving the host failed after the cloud created it; it was removed from the cloud again."
+        return [
+            {"row": result["row"], "status": "error", "error": error} if result["status"] == "created" else result
+            for result in results
+        ]
+    created = iter(hosts)
+    for result in results:
+        if result["status"] == "created":
+            host = next(created)
+            result.update(id=host.pk, cloud_pk=host.cloud_pk)
+    return results
+
+
+def bulk_update_hosts(user, token, rows):
+    """
+    Partially update the user's hosts; each row carries the host "id".
+    Returns per-row results.
+    """
+    _check_size(rows)
+    ids = [_as_id(row.get('id')) for row in rows]
+    hosts = {
+        host.pk: host
+        for host in Host.objects.filter(user=user, pk__in=[pk for pk in ids if pk is not None])
+        .select_related('network')
+    }
+    network_ids = set(Network.objects.filter(admin=user).values_list('pk', flat=True))
+    errors, validated = {}, []
+    for i, (pk, row) in enumerate(zip(ids, rows)):
+        host = hosts.get(pk)
+        if host is None:
+            errors[i] = {"id": ["Host not found."]}
+            continue
+        data = {key: value for key, value in row.items() if key not in READ_ONLY}
+        serializer = HostSerializer(host, data=data, partial=True)
+        if not serializer.is_valid():
+            errors[i] = serializer.errors
+            continue
+        network = serializer.validated_data.get('network', host.network)
+        if 'network' in serializer.validated_data and (network is None or network.pk not in network_ids):
+            errors[i] = {"network": ["Must be a network you administer."]}
+            continue
+        validated.append((host, data, serializer.validated_data, network))
+    _check_duplicates([{"id": pk} for pk in ids], errors, 'id')
+    _check_duplicates(rows, errors, 'ip_address')
+    _check_duplicates(rows, errors, 'mac_address')
+    if errors:
+        raise BulkValidationError(errors)
+
+    if is_async():
+        fields = set()
+        for host, _, changes, _ in validated:
+            for field, value in changes.items():
+                setattr(host, field, value)
+            fields.update(changes)
+        hosts = [host for host, _, _, _ in validated]
+        with transaction.atomic():
+            if fields:
+                Host.objects.bulk_update(hosts, sorted(fields), batch_size=1000)
+                invalidate_user(user.pk)
+            enqueue_many(user, hosts, 'update', [data for _, data, _, _ in validated])
+        return [{"row": i, "id": host.pk, "status": "updated"} for i, host in enumerate(hosts)]
+
+    calls = [
+        ('put', f"{settings.CLOUD_HOST_UPDATE_URL}{host.cloud_pk}/",
+         {"json": {**data, "network": network.cloud_pk if network else None}})
+        for host, data, _, network in validated
+    ]
+    results, updated, fields = [], [], set()
+    for i, ((host, _, changes, _), (response, error)) in enumerate(zip(validated, _cloud_calls(user, token, calls))):
+        error = _cloud_error(response, error, (200, 201))
+        if error:
+            logger.error(f"Bulk host update row {i} failed on cloud: {error}")
+            results.append({"row": i, "id": host.pk, "status": "error", "error": error})
+            continue
+        for field, value in changes.items():
+            setattr(host, field, value)
+        fields.update(changes)
+        updated.append(host)
+        results.append({"row": i, "id": host.pk, "status": "updated"})
+
+    if updated and fields:
+        with transaction.atomic():
+            Host.objects.bulk_update(updated, sorted(fields), batch_size=1000)
+            invalidate_user(user.pk)
+    return results
+
+
+def bulk_delete_hosts(user, token, rows):
+    """
+    Delete the user's hosts; each row carries the host "id".
+    Returns per-row results.
+    """
+    _check_size(rows)
+    ids = [_as_id(row.get('id')) for row in rows]
+    hosts = {
+        host.pk: host
+        for host in Host.objects.filter(user=user, pk__in=[pk for pk in ids if pk is not None])
+        .select_related('network')
+    }
+    errors = {i: {"id": ["Host not found."]} for i, pk in enumerate(ids) if pk not in hosts}
+    _check_duplicates([{"id": pk} for pk in ids], errors, 'id')
+    if errors:
+        raise BulkValidationError(errors)
+
+    if is_async():
+        with transaction.atomic():
+            for pk in ids:
+                enqueue(user, hosts[pk], 'delete', host_delete_payload(hosts[pk]))
+            Host.objects.filter(user=user, pk__in=ids).delete()
+        return [{"row": i, "id": pk, "status": "deleted"} for i, pk in enumerate(ids)]
+
+    calls = [
+        ('delete', settings.CLOUD_HOST_DELETE_URL, {"data": host_delete_payload(hosts[pk])})
+        for pk in ids
+    ]
+    results, deleted = [], []
+    for i, (pk, (response, error)) in enumerate(zip(ids, _cloud_calls(user, token, calls))):
+        error = _cloud_error(response, error, (200, 204))
+        if error:
+            logger.error(f"Bulk host delete row {i} failed on cloud: {error}")
+            results.append({"row": i, "id": pk, "status": "error", "error": error})
+            continue
+        deleted.append(pk)
+        results.append({"row": i, "id": pk, "status": "deleted"})
+
+    with transaction.atomic():
+        Host.objects.filter(user=user, pk__in=deleted).delete()
+    return results
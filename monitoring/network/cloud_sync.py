@@ -0,0 +1,246 @@
+"""
+Asynchronous cloud sync for network and host CRUD (outbox pattern).
+
+With CLOUD_SYNC_MODE = "async" the views commit local changes right away and
+record a CloudSyncEntry in the same transaction; a Celery worker replicates
+the entries to the cloud afterwards, so API latency does not depend on the
+cloud. Entries of one object are replicated strictly in order: a failed entry
+is retried with exponential backoff and blocks the entries behind it. An
+entry the cloud rejects with a 4xx status that retrying cannot fix, or that
+failed CLOUD_SYNC_MAX_ATTEMPTS times, is marked failed (kept for inspection,
+see /metrics/) and the entries behind it go ahead. A create back-fills the
+object's cloud_pk, which later updates and the pings export rely on; a host
+waits for its network's create to replicate first.
+
+With the default CLOUD_SYNC_MODE = "sync" the views call the cloud inline and
+nothing is queued.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import CloudSyncEntry, Host, Network
+from .outbox import claim_oldest_due, give_up, outbox_stats, schedule_retry
+from .response_cache import invalidate_user
+from .utils import get_cloud_token, cloud_request
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 4xx statuses that may succeed on a later attempt.
+RETRYABLE_STATUSES = {401, 408, 425, 429}
+
+
+class NotReady(Exception):
+    """
+    The entry depends on an object whose create has not replicated yet.
+    """
+
+
+class Rejected(Exception):
+    """
+    The cloud refused the entry with a status that retrying cannot fix.
+    """
+
+
+def is_async():
+    return settings.CLOUD_SYNC_MODE == "async"
+
+
+def _object_type(obj):
+    return 'network' if isinstance(obj, Network) else 'host'
+
+
+def as_payload(data):
+    """
+    Request data (a dict or a QueryDict) as a JSON-serializable dict.
+    """
+    return data.dict() if hasattr(data, 'dict') else dict(data)
+
+
+def host_delete_payload(host):
+    # Same identifiers as the synchronous host delete.
+    return {
+        "ip_address": host.ip_address,
+        "mac_address": host.mac_address,
+        "network": str(host.network) if host.network else None,
+    }
+
+
+def _schedule_replication(object_type, object_id):
+    from .tasks import replicate_cloud_object
+    transaction.on_commit(lambda: replicate_cloud_object.delay(object_type, object_id))
+
+
+def enqueue(user, obj, action, payload=None):
+    """
+    Record a change of `obj` for replication. Must be called inside the
+    transaction that writes the change, and for deletes before the object is
+    deleted. Returns the entry, or None if nothing needs replicating.
+    """
+    object_type = _object_type(obj)
+    if action == 'delete':
+        # Waits for a worker that is replicating this object right now.
+        pending = list(
+            CloudSyncEntry.objects.select_for_update()
+            .filter(object_type=object_type, object_id=obj.pk).order_by('id')
+        )
+        if any(entry.action == 'create' for entry in pending):
+            # The object never reached the cloud; drop its history instead.
+            CloudSyncEntry.objects.filter(pk__in=[entry.pk for entry in pending]).delete()
+            return None
+        obj.refresh_from_db(fields=['cloud_pk'])
+    entry = CloudSyncEntry.objects.create(
+        object_type=object_type,
+        object_id=obj.pk,
+        action=action,
+        user=user,
+        payload=payload or {},
+        cloud_pk=obj.cloud_pk if action == 'delete' else None,
+    )
+    _schedule_replication(object_type, obj.pk)
+    return entry
+
+
+def enqueue_many(user, objs, action, payloads):
+    """
+    Record a create or update of many objects of one type with one INSERT.
+    """
+    entries = [
+        CloudSyncEntry(object_type=_object_type(obj), object_id=obj.pk, action=action, user=user, payload=payload)
+        for obj, payload in zip(objs, payloads)
+    ]
+    CloudSyncEntry.objects.bulk_create(entries, batch_size=1000)
+    for entry in entries:
+        _schedule_replication(entry.object_type, entry.object_id)
+
+
+def enqueue_orphan_deletes(user, hosts):
+    """
+    Queue cloud deletes of hosts that exist only in the cloud: created there
+    by a synchronous bulk create whose local write then failed. They have no
+    local id, so their entries use the negated cloud id as object_id, which
+    no local host can have.
+    """
+    entries = [
+        CloudSyncEntry(object_type='host', object_id=-host.cloud_pk, action='delete', user=user,
+                       payload=host_delete_payload(host), cloud_pk=host.cloud_pk)
+        for host in hosts
+    ]
+    CloudSyncEntry.objects.bulk_create(entries)
+    for entry in entries:
+        _schedule_replication(entry.object_type, entry.object_id)
+
+
+def _send(entry, method, url, ok_statuses, **kwargs):
+    token, error = get_cloud_token(entry.user)
+    if not token:
+        raise Exception(f"Failed to obtain cloud token: {error}")
+    headers = {"Idempotency-Key": f"cloud-sync-{entry.pk}"}
+    response = cloud_request(entry.user, method, url, token, headers=headers, **kwargs)
+    if response.status_code not in ok_statuses:
+        rejected = 400 <= response.status_code < 500 and response.status_code not in RETRYABLE_STATUSES
+        raise (Rejected if rejected else Exception)(
+            f"Cloud {entry.action} of {entry.object_type} failed: {response.status_code} {response.text[:500]}"
+        )
+    return response
+
+
+def _replicate_network(entry):
+    if entry.action == 'delete':
+        if entry.cloud_pk is not None:
+            _send(entry, 'delete', f"{settings.CLOUD_NETWORK_CREATE_URL}{entry.cloud_pk}/", (200, 204, 404))
+        return
+    network = Network.objects.filter(pk=entry.object_id).first()
+    if network is None:
+        # Deleted locally since; its delete entry (if any) follows.
+        return
+    if entry.action == 'create':
+        response = _send(entry, 'post', settings.CLOUD_NETWORK_CREATE_URL, (200, 201), json=entry.payload)
+        Network.objects.filter(pk=network.pk).update(cloud_pk=response.json()["id"])
+        invalidate_user(network.admin_id)
+    else:
+        if network.cloud_pk is None:
+            raise NotReady(f"Network {network.pk} has no cloud id yet")
+        _send(entry, 'put', f"{settings.CLOUD_NETWORK_CREATE_URL}{network.cloud_pk}/", (200, 201), json=entry.payload)
+
+
+def _replicate_host(entry):
+    if entry.action == 'delete':
+        _send(entry, 'delete', settings.CLOUD_HOST_DELETE_URL, (200, 204, 404), data=entry.payload)
+        return
+    host = Host.objects.select_related('network').filter(pk=entry.object_id).first()
+    if host is None:
+        return
+    if host.network and host.network.cloud_pk is None:
+        raise NotReady(f"Network {host.network_id} of host {host.pk} has no cloud id yet")
+    payload = {**entry.payload, "network": host.network.cloud_pk if host.network else None}
+    if entry.action == 'create':
+        response = _send(entry, 'post', settings.CLOUD_HOST_CREATE_URL, (200, 201), json=payload)
+        Host.objects.filter(pk=host.pk).update(cloud_pk=response.json()["id"])
+        invalidate_user(host.user_id)
+    else:
+        if host.cloud_pk is None:
+            raise NotReady(f"Host {host.pk} has no cloud id yet")
+        _send(entry, 'put', f"{settings.CLOUD_HOST_UPDATE_URL}{host.cloud_pk}/", (200, 201), json=payload)
+
+
+def replicate_next(object_type, object_id):
+    """
+    Replicate the oldest entry of an object and delete it. Returns True if
+    an entry was replicated, False if there is none due or it failed.
+    Raises OperationalError if another worker is claiming the object's entry.
+
+    The entry is claimed in a short transaction and sent after it commits
+    (see network/outbox.py). If the worker dies in between, the entry is sent
+    again once the claim expires, with the same Idempotency-Key.
+    """
+    # Claiming the oldest entry makes this the only replicator of the object.
+    entry = claim_oldest_due(
+        CloudSyncEntry.objects.select_related('user')
+        .filter(object_type=object_type, object_id=object_id, failed_at__isnull=True)
+    )
+    if entry is None:
+        return False
+    try:
+        if object_type == 'network':
+            _replicate_network(entry)
+        else:
+            _replicate_host(entry)
+    except Exception as exc:
+        if isinstance(exc, Rejected) or entry.attempts + 1 >= settings.CLOUD_SYNC_MAX_ATTEMPTS:
+            logger.error(f"Cloud sync of {entry} failed after {entry.attempts + 1} attempts, giving up: {exc}")
+            give_up(entry, exc)
+        else:
+            logger.warning(f"Cloud sync of {entry} failed: {exc}")
+            schedule_retry(entry, exc, settings.CLOUD_SYNC_RETRY_BACKOFF, settings.CLOUD_SYNC_RETRY_BACKOFF_MAX)
+        return False
+    entry.delete()
+    return True
+
+
+def due_objects():
+    """
+    (object_type, object_id) of every object with a due entry.
+    """
+    now = timezone.now()
+    return list(
+        CloudSyncEntry.objects.filter(failed_at__isnull=True)
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .values_list('object_type', 'object_id').distinct()
+    )
+
+
+def cloud_sync_stats():
+    """
+    Size and age of the cloud sync outbox, and the number of entries that
+    were given up on, for monitoring.
+    """
+    stats = outbox_stats(
+        CloudSyncEntry.objects.filter(failed_at__isnull=True),
+        entries=Count('id'),
+        failing=Count('id', filter=Q(attempts__gt=0)),
+    )
+    stats['failed'] = CloudSyncEntry.objects.filter(failed_at__isnull=False).count()
+    return stats
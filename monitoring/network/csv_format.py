@@ -0,0 +1,59 @@
+"""
+CSV parser and renderer for the bulk host endpoints, so hosts can be
+imported and exported as spreadsheets as well as JSON.
+"""
+import csv
+import io
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+
+class CSVParser(BaseParser):
+    """
+    Parse a CSV body with a header row into a list of dicts. Empty cells
+    are dropped so they fall back to the field defaults.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        try:
+            text = stream.read().decode(encoding)
+        except UnicodeDecodeError as exc:
+            raise ParseError(f"CSV parse error - {exc}")
+        reader = csv.DictReader(io.StringIO(text.lstrip('﻿')))
+        return [
+            {
+                key.strip(): value.strip()
+                for key, value in row.items()
+                if key and isinstance(value, str) and value.strip()
+            }
+            for row in reader
+        ]
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Render a list of dicts as CSV with a header row. For a dict with a
+    "results" list (bulk results, paginated lists) the results are rendered;
+    any other dict (e.g. an error) is rendered as a single row.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            data = data['results']
+        rows = data if isinstance(data, list) else [data]
+        columns = []
+        for row in rows:
+            columns.extend(key for key in row if key not in columns)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue().encode(self.charset)
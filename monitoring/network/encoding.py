@@ -0,0 +1,149 @@
+"""
+Encoding of ping data for the cloud ingest endpoint.
+
+Two body formats are supported, selected with CLOUD_INGEST_FORMAT:
+
+- "json" (default): the original shape, one dict per ping.
+- "compact": columnar arrays of host ids, a status bitmap and delta-encoded
+  epoch timestamps (milliseconds):
+
+    {
+      "network": <network_id>,
+      "network_admin": <network_admin_identifier>,
+      "format": "compact-v1",
+      "count": <n>,
+      "host": [<host_id>, ...],
+      "alive": "<base64 bitmap, bit i (LSB first) set if ping i was alive>",
+      "t0": <epoch ms of the first ping>,
+      "dt": [0, <ms since the previous ping>, ...],
+      "rtt_min": [...], "rtt_avg": [...], "rtt_max": [...], "jitter": [...],
+      "loss": [...]
+    }
+
+Both formats carry each ping's latency and loss (see Ping): RTTs and jitter
+in microseconds, loss in percent, null where not measured. In the compact
+format they are one array per metric, aligned with "host"; readers that do
+not know them can ignore them.
+
+Either body can be compressed with CLOUD_INGEST_COMPRESSION ("none", "gzip"
+or "zstd"; zstd needs the optional `zstandard` package and falls back to gzip
+without it), which is announced with a Content-Encoding header.
+"""
+import base64
+import gzip
+import json
+from django.conf import settings
+from django.utils import timezone
+import logging
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPACT_FORMAT = "compact-v1"
+METRICS = ('rtt_min', 'rtt_avg', 'rtt_max', 'loss', 'jitter')
+_warned_no_zstd = False
+
+
+def _metrics(values):
+    """
+    The metric values of a row, padded with None for rows without them.
+    """
+    return dict(zip(METRICS, [*values, *[None] * (len(METRICS) - len(values))]))
+
+
+def build_ping_payload(network, rows):
+    """
+    Build a network's ingest payload from (host cloud id, is_alive, timestamp,
+    rtt_min, rtt_avg, rtt_max, loss, jitter) rows; the metrics are optional.
+    """
+    data = []
+    for host_cloud_pk, is_alive, timestamp, *metrics in rows:
+        timestamp = (timestamp or timezone.now()).isoformat()
+        data.append({
+            "host": host_cloud_pk,
+            "is_alive": is_alive,
+            "time": timestamp,
+            "timestamp": timestamp,
+            **_metrics(metrics),
+        })
+    return {
+        "network": network.cloud_pk,
+        "network_admin": network.admin.username,
+        "data": data,
+    }
+
+
+def build_compact_payload(network, rows):
+    """
+    Build the columnar "compact-v1" payload from the same rows.
+    """
+    hosts = []
+    bitmap = bytearray((len(rows) + 7) // 8)
+    deltas = []
+    columns = {metric: [] for metric in METRICS}
+    first = previous = None
+    for i, (host_cloud_pk, is_alive, timestamp, *metrics) in enumerate(rows):
+        hosts.append(host_cloud_pk)
+        for metric, value in _metrics(metrics).items():
+            columns[metric].append(value)
+        if is_alive:
+            bitmap[i // 8] |= 1 << (i % 8)
+        epoch_ms = int((timestamp or timezone.now()).timestamp() * 1000)
+        if first is None:
+            first = previous = epoch_ms
+        deltas.append(epoch_ms - previous)
+        previous = epoch_ms
+    return {
+        "network": network.cloud_pk,
+        "network_admin": network.admin.username,
+        "format": COMPACT_FORMAT,
+        "count": len(rows),
+        "host": hosts,
+        "alive": base64.b64encode(bytes(bitmap)).decode("ascii"),
+        "t0": first,
+        "dt": deltas,
+        **columns,
+    }
+
+
+def compress(body, compression):
+    """
+    Compress a body; returns (body, content encoding or None).
+    """
+    global _warned_no_zstd
+    if compression == "zstd":
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=settings.CLOUD_INGEST_ZSTD_LEVEL).compress(body), "zstd"
+        if not _warned_no_zstd:
+            logger.warning("zstandard is not installed; compressing ingest payloads with gzip instead")
+            _warned_no_zstd = True
+        compression = "gzip"
+    if compression == "gzip":
+        return gzip.compress(body, compresslevel=settings.CLOUD_INGEST_GZIP_LEVEL), "gzip"
+    return body, None
+
+
+def encode_ping_payload(network, rows, payload_format=None, compression=None):
+    """
+    Serialize rows for the ingest endpoint in the configured format and
+    compression. Returns (body bytes, request headers).
+    """
+    payload_format = payload_format or settings.CLOUD_INGEST_FORMAT
+    compression = compression or settings.CLOUD_INGEST_COMPRESSION
+    if payload_format == "compact":
+        payload = build_compact_payload(network, rows)
+    elif payload_format == "json":
+        payload = build_ping_payload(network, rows)
+    else:
+        raise ValueError(f"Unknown ingest format: {payload_format}")
+
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    body, encoding = compress(body, compression)
+    headers = {"Content-Type": "application/json"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return body, headers
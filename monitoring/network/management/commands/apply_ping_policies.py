@@ -0,0 +1,25 @@
+"""
+Django command to (re)apply TimescaleDB policies to the Ping table.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from network.timescale import apply_ping_policies, create_ping_hypertable
+
+
+class Command(BaseCommand):
+    """
+    Convert network_ping to a hypertable if needed and apply the compression
+    and retention policies from settings. Run after changing
+    PING_COMPRESS_AFTER_DAYS or PING_RETENTION_DAYS.
+    """
+    help = 'Apply TimescaleDB compression and retention policies to network_ping.'
+
+    def handle(self, *args, **options):
+        if not create_ping_hypertable(connection):
+            self.stdout.write(self.style.WARNING(
+                'TimescaleDB not available; retention is handled by the enforce_ping_retention task.'
+            ))
+            return
+        apply_ping_policies(connection)
+        self.stdout.write(self.style.SUCCESS('Ping policies applied.'))
@@ -0,0 +1,58 @@
+"""
+Django command to compare cloud ingest payload encodings.
+"""
+import random
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from network.encoding import encode_ping_payload, zstandard
+
+
+class Command(BaseCommand):
+    """
+    Encode one export batch of synthetic pings (a number of hosts swept once a
+    minute) in every format/compression combination and report the bytes on
+    the wire and the serialization time.
+    """
+    help = 'Benchmark bytes on the wire and serialization time of ingest payload formats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=500, help='Hosts per sweep.')
+        parser.add_argument('--sweeps', type=int, default=10, help='Sweeps in the batch.')
+        parser.add_argument('--down-ratio', type=float, default=0.05,
+                            help='Fraction of pings that are down.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions.')
+
+    @staticmethod
+    def ping(host_cloud_pk, is_alive, timestamp):
+        if not is_alive:
+            return host_cloud_pk, False, timestamp, None, None, None, 100, None
+        rtts = sorted(random.randint(500, 50000) for _ in range(3))
+        return host_cloud_pk, True, timestamp, rtts[0], sum(rtts) // 3, rtts[2], 0, random.randint(0, 5000)
+
+    def handle(self, *args, **options):
+        network = SimpleNamespace(cloud_pk=1, admin=SimpleNamespace(username='benchmark'))
+        start = timezone.now() - timedelta(minutes=options['sweeps'])
+        rows = [
+            self.ping(1000 + host, random.random() >= options['down_ratio'], start + timedelta(minutes=sweep))
+            for sweep in range(options['sweeps'])
+            for host in range(options['hosts'])
+        ]
+
+        self.stdout.write(f"{len(rows)} pings")
+        self.stdout.write(f"{'format':>8} {'compression':>12} {'bytes':>10} {'B/ping':>8} {'ms':>8}")
+        for payload_format in ('json', 'compact'):
+            for compression in ('none', 'gzip', 'zstd') if zstandard else ('none', 'gzip'):
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    body, headers = encode_ping_payload(network, rows, payload_format, compression)
+                elapsed_ms = (time.perf_counter() - started) * 1000 / options['repeat']
+                label = headers.get('Content-Encoding', 'none')
+                self.stdout.write(
+                    f"{payload_format:>8} {label:>12} {len(body):>10} "
+                    f"{len(body) / len(rows):>8.2f} {elapsed_ms:>8.1f}"
+                )
@@ -0,0 +1,79 @@
+"""
+Django command to benchmark ping sweep time against host count.
+"""
+import asyncio
+import ipaddress
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from network.probes import AsyncProber, FpingProber, alive
+
+
+class Command(BaseCommand):
+    """
+    Time a sweep with the chosen probe backend (and optionally the old
+    one-process-per-host loop) over generated targets. Defaults to loopback
+    addresses, which always answer, so the numbers reflect process and
+    scheduling overhead only.
+
+    With `--fake-latency-ms` the async backend probes a local fake instead of
+    the network, which measures sweep throughput without network access.
+    """
+    help = 'Benchmark ping sweep time against host count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000, 5000],
+                            help='Host counts to benchmark.')
+        parser.add_argument('--network', default='127.0.0.0/8',
+                            help='CIDR block the target addresses are drawn from.')
+        parser.add_argument('--backend', choices=['fping', 'async'], default='fping',
+                            help='Probe backend to benchmark.')
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Async probes in flight (defaults to PROBE_CONCURRENCY).')
+        parser.add_argument('--fake-latency-ms', type=float, default=None,
+                            help='Benchmark the async backend against a local fake with this mean RTT.')
+        parser.add_argument('--sequential', action='store_true',
+                            help='Also time the sequential one-fping-per-host loop.')
+
+    def get_prober(self, options):
+        if options['backend'] == 'fping':
+            return FpingProber()
+        probe = None
+        if options['fake_latency_ms'] is not None:
+            mean = options['fake_latency_ms'] / 1000
+
+            async def probe(ip):
+                await asyncio.sleep(random.uniform(0, 2 * mean))
+                return True
+        return AsyncProber(concurrency=options['concurrency'], probe=probe)
+
+    def handle(self, *args, **options):
+        prober = self.get_prober(options)
+        network = ipaddress.ip_network(options['network'])
+        hosts = network.hosts()
+        pool = []
+
+        self.stdout.write(f"{'hosts':>8} {'sweep (s)':>12} {'alive':>8} {'sequential (s)':>15}")
+        for count in sorted(options['counts']):
+            while len(pool) < count:
+                try:
+                    pool.append(str(next(hosts)))
+                except StopIteration:
+                    break
+            ips = pool[:count]
+
+            started = time.monotonic()
+            results = prober.probe_many(ips)
+            elapsed = time.monotonic() - started
+            up = sum(result.alive for result in results.values())
+
+            sequential = '-'
+            if options['sequential']:
+                started = time.monotonic()
+                for ip in ips:
+                    alive(ip)
+                sequential = f"{time.monotonic() - started:.2f}"
+
+            self.stdout.write(f"{len(ips):>8} {elapsed:>12.2f} {up:>8} {sequential:>15}")
@@ -0,0 +1,76 @@
+"""
+Django command to prune (and optionally archive) old pings.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from network.retention import prune_pings, pyarrow
+from network.timescale import is_hypertable
+
+
+class Command(BaseCommand):
+    """
+    Delete pings older than `--days` (default PING_RETENTION_DAYS) in
+    chunks, the same way the enforce_ping_retention task does, and report
+    progress and throughput as it goes. With `--archive-dir` every chunk is
+    written to a gzipped CSV or Parquet file there before it is deleted.
+
+    On TimescaleDB the retention policy drops whole chunks, so the command
+    refuses to run there unless given `--force` (e.g. to archive a range
+    before the policy drops it).
+    """
+    help = 'Delete or archive pings older than a horizon in throttled chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.PING_RETENTION_DAYS,
+                            help='Prune pings older than this many days.')
+        parser.add_argument('--batch-size', type=int, default=settings.PING_RETENTION_DELETE_BATCH,
+                            help='Pings per chunk.')
+        parser.add_argument('--sleep', type=float, default=settings.PING_RETENTION_SLEEP,
+                            help='Seconds to pause between chunks.')
+        parser.add_argument('--archive-dir', default=settings.PING_ARCHIVE_DIR or None,
+                            help='Archive each chunk to a file in this directory before deleting it.')
+        parser.add_argument('--format', choices=['csv', 'parquet'], default=settings.PING_ARCHIVE_FORMAT,
+                            help='Archive format (parquet needs pyarrow).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the pings that would be pruned.')
+        parser.add_argument('--force', action='store_true',
+                            help='Run even if network_ping is a TimescaleDB hypertable.')
+
+    def handle(self, *args, **options):
+        if options['days'] <= 0:
+            raise CommandError('--days must be positive (PING_RETENTION_DAYS = 0 keeps every ping).')
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive.')
+        if options['archive_dir'] and options['format'] == 'parquet' and pyarrow is None:
+            raise CommandError('Parquet archives need the pyarrow package.')
+        if is_hypertable(connection) and not options['force']:
+            raise CommandError(
+                'network_ping is a TimescaleDB hypertable whose retention policy drops old chunks; '
+                'use --force to prune it row by row anyway.'
+            )
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        self.stdout.write(f"{'Counting' if options['dry_run'] else 'Pruning'} pings older than {cutoff.isoformat()}")
+        pruned = prune_pings(
+            cutoff,
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            archive_dir=options['archive_dir'],
+            file_format=options['format'],
+            dry_run=options['dry_run'],
+            progress=self.report,
+        )
+        verb = 'Would prune' if options['dry_run'] else 'Pruned'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {pruned} pings."))
+
+    def report(self, pruned, last_timestamp, elapsed):
+        rate = pruned / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{pruned:>12} pings, up to {last_timestamp.isoformat()}, "
+            f"{elapsed:>8.1f}s, {rate:>10.0f} rows/s"
+        )
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def convert_ping_to_hypertable(apps, schema_editor):
+    from network.timescale import apply_ping_policies, create_ping_hypertable
+
+    connection = schema_editor.connection
+    if create_ping_hypertable(connection):
+        apply_ping_policies(connection)
+
+
+class Migration(migrations.Migration):
+    """
+    Turn network_ping into a TimescaleDB hypertable with the compression
+    and retention policies from settings (no retention policy while
+    PING_RETENTION_DAYS is 0). Does nothing on databases without TimescaleDB.
+    A hypertable cannot be converted back, so the reverse is a no-op.
+    """
+
+    dependencies = [
+        ('network', '0005_alter_host_mac_address_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_ping_to_hypertable, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:29
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0006_ping_hypertable'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ping',
+            name='host',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ping_results', to='network.host'),
+        ),
+        migrations.AlterField(
+            model_name='ping',
+            name='network',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pings', to='network.network'),
+        ),
+        migrations.AddIndex(
+            model_name='ping',
+            index=models.Index(fields=['network', 'timestamp'], name='ping_network_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ping',
+            index=models.Index(fields=['host', 'timestamp'], name='ping_host_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ping',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['timestamp'], name='ping_timestamp_brin'),
+        ),
+    ]
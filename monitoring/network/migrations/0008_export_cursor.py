@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def start_cursors_at_latest_ping(apps, schema_editor):
+    """
+    Existing pings were already uploaded by the 5-minute window export,
+    so start every network's cursor after its latest ping, at that ping's
+    timestamp.
+    """
+    Network = apps.get_model('network', 'Network')
+    Ping = apps.get_model('network', 'Ping')
+    ExportCursor = apps.get_model('network', 'ExportCursor')
+    latest = dict(
+        Ping.objects.filter(network__isnull=False)
+        .values('network_id')
+        .annotate(last_id=models.Max('id'))
+        .values_list('network_id', 'last_id')
+    )
+    timestamps = dict(Ping.objects.filter(id__in=latest.values()).values_list('id', 'timestamp'))
+    ExportCursor.objects.bulk_create([
+        ExportCursor(
+            network_id=network_id,
+            last_ping_id=latest.get(network_id, 0),
+            last_timestamp=timestamps.get(latest.get(network_id)),
+        )
+        for network_id in Network.objects.values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0007_ping_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_ping_id', models.BigIntegerField(default=0)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ping',
+            index=models.Index(fields=['network', 'id'], name='ping_network_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='exportcursor',
+            name='network',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='export_cursor', to='network.network'),
+        ),
+        migrations.RunPython(start_cursors_at_latest_ping, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0008_export_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_ping_id', models.BigIntegerField()),
+                ('last_ping_id', models.BigIntegerField()),
+                ('ping_count', models.PositiveIntegerField()),
+                ('body', models.BinaryField()),
+                ('headers', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_batches', to='network.network')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['network', 'id'], name='uploadbatch_network_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0009_upload_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_ping_id', models.BigIntegerField(default=0)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HostUptimeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('1m', 'Minute'), ('1h', 'Hour'), ('1d', 'Day')], max_length=2)),
+                ('bucket', models.DateTimeField(help_text='Start of the bucket')),
+                ('alive_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField(blank=True, help_text='First alive ping in the bucket', null=True)),
+                ('last_seen', models.DateTimeField(blank=True, help_text='Last alive ping in the bucket', null=True)),
+                ('longest_outage', models.PositiveIntegerField(default=0, help_text='Longest outage in the bucket, in seconds')),
+                ('alive_seconds', models.FloatField(default=0, help_text='Seconds of the bucket the host was known to be alive')),
+                ('known_seconds', models.FloatField(default=0, help_text="Seconds of the bucket the host's state was known")),
+                ('outage_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_ping_at', models.DateTimeField(blank=True, null=True)),
+                ('host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uptime_rollups', to='network.host')),
+                ('network', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='host_uptime_rollups', to='network.network')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['network', 'granularity', 'bucket'], name='hostrollup_network_idx'), models.Index(fields=['granularity', 'bucket'], name='hostrollup_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('host', 'granularity', 'bucket'), name='unique_host_rollup_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='NetworkUptimeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('1m', 'Minute'), ('1h', 'Hour'), ('1d', 'Day')], max_length=2)),
+                ('bucket', models.DateTimeField(help_text='Start of the bucket')),
+                ('alive_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField(blank=True, help_text='First alive ping in the bucket', null=True)),
+                ('last_seen', models.DateTimeField(blank=True, help_text='Last alive ping in the bucket', null=True)),
+                ('longest_outage', models.PositiveIntegerField(default=0, help_text='Longest outage in the bucket, in seconds')),
+                ('alive_seconds', models.FloatField(default=0, help_text='Seconds of the bucket the host was known to be alive')),
+                ('known_seconds', models.FloatField(default=0, help_text="Seconds of the bucket the host's state was known")),
+                ('network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uptime_rollups', to='network.network')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket'], name='networkrollup_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('network', 'granularity', 'bucket'), name='unique_network_rollup_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0011_cloud_sync_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SweepRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('shards', models.PositiveIntegerField()),
+                ('shards_done', models.PositiveIntegerField(default=0)),
+                ('shards_skipped', models.PositiveIntegerField(default=0)),
+                ('hosts', models.PositiveIntegerField(default=0)),
+                ('alive', models.PositiveIntegerField(default=0)),
+                ('abandoned', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
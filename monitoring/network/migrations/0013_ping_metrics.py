@@ -0,0 +1,108 @@
+# Generated by Django 5.1.7 on 2026-10-16 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0012_sweep_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostuptimerollup',
+            name='jitter_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hostuptimerollup',
+            name='jitter_sum',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hostuptimerollup',
+            name='loss_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hostuptimerollup',
+            name='loss_sum',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hostuptimerollup',
+            name='rtt_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hostuptimerollup',
+            name='rtt_max',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hostuptimerollup',
+            name='rtt_sum',
+            field=models.PositiveBigIntegerField(default=0, help_text="Sum of the pings' average RTTs"),
+        ),
+        migrations.AddField(
+            model_name='networkuptimerollup',
+            name='jitter_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='networkuptimerollup',
+            name='jitter_sum',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='networkuptimerollup',
+            name='loss_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='networkuptimerollup',
+            name='loss_sum',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='networkuptimerollup',
+            name='rtt_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='networkuptimerollup',
+            name='rtt_max',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='networkuptimerollup',
+            name='rtt_sum',
+            field=models.PositiveBigIntegerField(default=0, help_text="Sum of the pings' average RTTs"),
+        ),
+        migrations.AddField(
+            model_name='ping',
+            name='jitter',
+            field=models.PositiveIntegerField(blank=True, help_text='Mean difference between consecutive RTTs, in microseconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='ping',
+            name='loss',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Percent of requests unanswered', null=True),
+        ),
+        migrations.AddField(
+            model_name='ping',
+            name='rtt_avg',
+            field=models.PositiveIntegerField(blank=True, help_text='Microseconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='ping',
+            name='rtt_max',
+            field=models.PositiveIntegerField(blank=True, help_text='Microseconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='ping',
+            name='rtt_min',
+            field=models.PositiveIntegerField(blank=True, help_text='Microseconds', null=True),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import RegexValidator
 from django.conf import settings
+from django.contrib.postgres.indexes import BrinIndex
 
 # validator to ensure the MAC address format is correct
 mac_address_validator = RegexValidator(
@@ -87,22 +88,285 @@ class Host(models.Model):
 
 
 class Ping(models.Model):
+    # The FK columns are covered by the composite indexes in Meta,
+    # so they do not get single-column indexes of their own.
     host = models.ForeignKey(
         Host,
         on_delete=models.CASCADE,
-        related_name='ping_results'
+        related_name='ping_results',
+        db_index=False,
     )
     is_alive = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    # Latency and loss over the sweep's PROBE_COUNT requests; null when not
+    # measured (no reply, or recorded before they were captured).
+    rtt_min = models.PositiveIntegerField(null=True, blank=True, help_text="Microseconds")
+    rtt_avg = models.PositiveIntegerField(null=True, blank=True, help_text="Microseconds")
+    rtt_max = models.PositiveIntegerField(null=True, blank=True, help_text="Microseconds")
+    loss = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Percent of requests unanswered")
+    jitter = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Mean difference between consecutive RTTs, in microseconds",
+    )
+
     network = models.ForeignKey(
         Network,
         on_delete=models.CASCADE,
         related_name='pings',
         blank=True,
-        null=True
+        null=True,
+        db_index=False,
     )
 
+    class Meta:
+        indexes = [
+            # Per-network time windows (cloud export, network uptime).
+            models.Index(fields=['network', 'timestamp'], name='ping_network_timestamp_idx'),
+            # Per-host history and latest-status lookups.
+            models.Index(fields=['host', 'timestamp'], name='ping_host_timestamp_idx'),
+            # Cursor-based cloud export walks each network's pings in id order.
+            models.Index(fields=['network', 'id'], name='ping_network_id_idx'),
+            # Rows are appended in time order, so a tiny BRIN index serves
+            # table-wide time range scans and retention deletes.
+            BrinIndex(fields=['timestamp'], name='ping_timestamp_brin'),
+        ]
+
+    METRIC_FIELDS = ('rtt_min', 'rtt_avg', 'rtt_max', 'loss', 'jitter')
+
     def __str__(self):
         status = "Alive" if self.is_alive else "Down"
         return f"{self.host} at {self.timestamp}: {status}"
+
+
+class ExportCursor(models.Model):
+    """
+    High-water mark of a network's cloud export: every Ping of the network
+    with an id up to last_ping_id has been moved into the upload spool
+    (UploadBatch), or delivered already. last_timestamp is the timestamp of
+    that ping, which bounds the scan for the next batch.
+    """
+    network = models.OneToOneField(
+        Network,
+        on_delete=models.CASCADE,
+        related_name='export_cursor',
+    )
+    last_ping_id = models.BigIntegerField(default=0)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.network} exported up to ping {self.last_ping_id}"
+
+
+class UploadBatch(models.Model):
+    """
+    Durable outbox entry: one encoded ingest request for a network, kept
+    until the cloud acknowledges it. Batches of a network are delivered
+    strictly in id order.
+    """
+    network = models.ForeignKey(
+        Network,
+        on_delete=models.CASCADE,
+        related_name='upload_batches',
+    )
+    first_ping_id = models.BigIntegerField()
+    last_ping_id = models.BigIntegerField()
+    ping_count = models.PositiveIntegerField()
+    body = models.BinaryField()
+    headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['network', 'id'], name='uploadbatch_network_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.network} pings {self.first_ping_id}-{self.last_ping_id}"
+
+
+class CloudSyncEntry(models.Model):
+    """
+    Outbox entry for a network or host change not yet replicated to the
+    cloud (CLOUD_SYNC_MODE = "async"). Entries of one object are replicated
+    strictly in id order. An entry the cloud rejected, or that failed
+    CLOUD_SYNC_MAX_ATTEMPTS times, is kept with failed_at set and skipped.
+    """
+    OBJECT_TYPE_CHOICES = [
+        ('network', 'Network'),
+        ('host', 'Host'),
+    ]
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+    object_type = models.CharField(max_length=10, choices=OBJECT_TYPE_CHOICES)
+    # No foreign key: the local object is gone by the time a delete replicates.
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='cloud_sync_entries',
+        help_text="User whose cloud credentials replicate the change",
+    )
+    payload = models.JSONField(default=dict)
+    cloud_pk = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True, help_text="Set when replication was given up")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['object_type', 'object_id', 'id'], name='cloudsync_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.object_type} {self.object_id}"
+
+
+class UptimeRollup(models.Model):
+    """
+    Pre-aggregated uptime of one bucket (minute, hour or day), maintained
+    incrementally from Ping rows by the update_uptime_rollups task. The
+    counts are of stored records; uptime is weighted by the seconds each
+    state was held (see network/rollups.py).
+    """
+    GRANULARITY_CHOICES = [
+        ('1m', 'Minute'),
+        ('1h', 'Hour'),
+        ('1d', 'Day'),
+    ]
+    granularity = models.CharField(max_length=2, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField(help_text="Start of the bucket")
+    alive_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    first_seen = models.DateTimeField(null=True, blank=True, help_text="First alive ping in the bucket")
+    last_seen = models.DateTimeField(null=True, blank=True, help_text="Last alive ping in the bucket")
+    longest_outage = models.PositiveIntegerField(default=0, help_text="Longest outage in the bucket, in seconds")
+    alive_seconds = models.FloatField(default=0, help_text="Seconds of the bucket the host was known to be alive")
+    known_seconds = models.FloatField(default=0, help_text="Seconds of the bucket the host's state was known")
+    # Sums and counts of the pings that carried each metric, so buckets can
+    # be merged and averaged; RTTs and jitter in microseconds, loss in percent.
+    rtt_count = models.PositiveIntegerField(default=0)
+    rtt_sum = models.PositiveBigIntegerField(default=0, help_text="Sum of the pings' average RTTs")
+    rtt_max = models.PositiveIntegerField(null=True, blank=True)
+    jitter_count = models.PositiveIntegerField(default=0)
+    jitter_sum = models.PositiveBigIntegerField(default=0)
+    loss_count = models.PositiveIntegerField(default=0)
+    loss_sum = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def uptime(self):
+        return self.alive_seconds / self.known_seconds if self.known_seconds else None
+
+    @property
+    def rtt_avg(self):
+        return self.rtt_sum / self.rtt_count if self.rtt_count else None
+
+    @property
+    def jitter(self):
+        return self.jitter_sum / self.jitter_count if self.jitter_count else None
+
+    @property
+    def loss(self):
+        return self.loss_sum / self.loss_count if self.loss_count else None
+
+
+class HostUptimeRollup(UptimeRollup):
+    host = models.ForeignKey(
+        Host,
+        on_delete=models.CASCADE,
+        related_name='uptime_rollups',
+    )
+    network = models.ForeignKey(
+        Network,
+        on_delete=models.CASCADE,
+        related_name='host_uptime_rollups',
+        blank=True,
+        null=True,
+    )
+    # Start of the host's outage still ongoing at the last ping rolled up
+    # into this bucket, so an outage can be carried across buckets.
+    outage_started_at = models.DateTimeField(null=True, blank=True)
+    last_ping_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['host', 'granularity', 'bucket'],
+                name='unique_host_rollup_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['network', 'granularity', 'bucket'], name='hostrollup_network_idx'),
+            models.Index(fields=['granularity', 'bucket'], name='hostrollup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.host} {self.granularity} {self.bucket}: {self.alive_count}/{self.total_count}"
+
+
+class NetworkUptimeRollup(UptimeRollup):
+    network = models.ForeignKey(
+        Network,
+        on_delete=models.CASCADE,
+        related_name='uptime_rollups',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['network', 'granularity', 'bucket'],
+                name='unique_network_rollup_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket'], name='networkrollup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.network} {self.granularity} {self.bucket}: {self.alive_count}/{self.total_count}"
+
+
+class RollupCursor(models.Model):
+    """
+    Id of the last Ping folded into the uptime rollups (a single row), and
+    its timestamp, which bounds the scan for the next batch.
+    """
+    last_ping_id = models.BigIntegerField(default=0)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Rolled up to ping {self.last_ping_id}"
+
+
+class SweepRun(models.Model):
+    """
+    One ping sweep, fanned out to PING_SWEEP_SHARDS shard tasks. Each shard
+    adds its counts when it finishes (or is skipped because the previous
+    sweep of that shard still runs, or fails); the last one sets finished_at.
+    A sweep still unfinished after PING_SHARD_LOCK_TIMEOUT, e.g. because a
+    shard task expired in the queue, is marked abandoned by the next sweep.
+    """
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    shards = models.PositiveIntegerField()
+    shards_done = models.PositiveIntegerField(default=0)
+    shards_skipped = models.PositiveIntegerField(default=0)
+    hosts = models.PositiveIntegerField(default=0)
+    alive = models.PositiveIntegerField(default=0)
+    abandoned = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Sweep {self.pk} at {self.started_at}"
@@ -0,0 +1,82 @@
+"""
+Helpers shared by the two outboxes: the upload spool (UploadBatch, see
+network/spool.py) and the cloud sync outbox (CloudSyncEntry, see
+network/cloud_sync.py).
+
+Both hand their rows to the cloud strictly in order. The consumer locks the
+oldest row without waiting, which makes it the only consumer of that queue,
+and a failed row is retried with exponential backoff while blocking the rows
+behind it. Rows carry attempts, last_error, next_attempt_at and created_at.
+
+A row is claimed in a short transaction of its own and sent to the cloud
+after it commits, so no transaction or row lock is held open across the HTTP
+call: the claim pushes the row's next_attempt_at OUTBOX_LEASE_SECONDS ahead,
+which keeps other consumers off the queue until the sender records the
+outcome, or until the lease expires if the sender died.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+
+def lock_oldest_due(queryset):
+    """
+    Lock the oldest row of `queryset` inside the caller's transaction.
+    Returns the row, or None if there is none or it is backing off. Raises
+    OperationalError if another worker holds the lock.
+    """
+    row = queryset.select_for_update(nowait=True, of=('self',)).order_by('id').first()
+    if row is None or (row.next_attempt_at and row.next_attempt_at > timezone.now()):
+        return None
+    return row
+
+
+def claim_oldest_due(queryset):
+    """
+    Claim the oldest row of `queryset` for OUTBOX_LEASE_SECONDS and commit
+    the claim. Returns the row, or None if there is none or it is backing off
+    (or claimed). Raises OperationalError if another worker is claiming it.
+    """
+    with transaction.atomic():
+        row = lock_oldest_due(queryset)
+        if row is not None:
+            row.next_attempt_at = timezone.now() + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            row.save(update_fields=['next_attempt_at'])
+    return row
+
+
+def schedule_retry(row, exc, backoff, backoff_max):
+    """
+    Record a failed attempt and back off exponentially
+    (`backoff` seconds, doubling, capped at `backoff_max`).
+    """
+    row.attempts += 1
+    row.last_error = str(exc)[:1000]
+    delay = min(backoff * 2 ** (row.attempts - 1), backoff_max)
+    row.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    row.save(update_fields=['attempts', 'last_error', 'next_attempt_at'])
+
+
+def give_up(row, exc):
+    """
+    Record a last failed attempt and set the row's failed_at, after which
+    the consumer skips it.
+    """
+    row.attempts += 1
+    row.last_error = str(exc)[:1000]
+    row.next_attempt_at = None
+    row.failed_at = timezone.now()
+    row.save(update_fields=['attempts', 'last_error', 'next_attempt_at', 'failed_at'])
+
+
+def outbox_stats(queryset, **aggregates):
+    """
+    The `aggregates` of an outbox plus the age of its oldest row, for monitoring.
+    """
+    stats = queryset.aggregate(**aggregates, oldest=Min('created_at'))
+    oldest = stats.pop('oldest')
+    stats['oldest_age_seconds'] = (timezone.now() - oldest).total_seconds() if oldest else 0
+    return stats
+
@@ -0,0 +1,13 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class ListCursorPagination(CursorPagination):
+    """
+    Cursor pagination in primary key order, so each page is one index range
+    scan whatever the offset, and pages stay stable while rows are added.
+    """
+    ordering = 'id'
+    page_size = settings.LIST_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.LIST_MAX_PAGE_SIZE
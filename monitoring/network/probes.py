@@ -0,0 +1,321 @@
+import asyncio
+import socket
+import struct
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def alive(ip):
+    """
+    Test if a host is reachable.
+    Returns True if the host is reachable, False otherwise.
+    """
+    command = ["fping", ip]
+    result = subprocess.run(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    return result.returncode == 0
+
+
+class ProbeResult(namedtuple('ProbeResult', ['alive', 'rtt_min', 'rtt_avg', 'rtt_max', 'loss', 'jitter'])):
+    """
+    Outcome of probing one host with several echo requests. RTTs and jitter
+    (mean difference between consecutive RTTs) are in microseconds, loss in
+    percent of the requests sent. Metrics that could not be measured, e.g.
+    every RTT of a host that did not answer, are None.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_rtts(cls, sent, rtts):
+        """
+        Build a result from the number of requests sent and the RTTs (in
+        seconds) of the replies, in the order they were sent.
+        """
+        if not sent:
+            return NO_REPLY
+        loss = round(100 * (sent - len(rtts)) / sent)
+        if not rtts:
+            return cls(False, None, None, None, loss, None)
+        micros = [round(rtt * 1_000_000) for rtt in rtts]
+        jitter = None
+        if len(micros) > 1:
+            jitter = round(sum(abs(b - a) for a, b in zip(micros, micros[1:])) / (len(micros) - 1))
+        return cls(True, min(micros), round(sum(micros) / len(micros)), max(micros), loss, jitter)
+
+
+# Result of a host that could not be probed at all.
+NO_REPLY = ProbeResult(False, None, None, None, None, None)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _parse_fping_counts(output, results, count):
+    """
+    Parse the per-target summary lines of `fping -C <count> -q` into results:
+    "<ip> : 0.51 0.48 - 0.55", one RTT in milliseconds or "-" per request.
+    """
+    for line in output.splitlines():
+        target, separator, samples = line.partition(" : ")
+        target = target.strip()
+        if not separator or target not in results:
+            continue
+        rtts = []
+        for sample in samples.split():
+            try:
+                rtts.append(float(sample) / 1000)
+            except ValueError:
+                continue
+        results[target] = ProbeResult.from_rtts(count, rtts)
+
+
+def _fping_chunk(ips):
+    """
+    Run a single fping process over a chunk of targets (fed on stdin)
+    and return a dict mapping each target to a ProbeResult.
+
+    Every target gets PROBE_COUNT echo requests (fping -C), and fping prints
+    one line per target with the RTT of each request (see
+    _parse_fping_counts). Targets fping could not resolve or probe are
+    reported as down without metrics.
+    """
+    count = max(1, settings.PROBE_COUNT)
+    command = [
+        "fping",
+        "-C", str(count),
+        "-q",
+        "-p", str(settings.PROBE_PERIOD_MS),
+        "-r", str(settings.PING_SWEEP_RETRIES),
+        "-t", str(settings.PING_SWEEP_TIMEOUT_MS),
+        "-i", str(settings.PING_SWEEP_INTERVAL_MS),
+    ]
+    results = dict.fromkeys(ips, NO_REPLY)
+    try:
+        completed = subprocess.run(
+            command,
+            input="\n".join(ips),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=settings.PING_SWEEP_CHUNK_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        logger.error(f"fping sweep of {len(ips)} hosts failed: {exc}")
+        return results
+
+    # Exit codes 0 (all alive), 1 (some unreachable) and 2 (some unknown)
+    # still produce per-target output; 3 and 4 mean fping itself failed.
+    if completed.returncode > 2:
+        logger.error(f"fping exited with {completed.returncode}: {completed.stderr.strip()}")
+
+    # The -C summary goes to stderr, between any ICMP error messages.
+    _parse_fping_counts(completed.stderr, results, count)
+    return results
+
+
+def fping_sweep(ips, chunk_size=None, workers=None):
+    """
+    Ping many hosts using one fping invocation per chunk of targets instead
+    of one process per host. Chunks run concurrently (bounded by `workers`).
+    Returns a dict mapping every requested ip to its ProbeResult.
+    """
+    ips = list(dict.fromkeys(ips))
+    if not ips:
+        return {}
+    chunk_size = chunk_size or settings.PING_SWEEP_CHUNK_SIZE
+    workers = workers or settings.PING_SWEEP_WORKERS
+
+    results = {}
+    chunks = list(_chunks(ips, chunk_size))
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        for chunk_result in executor.map(_fping_chunk, chunks):
+            results.update(chunk_result)
+    return results
+
+
+# -----------------------------
+# PROBER BACKENDS
+# -----------------------------
+
+class Prober:
+    """
+    Base class for reachability backends.
+    Subclasses implement probe_many(), which takes a list of IP addresses and
+    returns a dict mapping each of them to a ProbeResult.
+    """
+    name = None
+
+    def probe_many(self, ips):
+        raise NotImplementedError
+
+
+class FpingProber(Prober):
+    """
+    Probe hosts with the batched fping sweep.
+    """
+    name = 'fping'
+
+    def probe_many(self, ips):
+        return fping_sweep(ips)
+
+
+def _icmp_checksum(data):
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class AsyncProber(Prober):
+    """
+    In-process asyncio prober that keeps up to `concurrency` probes in flight.
+
+    Uses unprivileged ICMP datagram sockets (SOCK_DGRAM/IPPROTO_ICMP) when the
+    kernel allows them (see net.ipv4.ping_group_range); otherwise falls back to
+    a TCP connect probe, where either an accepted or a refused connection means
+    the host is up.
+
+    Each host gets `count` probes, PROBE_PERIOD_MS apart, and the time each
+    one takes to succeed is its RTT (for TCP, the connection handshake). A
+    host holds its concurrency slot until all its probes are done.
+
+    `probe` may be given a coroutine function `probe(ip) -> bool` to replace
+    the network probe, e.g. a local fake for benchmarks.
+    """
+    name = 'async'
+    _icmp_supported = {}
+
+    def __init__(self, concurrency=None, timeout=None, tcp_ports=None, probe=None, count=None):
+        self.concurrency = concurrency or settings.PROBE_CONCURRENCY
+        self.timeout = timeout or settings.PROBE_TIMEOUT
+        self.tcp_ports = tcp_ports or settings.PROBE_TCP_PORTS
+        self.count = max(1, count or settings.PROBE_COUNT)
+        if probe is not None:
+            self.probe = probe
+
+    def probe_many(self, ips):
+        ips = list(dict.fromkeys(ips))
+        if not ips:
+            return {}
+        return asyncio.run(self.probe_all(ips))
+
+    async def probe_all(self, ips):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(ip):
+            async with semaphore:
+                return ip, await self.measure(ip)
+
+        return dict(await asyncio.gather(*(run(ip) for ip in ips)))
+
+    async def measure(self, ip):
+        """
+        Probe a host `count` times and time the successful probes.
+        """
+        loop = asyncio.get_running_loop()
+        rtts = []
+        for i in range(self.count):
+            if i:
+                await asyncio.sleep(settings.PROBE_PERIOD_MS / 1000)
+            started = loop.time()
+            try:
+                if await asyncio.wait_for(self.probe(ip), self.timeout):
+                    rtts.append(loop.time() - started)
+            except (asyncio.TimeoutError, OSError, ValueError):
+                continue
+        return ProbeResult.from_rtts(self.count, rtts)
+
+    async def probe(self, ip):
+        family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+        if self.icmp_supported(family):
+            return await self.icmp_probe(ip, family)
+        return await self.tcp_probe(ip)
+
+    @classmethod
+    def icmp_supported(cls, family):
+        """
+        Check (once per process and address family) whether this process may
+        open an unprivileged ICMP datagram socket.
+        """
+        if family not in cls._icmp_supported:
+            proto = socket.IPPROTO_ICMPV6 if family == socket.AF_INET6 else socket.IPPROTO_ICMP
+            try:
+                socket.socket(family, socket.SOCK_DGRAM, proto).close()
+                cls._icmp_supported[family] = True
+            except OSError:
+                logger.info("ICMP datagram sockets unavailable; using TCP connect probes")
+                cls._icmp_supported[family] = False
+        return cls._icmp_supported[family]
+
+    async def icmp_probe(self, ip, family):
+        """
+        Send one ICMP echo request and wait for the matching echo reply.
+        The kernel rewrites the identifier and filters replies per socket,
+        so any echo reply read from this socket answers our request.
+        """
+        if family == socket.AF_INET6:
+            proto, request_type, reply_type = socket.IPPROTO_ICMPV6, 128, 129
+        else:
+            proto, request_type, reply_type = socket.IPPROTO_ICMP, 8, 0
+
+        loop = asyncio.get_running_loop()
+        with socket.socket(family, socket.SOCK_DGRAM, proto) as sock:
+            sock.setblocking(False)
+            sock.connect((ip, 0))
+            payload = b"inethi-monitoring"
+            header = struct.pack("!BBHHH", request_type, 0, 0, 0, 1)
+            checksum = _icmp_checksum(header + payload)
+            packet = struct.pack("!BBHHH", request_type, 0, checksum, 0, 1) + payload
+            await loop.sock_sendall(sock, packet)
+            while True:
+                data = await loop.sock_recv(sock, 1024)
+                if data and data[0] == reply_type:
+                    return True
+
+    async def tcp_probe(self, ip):
+        """
+        Try to open a TCP connection to each configured port in turn.
+        A completed handshake or an RST (connection refused) both prove the
+        host is up; timeouts and unreachable errors move on to the next port.
+        """
+        for port in self.tcp_ports:
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(ip, port), self.timeout / len(self.tcp_ports)
+                )
+            except ConnectionRefusedError:
+                return True
+            except (asyncio.TimeoutError, OSError):
+                continue
+            writer.close()
+            return True
+        return False
+
+
+PROBERS = {
+    FpingProber.name: FpingProber,
+    AsyncProber.name: AsyncProber,
+}
+
+
+def get_prober(name=None):
+    """
+    Return an instance of the configured prober backend (PROBE_BACKEND).
+    """
+    name = name or settings.PROBE_BACKEND
+    try:
+        return PROBERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown probe backend: {name}")
@@ -0,0 +1,128 @@
+import csv
+import io
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Ping
+from .probes import NO_REPLY
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _copy_pings(pings):
+    """
+    Stream Ping rows into the table with PostgreSQL COPY, which is much cheaper
+    than INSERT for very large sweeps.
+    """
+    table = connection.ops.quote_name(Ping._meta.db_table)
+    columns = ["host_id", "network_id", "is_alive", "timestamp", *Ping.METRIC_FIELDS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for ping in pings:
+        # An unquoted empty field is NULL in COPY's csv format.
+        writer.writerow([
+            ping.host_id,
+            "" if ping.network_id is None else ping.network_id,
+            "t" if ping.is_alive else "f",
+            ping.timestamp.isoformat(),
+            *("" if value is None else value for value in (getattr(ping, field) for field in Ping.METRIC_FIELDS)),
+        ])
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+def _state_key(host_id):
+    return f"host_state:{host_id}"
+
+
+def select_changes(pings, now):
+    """
+    Change-only storage: keep only pings that are a state transition for
+    their host, or whose host has not been persisted for PING_HEARTBEAT_SECONDS.
+    Each host's last persisted (is_alive, epoch seconds) lives in the cache;
+    a host with no cached state (cold cache, expired entry) is persisted.
+    Returns (pings to write, cache entries to set once they are committed).
+    """
+    states = cache.get_many([_state_key(ping.host_id) for ping in pings])
+    epoch = now.timestamp()
+    selected = []
+    new_states = {}
+    for ping in pings:
+        key = _state_key(ping.host_id)
+        state = states.get(key)
+        if (
+            state is None
+            or state[0] != ping.is_alive
+            or epoch - state[1] >= settings.PING_HEARTBEAT_SECONDS
+        ):
+            selected.append(ping)
+            new_states[key] = (ping.is_alive, epoch)
+    return selected, new_states
+
+
+def record_pings(hosts, results):
+    """
+    Persist one sweep's results in a single transaction.
+
+    `hosts` is the list of swept Host objects and `results` maps each host's
+    IP address to its ProbeResult (network/probes.py), whose latency and loss
+    are stored with the state. Rows are written with bulk_create in batches of
+    PING_BULK_BATCH_SIZE, or with COPY once a sweep reaches PING_COPY_THRESHOLD
+    rows on PostgreSQL. Returns the list of Ping objects written (without
+    primary keys when COPY is used).
+
+    With PING_STORAGE_MODE = "changes", only state transitions and periodic
+    heartbeats are written (see select_changes).
+    """
+    now = timezone.now()
+    pings = []
+    for host in hosts:
+        result = results.get(host.ip_address, NO_REPLY)
+        pings.append(Ping(
+            host_id=host.id,
+            network_id=host.network_id,
+            is_alive=result.alive,
+            timestamp=now,
+            rtt_min=result.rtt_min,
+            rtt_avg=result.rtt_avg,
+            rtt_max=result.rtt_max,
+            loss=result.loss,
+            jitter=result.jitter,
+        ))
+    new_states = {}
+    if settings.PING_STORAGE_MODE == "changes":
+        swept = len(pings)
+        pings, new_states = select_changes(pings, now)
+        logger.info(f"Change-only storage: writing {len(pings)} of {swept} ping results")
+    if not pings:
+        return pings
+
+    use_copy = (
+        connection.vendor == "postgresql"
+        and settings.PING_COPY_THRESHOLD
+        and len(pings) >= settings.PING_COPY_THRESHOLD
+    )
+    started = time.monotonic()
+    with transaction.atomic():
+        if use_copy:
+            _copy_pings(pings)
+        else:
+            Ping.objects.bulk_create(pings, batch_size=settings.PING_BULK_BATCH_SIZE)
+        if new_states:
+            # Only remember what was actually committed.
+            transaction.on_commit(lambda: cache.set_many(
+                new_states, timeout=settings.PING_HEARTBEAT_SECONDS * 2
+            ))
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Recorded {len(pings)} pings with {'COPY' if use_copy else 'bulk_create'} "
+        f"in {elapsed:.3f}s"
+    )
+    return pings
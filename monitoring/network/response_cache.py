@@ -0,0 +1,108 @@
+"""
+Per-user caching of the network and host list/detail responses.
+
+Cached responses live in the default (Redis) cache under keys that carry the
+user's current version number:
+
+    api_response:<user id>:<version>:<view>:<sha1 of the absolute URI>
+
+Any change to one of the user's networks or hosts bumps the version after
+the transaction commits (see network/signals.py and the bulk and cloud sync
+writes, which bypass model signals), so later requests miss and stale entries
+are simply never read again until API_CACHE_TTL expires them. A version
+that was evicted restarts from the current time in milliseconds, never from
+a number already used.
+
+Only 200 responses are cached, as response.data, so every renderer and
+?format= still works on a hit. Hits and misses are counted for /metrics/.
+"""
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+HITS_KEY = "api_response:hits"
+MISSES_KEY = "api_response:misses"
+
+
+def _version_key(user_id):
+    return f"api_response_version:{user_id}"
+
+
+def _new_version():
+    return time.time_ns() // 1_000_000
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def user_version(user_id):
+    return cache.get_or_set(_version_key(user_id), _new_version, timeout=None)
+
+
+def invalidate_user(*user_ids):
+    """
+    Drop the cached responses of the given users once the current
+    transaction commits (or right away outside of one).
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+
+    def bump():
+        for user_id in user_ids:
+            try:
+                cache.incr(_version_key(user_id))
+            except ValueError:
+                cache.set(_version_key(user_id), _new_version(), timeout=None)
+
+    if user_ids:
+        transaction.on_commit(bump)
+
+
+def response_key(view, request):
+    uri = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    user_id = request.user.pk
+    return f"api_response:{user_id}:{user_version(user_id)}:{type(view).__name__}:{uri}"
+
+
+def cached_response(method):
+    """
+    Serve a view's GET from the per-user response cache, and cache its 200
+    responses for API_CACHE_TTL seconds (0 disables caching).
+    """
+    @wraps(method)
+    def get(view, request, *args, **kwargs):
+        if not settings.API_CACHE_TTL:
+            return method(view, request, *args, **kwargs)
+        key = response_key(view, request)
+        data = cache.get(key)
+        if data is not None:
+            _count(HITS_KEY)
+            return Response(data, status=status.HTTP_200_OK, headers={'X-Cache': 'hit'})
+        _count(MISSES_KEY)
+        response = method(view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=settings.API_CACHE_TTL)
+            response['X-Cache'] = 'miss'
+        return response
+    return get
+
+
+def response_cache_stats():
+    """
+    Hit and miss counts of the response cache since the counters were created.
+    """
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else None,
+    }
@@ -0,0 +1,182 @@
+"""
+Chunked pruning of old pings, with optional archival to local files.
+
+Pings older than the cutoff are walked in primary key order: each chunk is
+the next `batch_size` old rows after the previous chunk, below the first id
+that is still inside the horizon, so every chunk is an index range scan and
+never revisits rows already deleted. A chunk is deleted by its id range in
+one short statement, with a pause between chunks, which keeps locks, WAL
+bursts and replication lag bounded.
+
+With an archive directory each chunk is first written to its own file,
+pings-<first id>-<last id>.csv.gz or .parquet, and only deleted once the file
+is complete on disk. Parquet needs the optional `pyarrow` package; without it
+archives are written as gzipped CSV.
+"""
+import csv
+import gzip
+import io
+import os
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+from .models import Ping
+import logging
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Timestamps after the cutoff first searched for the horizon boundary.
+BOUNDARY_WINDOW = timedelta(hours=1)
+ARCHIVE_COLUMNS = ('id', 'host_id', 'network_id', 'is_alive', 'timestamp', *Ping.METRIC_FIELDS)
+_warned_no_pyarrow = False
+
+
+def archive_format(requested):
+    """
+    The archive format to use for `requested` ("csv" or "parquet").
+    """
+    global _warned_no_pyarrow
+    if requested == "parquet" and pyarrow is None:
+        if not _warned_no_pyarrow:
+            logger.warning("pyarrow is not installed; archiving pings as gzipped CSV instead")
+            _warned_no_pyarrow = True
+        return "csv"
+    if requested not in ("csv", "parquet"):
+        raise ValueError(f"Unknown archive format: {requested}")
+    return requested
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _write_csv(path, rows):
+    with open(path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as compressed:
+            text = io.TextIOWrapper(compressed, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(ARCHIVE_COLUMNS)
+            for row in rows:
+                writer.writerow([_csv_value(value) for value in row])
+            text.flush()
+            text.detach()
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _write_parquet(path, rows):
+    columns = list(zip(*rows))
+    schema = pyarrow.schema([
+        ('id', pyarrow.int64()),
+        ('host_id', pyarrow.int64()),
+        ('network_id', pyarrow.int64()),
+        ('is_alive', pyarrow.bool_()),
+        ('timestamp', pyarrow.timestamp('us', tz='UTC')),
+        ('rtt_min', pyarrow.int32()),
+        ('rtt_avg', pyarrow.int32()),
+        ('rtt_max', pyarrow.int32()),
+        ('loss', pyarrow.int16()),
+        ('jitter', pyarrow.int32()),
+    ])
+    table = pyarrow.Table.from_arrays([pyarrow.array(column, type=field.type)
+                                       for column, field in zip(columns, schema)], schema=schema)
+    pyarrow.parquet.write_table(table, path, compression='zstd')
+    with open(path, 'rb') as written:
+        os.fsync(written.fileno())
+
+
+def archive_chunk(rows, directory, file_format):
+    """
+    Write one chunk of ARCHIVE_COLUMNS rows to its own file in `directory`,
+    via a temporary file so a partial archive never has the final name.
+    Returns the path.
+    """
+    extension = 'parquet' if file_format == 'parquet' else 'csv.gz'
+    path = os.path.join(directory, f"pings-{rows[0][0]}-{rows[-1][0]}.{extension}")
+    partial = f"{path}.partial"
+    if file_format == 'parquet':
+        _write_parquet(partial, rows)
+    else:
+        _write_csv(partial, rows)
+    os.replace(partial, path)
+    return path
+
+
+def _horizon_boundary(cutoff):
+    """
+    The smallest id of the pings just inside the horizon, which bounds the
+    walk since ids grow with time; old pings committed late beyond it are
+    left for the next run. Only a window of timestamps after `cutoff` is
+    scanned, widened until it holds a ping, instead of every newer ping.
+    """
+    window = BOUNDARY_WINDOW
+    now = timezone.now()
+    while True:
+        pings = Ping.objects.filter(timestamp__gte=cutoff)
+        if cutoff + window <= now:
+            pings = pings.filter(timestamp__lt=cutoff + window)
+        boundary = pings.aggregate(boundary=Min('id'))['boundary']
+        if boundary is not None or cutoff + window > now:
+            return boundary
+        window *= 2
+
+
+def prune_pings(cutoff, batch_size=None, sleep=None, archive_dir=None, file_format="csv",
+                dry_run=False, progress=None):
+    """
+    Delete (and with `archive_dir`, archive first) the pings older than
+    `cutoff` in chunks of `batch_size` rows, sleeping `sleep` seconds between
+    chunks. `progress(pruned, last_timestamp, elapsed)` is called after every
+    chunk. With `dry_run` the chunks are only counted. Returns the number of
+    pings pruned.
+    """
+    batch_size = batch_size or settings.PING_RETENTION_DELETE_BATCH
+    sleep = settings.PING_RETENTION_SLEEP if sleep is None else sleep
+    if archive_dir:
+        file_format = archive_format(file_format)
+        if not dry_run:
+            os.makedirs(archive_dir, exist_ok=True)
+
+    boundary = _horizon_boundary(cutoff)
+    pings = Ping.objects.filter(timestamp__lt=cutoff)
+    if boundary is not None:
+        pings = pings.filter(id__lt=boundary)
+
+    columns = ARCHIVE_COLUMNS if archive_dir else ('id', 'timestamp')
+    started = time.monotonic()
+    pruned = 0
+    last_id = 0
+    while True:
+        rows = list(pings.filter(id__gt=last_id).order_by('id').values_list(*columns)[:batch_size])
+        if not rows:
+            break
+        first_id, last_id = rows[0][0], rows[-1][0]
+        if not dry_run:
+            if archive_dir:
+                archive_chunk(rows, archive_dir, file_format)
+            pings.filter(id__gte=first_id, id__lte=last_id).delete()
+        pruned += len(rows)
+        if progress:
+            progress(pruned, rows[-1][columns.index('timestamp')], time.monotonic() - started)
+        if len(rows) < batch_size:
+            break
+        if sleep and not dry_run:
+            time.sleep(sleep)
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"{'Would prune' if dry_run else 'Pruned'} {pruned} pings older than {cutoff.isoformat()} "
+        f"in {elapsed:.1f}s ({pruned / elapsed if elapsed else 0:.0f} rows/s)"
+        + (f", archived to {archive_dir} as {file_format}" if archive_dir and not dry_run else "")
+    )
+    return pruned
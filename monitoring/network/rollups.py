@@ -0,0 +1,327 @@
+"""
+Incremental uptime rollups.
+
+Pings after the RollupCursor are folded into per-host minute/hour/day buckets
+(HostUptimeRollup) by merging each batch into the existing rows. The network
+buckets touched by a batch (NetworkUptimeRollup) are then recomputed from
+their host rows, so dashboards read a handful of rows instead of raw pings.
+
+Uptime is weighted by time, not by records: a record's state holds until
+the next record of the same host, for at most PING_STATE_VALID_SECONDS, and
+those seconds are added to every bucket they overlap (alive_seconds and
+known_seconds). This gives the same uptime whether a host was stored every
+sweep, only on changes (PING_STORAGE_MODE = "changes") or probed at its own
+adaptive interval. A record's seconds are added once the host's next record
+is rolled up, so the latest state of each host is not counted yet; the
+previous record is carried across batches through the minute rollups.
+
+An outage runs from a host's first down ping to its next alive ping. The
+longest outage of a bucket counts only the part inside the bucket, and the
+network's longest outage is the longest of its hosts. Latency, jitter and
+loss are kept as sums and counts of the pings that measured them, which add
+up across batches and hosts. alive_count and total_count count stored
+records, not sweeps.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, OuterRef, Subquery, Sum
+from django.utils import timezone
+from .models import HostUptimeRollup, NetworkUptimeRollup, Ping, RollupCursor
+import logging
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {
+    '1m': timedelta(minutes=1),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+
+# Additive metric columns of a bucket (see UptimeRollup).
+METRIC_COUNTS = ('rtt_count', 'rtt_sum', 'jitter_count', 'jitter_sum', 'loss_count', 'loss_sum')
+
+
+def bucket_start(timestamp, granularity):
+    if granularity == '1m':
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == '1h':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _previous_records(host_ids, since):
+    """
+    Each host's last record rolled up before the batch, as
+    (timestamp, is_alive, outage start), from its latest minute rollup.
+    Hosts without a recent record (e.g. after the sweeper was stopped) still
+    owe the held time of their last one, so the lookup is not limited to
+    PING_STATE_VALID_SECONDS.
+    """
+    latest_bucket = (
+        HostUptimeRollup.objects.filter(
+            host_id=OuterRef('host_id'), granularity='1m', last_ping_at__isnull=False, bucket__lte=since,
+        )
+        .order_by('-bucket')
+        .values('bucket')[:1]
+    )
+    rows = (
+        HostUptimeRollup.objects.filter(host_id__in=host_ids, granularity='1m', bucket=Subquery(latest_bucket))
+        .values_list('host_id', 'last_ping_at', 'outage_started_at')
+    )
+    # A host's last record is down exactly when its outage is still ongoing.
+    return {
+        host_id: (last_ping_at, outage_started_at is None, outage_started_at)
+        for host_id, last_ping_at, outage_started_at in rows
+    }
+
+
+def _bucket(buckets, host_id, granularity, start, network_id):
+    bucket = buckets.setdefault((host_id, granularity, start), {
+        'network_id': network_id,
+        'alive_count': 0,
+        'total_count': 0,
+        'alive_seconds': 0.0,
+        'known_seconds': 0.0,
+        'first_seen': None,
+        'last_seen': None,
+        'longest_outage': 0,
+        **dict.fromkeys(METRIC_COUNTS, 0),
+        'rtt_max': None,
+        'outage_started_at': None,
+        'last_ping_at': None,
+    })
+    bucket['network_id'] = network_id
+    return bucket
+
+
+def _add_held_time(buckets, host_id, network_id, start, end, is_alive, outage):
+    """
+    Add the seconds of [start, end) in which the host was in one state to
+    every bucket they overlap, and extend those buckets' longest outage.
+    """
+    for granularity, width in GRANULARITIES.items():
+        bucket_from = bucket_start(start, granularity)
+        while bucket_from < end:
+            bucket_to = bucket_from + width
+            bucket = _bucket(buckets, host_id, granularity, bucket_from, network_id)
+            seconds = (min(end, bucket_to) - max(start, bucket_from)).total_seconds()
+            bucket['known_seconds'] += seconds
+            if is_alive:
+                bucket['alive_seconds'] += seconds
+            if outage is not None:
+                outage_seconds = int((min(end, bucket_to) - max(outage, bucket_from)).total_seconds())
+                bucket['longest_outage'] = max(bucket['longest_outage'], outage_seconds)
+            bucket_from = bucket_to
+
+
+def accumulate(rows):
+    """
+    Aggregate (host_id, network_id, is_alive, timestamp, rtt_avg, rtt_max,
+    loss, jitter) rows into per-host bucket dicts keyed by
+    (host_id, granularity, bucket).
+    """
+    rows = sorted(rows, key=lambda row: row[3])
+    previous = _previous_records({row[0] for row in rows}, rows[0][3]) if rows else {}
+    outage_start = {host_id: outage for host_id, (_, _, outage) in previous.items() if outage}
+    valid_for = timedelta(seconds=settings.PING_STATE_VALID_SECONDS)
+    buckets = {}
+    for host_id, network_id, is_alive, timestamp, rtt_avg, rtt_max, loss, jitter in rows:
+        last = previous.get(host_id)
+        # Pings committed late, behind the host's last record, only add counts.
+        in_order = last is None or timestamp > last[0]
+        if last is not None and in_order:
+            held_until = min(timestamp, last[0] + valid_for)
+            _add_held_time(buckets, host_id, network_id, last[0], held_until, last[1], outage_start.get(host_id))
+        if is_alive:
+            outage = outage_start.pop(host_id, None)
+        else:
+            outage = outage_start.setdefault(host_id, timestamp)
+        if in_order:
+            previous[host_id] = (timestamp, is_alive, outage)
+        for granularity in GRANULARITIES:
+            start = bucket_start(timestamp, granularity)
+            bucket = _bucket(buckets, host_id, granularity, start, network_id)
+            bucket['total_count'] += 1
+            if is_alive:
+                bucket['alive_count'] += 1
+                bucket['first_seen'] = bucket['first_seen'] or timestamp
+                bucket['last_seen'] = timestamp
+            if rtt_avg is not None:
+                bucket['rtt_count'] += 1
+                bucket['rtt_sum'] += rtt_avg
+                bucket['rtt_max'] = max(bucket['rtt_max'] or 0, rtt_max or rtt_avg)
+            if jitter is not None:
+                bucket['jitter_count'] += 1
+                bucket['jitter_sum'] += jitter
+            if loss is not None:
+                bucket['loss_count'] += 1
+                bucket['loss_sum'] += loss
+            if outage is not None:
+                seconds = int((timestamp - max(outage, start)).total_seconds())
+                bucket['longest_outage'] = max(bucket['longest_outage'], seconds)
+            bucket['outage_started_at'] = outage_start.get(host_id)
+            bucket['last_ping_at'] = timestamp
+    return buckets
+
+
+def merge_host_buckets(buckets):
+    """
+    Add accumulated buckets onto the existing HostUptimeRollup rows.
+    """
+    existing = {}
+    for granularity in GRANULARITIES:
+        keys = [key for key in buckets if key[1] == granularity]
+        if not keys:
+            continue
+        for row in HostUptimeRollup.objects.filter(
+            granularity=granularity,
+            host_id__in={key[0] for key in keys},
+            bucket__gte=min(key[2] for key in keys),
+            bucket__lte=max(key[2] for key in keys),
+        ):
+            existing[(row.host_id, row.granularity, row.bucket)] = row
+
+    to_create, to_update = [], []
+    for (host_id, granularity, start), values in buckets.items():
+        row = existing.get((host_id, granularity, start))
+        if row is None:
+            to_create.append(HostUptimeRollup(host_id=host_id, granularity=granularity, bucket=start, **values))
+            continue
+        row.network_id = values['network_id']
+        row.alive_count += values['alive_count']
+        row.total_count += values['total_count']
+        row.alive_seconds += values['alive_seconds']
+        row.known_seconds += values['known_seconds']
+        row.first_seen = min(filter(None, [row.first_seen, values['first_seen']]), default=None)
+        row.last_seen = max(filter(None, [row.last_seen, values['last_seen']]), default=None)
+        row.longest_outage = max(row.longest_outage, values['longest_outage'])
+        for field in METRIC_COUNTS:
+            setattr(row, field, getattr(row, field) + values[field])
+        row.rtt_max = max(filter(None, [row.rtt_max, values['rtt_max']]), default=None)
+        if values['last_ping_at'] and (row.last_ping_at is None or values['last_ping_at'] >= row.last_ping_at):
+            row.outage_started_at = values['outage_started_at']
+            row.last_ping_at = values['last_ping_at']
+        to_update.append(row)
+
+    HostUptimeRollup.objects.bulk_create(to_create, batch_size=1000)
+    HostUptimeRollup.objects.bulk_update(
+        to_update,
+        ['network', 'alive_count', 'total_count', 'alive_seconds', 'known_seconds', 'first_seen', 'last_seen',
+         'longest_outage', *METRIC_COUNTS, 'rtt_max', 'outage_started_at', 'last_ping_at'],
+        batch_size=1000,
+    )
+
+
+def refresh_network_buckets(keys):
+    """
+    Recompute the (network_id, granularity, bucket) rollups from their host rows.
+    """
+    rows = []
+    for granularity in GRANULARITIES:
+        network_ids = {key[0] for key in keys if key[1] == granularity}
+        buckets = {key[2] for key in keys if key[1] == granularity}
+        if not network_ids:
+            continue
+        aggregates = (
+            HostUptimeRollup.objects.filter(
+                granularity=granularity, network_id__in=network_ids, bucket__in=buckets,
+            )
+            .values('network_id', 'bucket')
+            .annotate(
+                alive=Sum('alive_count'),
+                total=Sum('total_count'),
+                alive_seconds=Sum('alive_seconds'),
+                known_seconds=Sum('known_seconds'),
+                first=Min('first_seen'),
+                last=Max('last_seen'),
+                outage=Max('longest_outage'),
+                rtt_peak=Max('rtt_max'),
+                **{field: Sum(field) for field in METRIC_COUNTS},
+            )
+        )
+        for aggregate in aggregates:
+            if (aggregate['network_id'], granularity, aggregate['bucket']) not in keys:
+                continue
+            rows.append(NetworkUptimeRollup(
+                network_id=aggregate['network_id'],
+                granularity=granularity,
+                bucket=aggregate['bucket'],
+                alive_count=aggregate['alive'],
+                total_count=aggregate['total'],
+                alive_seconds=aggregate['alive_seconds'],
+                known_seconds=aggregate['known_seconds'],
+                first_seen=aggregate['first'],
+                last_seen=aggregate['last'],
+                longest_outage=aggregate['outage'],
+                rtt_max=aggregate['rtt_peak'],
+                **{field: aggregate[field] for field in METRIC_COUNTS},
+            ))
+    NetworkUptimeRollup.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['network', 'granularity', 'bucket'],
+        update_fields=['alive_count', 'total_count', 'alive_seconds', 'known_seconds', 'first_seen', 'last_seen',
+                       'longest_outage', *METRIC_COUNTS, 'rtt_max'],
+    )
+
+
+def roll_up_next_batch():
+    """
+    Fold the next ROLLUP_BATCH_SIZE pings after the cursor into the rollups
+    and advance the cursor, all in one transaction. Returns the number of
+    pings rolled up, or None if another worker holds the cursor.
+
+    Pings younger than CLOUD_EXPORT_SETTLE_SECONDS are left for the next run
+    so that sweeps still committing cannot slip in behind the cursor, and
+    only pings from CURSOR_TIMESTAMP_MARGIN_SECONDS before the cursor's
+    timestamp are scanned.
+    """
+    RollupCursor.objects.get_or_create(pk=1)
+    settled = timezone.now() - timedelta(seconds=settings.CLOUD_EXPORT_SETTLE_SECONDS)
+    with transaction.atomic():
+        cursor = RollupCursor.objects.select_for_update(skip_locked=True).filter(pk=1).first()
+        if cursor is None:
+            return None
+        pings = Ping.objects.filter(id__gt=cursor.last_ping_id, timestamp__lte=settled)
+        if cursor.last_timestamp is not None:
+            pings = pings.filter(
+                timestamp__gte=cursor.last_timestamp - timedelta(seconds=settings.CURSOR_TIMESTAMP_MARGIN_SECONDS)
+            )
+        rows = list(
+            pings.order_by('id')
+            .values_list(
+                'id', 'host_id', 'network_id', 'is_alive', 'timestamp', 'rtt_avg', 'rtt_max', 'loss', 'jitter',
+            )[:settings.ROLLUP_BATCH_SIZE]
+        )
+        if not rows:
+            return 0
+        buckets = accumulate([row[1:] for row in rows])
+        merge_host_buckets(buckets)
+        refresh_network_buckets({
+            (values['network_id'], granularity, start)
+            for (_, granularity, start), values in buckets.items()
+            if values['network_id'] is not None
+        })
+        cursor.last_ping_id = rows[-1][0]
+        cursor.last_timestamp = rows[-1][4]
+        cursor.save(update_fields=['last_ping_id', 'last_timestamp', 'updated_at'])
+    return len(rows)
+
+
+def prune_rollups():
+    """
+    Delete minute and hour rollups past ROLLUP_MINUTE_RETENTION_DAYS and
+    ROLLUP_HOUR_RETENTION_DAYS; day rollups are kept.
+    """
+    now = timezone.now()
+    deleted = 0
+    for granularity, days in (('1m', settings.ROLLUP_MINUTE_RETENTION_DAYS),
+                              ('1h', settings.ROLLUP_HOUR_RETENTION_DAYS)):
+        if not days:
+            continue
+        cutoff = now - timedelta(days=days)
+        for model in (HostUptimeRollup, NetworkUptimeRollup):
+            deleted += model.objects.filter(granularity=granularity, bucket__lt=cutoff).delete()[0]
+    return deleted
@@ -0,0 +1,143 @@
+"""
+Adaptive per-host probe scheduling (PING_SCHEDULER = "adaptive").
+
+Instead of sweeping every host on the minute, each host has its own next-due
+time in a Redis sorted set (host id scored by epoch seconds). A short
+periodic tick pops the due hosts and probes only those, so load is spread
+evenly over time.
+
+- Interval: PROBE_DEVICE_INTERVALS per device type (critical devices such as
+  firewalls and DNS servers more often), else PROBE_INTERVAL.
+- Backoff: a host that is up doubles its interval every PROBE_BACKOFF_AFTER
+  unchanged results, up to PROBE_MAX_INTERVAL.
+- Confirmation: an up host that fails a probe is re-probed PROBE_CONFIRMATIONS
+  times, PROBE_CONFIRM_INTERVAL seconds apart, before it is recorded as down.
+
+Per-host state lives in a Redis hash (host id -> "<alive>:<streak>:<pending>":
+last recorded state 1/0/- for unknown, unchanged results in a row, and
+confirmation probes done). Losing Redis only resets the schedule.
+"""
+import random
+import time
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import RedisError
+from .models import Host
+from .probes import NO_REPLY
+from .status import get_redis
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_KEY = "probe_schedule"
+STATE_KEY = "probe_state"
+SYNC_MARKER_KEY = "probe_schedule:synced"
+
+
+def base_interval(device_type):
+    return settings.PROBE_DEVICE_INTERVALS.get(device_type, settings.PROBE_INTERVAL)
+
+
+def _decode_state(value):
+    if value is None:
+        return None, 0, 0
+    alive, streak, pending = value.decode().split(":")
+    return (None if alive == "-" else alive == "1"), int(streak), int(pending)
+
+
+def _encode_state(alive, streak, pending):
+    return f"{'-' if alive is None else int(alive)}:{streak}:{pending}"
+
+
+def next_interval(device_type, alive, streak):
+    base = base_interval(device_type)
+    if not alive:
+        return base
+    factor = 2 ** (streak // max(1, settings.PROBE_BACKOFF_AFTER))
+    return min(base * factor, max(base, settings.PROBE_MAX_INTERVAL))
+
+
+def sync_schedule(redis, now=None):
+    """
+    Add new hosts to the schedule, spread at random over their first
+    interval, and drop deleted ones. Runs at most once per
+    PROBE_SCHEDULE_SYNC_SECONDS.
+    """
+    if not cache.add(SYNC_MARKER_KEY, 1, timeout=settings.PROBE_SCHEDULE_SYNC_SECONDS):
+        return
+    now = now or time.time()
+    hosts = dict(Host.objects.values_list('id', 'device_type'))
+    scheduled = {int(member) for member in redis.zrange(SCHEDULE_KEY, 0, -1)}
+    new = {
+        host_id: now + random.uniform(0, base_interval(device_type))
+        for host_id, device_type in hosts.items() if host_id not in scheduled
+    }
+    gone = [host_id for host_id in scheduled if host_id not in hosts]
+    pipe = redis.pipeline(transaction=False)
+    if new:
+        pipe.zadd(SCHEDULE_KEY, new, nx=True)
+    if gone:
+        pipe.zrem(SCHEDULE_KEY, *gone)
+        pipe.hdel(STATE_KEY, *gone)
+    pipe.execute()
+    if new or gone:
+        logger.info(f"Probe schedule: added {len(new)} hosts, removed {len(gone)}")
+
+
+def pop_due(redis, now=None, limit=None):
+    """
+    Return the ids of the hosts that are due, and lease them for
+    PROBE_LEASE_SECONDS so an overlapping tick cannot dispatch them again;
+    probe results reschedule them properly.
+    """
+    now = now or time.time()
+    limit = limit or settings.PROBE_TICK_MAX_HOSTS
+    due = [int(member) for member in redis.zrangebyscore(SCHEDULE_KEY, 0, now, start=0, num=limit)]
+    if due:
+        redis.zadd(SCHEDULE_KEY, {host_id: now + settings.PROBE_LEASE_SECONDS for host_id in due}, xx=True)
+    return due
+
+
+def apply_results(redis, hosts, results, now=None):
+    """
+    Update each probed host's state and next-due time. Returns the hosts
+    whose result should be recorded: everything except a failed probe of an
+    up host that still has confirmation probes to go.
+    """
+    now = now or time.time()
+    states = redis.hmget(STATE_KEY, [host.id for host in hosts]) if hosts else []
+    record, new_states, schedule = [], {}, {}
+    for host, raw in zip(hosts, states):
+        last_alive, streak, pending = _decode_state(raw)
+        alive = results.get(host.ip_address, NO_REPLY).alive
+        if not alive and last_alive and pending < settings.PROBE_CONFIRMATIONS:
+            # Not down until confirmed; probe again shortly.
+            new_states[host.id] = _encode_state(last_alive, streak, pending + 1)
+            schedule[host.id] = now + settings.PROBE_CONFIRM_INTERVAL
+            continue
+        streak = streak + 1 if alive == last_alive else 0
+        new_states[host.id] = _encode_state(alive, streak, 0)
+        schedule[host.id] = now + next_interval(host.device_type, alive, streak)
+        record.append(host)
+    if new_states:
+        pipe = redis.pipeline(transaction=False)
+        pipe.hset(STATE_KEY, mapping=new_states)
+        pipe.zadd(SCHEDULE_KEY, schedule, xx=True)
+        pipe.execute()
+    return record
+
+
+def schedule_stats():
+    """
+    Size of the adaptive schedule and number of hosts currently due.
+    """
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        return {
+            "hosts": redis.zcard(SCHEDULE_KEY),
+            "due": redis.zcount(SCHEDULE_KEY, 0, time.time()),
+        }
+    except RedisError:
+        return None
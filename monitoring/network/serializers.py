@@ -2,14 +2,39 @@
 from rest_framework import serializers
 from .models import Network, Host
 
-class NetworkSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Restrict a serializer to a subset of its fields, e.g. from ?fields=id,name.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def parse_fields(cls, value):
+        """
+        Validate a comma separated field list; returns None for all fields.
+        Raises ValueError on unknown field names.
+        """
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(fields) - set(cls.Meta.fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+        return fields
+
+
+class NetworkSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Network
         fields = ['id', 'name', 'admin', 'created_at', 'cloud_pk']
         read_only_fields = ['id', 'created_at']
 
 
-class HostSerializer(serializers.ModelSerializer):
+class HostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     def validate_mac_address(self, value):
         if value == '':
             return None
@@ -0,0 +1,30 @@
+"""
+Invalidate cached API responses (network/response_cache.py) when a network
+or host is saved or deleted. Writes that bypass model signals (bulk_create,
+bulk_update, QuerySet.update) call invalidate_user themselves.
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from .models import Host, Network
+from .response_cache import invalidate_user
+
+# The user whose cached responses show each model.
+OWNER_FIELDS = {Network: 'admin_id', Host: 'user_id'}
+
+
+@receiver(post_init, sender=Network)
+@receiver(post_init, sender=Host)
+def remember_loaded_owner(sender, instance, **kwargs):
+    # An update may move the object to another user, whose cache is stale
+    # too. Keep the owner it was loaded with (None if deferred or new).
+    instance._loaded_owner_id = instance.__dict__.get(OWNER_FIELDS[sender])
+
+
+@receiver(post_save, sender=Network)
+@receiver(post_save, sender=Host)
+@receiver(post_delete, sender=Network)
+@receiver(post_delete, sender=Host)
+def invalidate_owner(sender, instance, **kwargs):
+    owner_id = getattr(instance, OWNER_FIELDS[sender])
+    invalidate_user(owner_id, getattr(instance, '_loaded_owner_id', None))
+    instance._loaded_owner_id = owner_id
@@ -0,0 +1,142 @@
+"""
+Durable local spool (outbox) for ping uploads.
+
+Pings after a network's ExportCursor are encoded into UploadBatch rows, and
+the cursor advances in the same transaction, so a batch is either spooled or
+still pending in the Ping table. Batches are then delivered to the cloud in
+order and deleted once acknowledged. When the cloud is unreachable they stay
+on disk in the database, with exponential backoff, until connectivity returns.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+from .encoding import encode_ping_payload
+from .models import CloudSyncEntry, ExportCursor, Ping, UploadBatch
+from .outbox import outbox_stats
+from .utils import get_cloud_token, cloud_request
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SpoolFull(Exception):
+    pass
+
+
+def next_export_batch(network, after_id, after_timestamp=None):
+    """
+    Return the next batch of a network's pings after the cursor as
+    (ping id, host cloud id, is_alive, timestamp, rtt_min, rtt_avg, rtt_max,
+    loss, jitter) rows, in id order.
+
+    Pings younger than CLOUD_EXPORT_SETTLE_SECONDS are left for the next run
+    so that sweeps still committing cannot slip in behind the cursor. With
+    the cursor's `after_timestamp` only pings from
+    CURSOR_TIMESTAMP_MARGIN_SECONDS before it are scanned, so chunks that were
+    exported long ago (and compressed on TimescaleDB) are not touched. The
+    batch also stops before the first ping of a host whose create is still
+    queued for the cloud (CLOUD_SYNC_MODE = "async"), so the cursor waits
+    there until the host has a cloud id instead of skipping its pings. Once
+    the create has failed for good the hold is released, and the host's
+    pings are exported without a cloud id.
+    """
+    settled = timezone.now() - timedelta(seconds=settings.CLOUD_EXPORT_SETTLE_SECONDS)
+    pings = Ping.objects.filter(network=network, id__gt=after_id, timestamp__lte=settled)
+    if after_timestamp is not None:
+        pings = pings.filter(
+            timestamp__gte=after_timestamp - timedelta(seconds=settings.CURSOR_TIMESTAMP_MARGIN_SECONDS)
+        )
+    rows = list(
+        pings.order_by('id')
+        .values_list('id', 'host_id', 'host__cloud_pk', 'is_alive', 'timestamp', *Ping.METRIC_FIELDS)[:settings.CLOUD_EXPORT_BATCH_SIZE]
+    )
+    unsynced = {row[1] for row in rows if row[2] is None}
+    if unsynced:
+        pending = set(
+            CloudSyncEntry.objects.filter(
+                object_type='host', action='create', object_id__in=unsynced, failed_at__isnull=True,
+            )
+            .values_list('object_id', flat=True)
+        )
+        for i, row in enumerate(rows):
+            if row[1] in pending:
+                logger.info(f"Holding export of network {network.id} at ping {row[0]} until host {row[1]} is synced")
+                rows = rows[:i]
+                break
+    return [(row[0], *row[2:]) for row in rows]
+
+
+def spool_next_batch(network):
+    """
+    Move the next batch of a network's pings from after the cursor into the
+    spool. Returns the UploadBatch, or None if there is nothing to spool or
+    another worker holds the cursor. Raises SpoolFull when the network already
+    has SPOOL_MAX_PENDING_BATCHES undelivered batches.
+    """
+    with transaction.atomic():
+        cursor = ExportCursor.objects.select_for_update(skip_locked=True).filter(network=network).first()
+        if cursor is None:
+            return None
+        if UploadBatch.objects.filter(network=network).count() >= settings.SPOOL_MAX_PENDING_BATCHES:
+            raise SpoolFull(f"Spool for network {network.id} is full")
+        rows = next_export_batch(network, cursor.last_ping_id, cursor.last_timestamp)
+        if not rows:
+            return None
+        body, headers = encode_ping_payload(network, [row[1:] for row in rows])
+        batch = UploadBatch.objects.create(
+            network=network,
+            first_ping_id=rows[0][0],
+            last_ping_id=rows[-1][0],
+            ping_count=len(rows),
+            body=body,
+            headers=headers,
+        )
+        cursor.last_ping_id = batch.last_ping_id
+        cursor.last_timestamp = rows[-1][3]
+        cursor.save(update_fields=['last_ping_id', 'last_timestamp', 'updated_at'])
+    return batch
+
+
+def deliver_batch(network, batch):
+    """
+    POST a spooled batch to the cloud API's ingest endpoint with the network
+    admin's token. The Idempotency-Key lets the cloud drop a batch it already
+    stored if our acknowledgement was lost. Raises if the cloud does not
+    acknowledge the batch.
+    """
+    token, error = get_cloud_token(network.admin)
+    if not token:
+        raise Exception(f"Failed to obtain cloud token for network {network.id}: {error}")
+
+    headers = {
+        **batch.headers,
+        "Idempotency-Key": f"{network.cloud_pk}-{batch.first_ping_id}-{batch.last_ping_id}",
+    }
+    ingest_url = settings.CLOUD_INGEST_URL  # e.g., "https://cloud.example.com/api/ingest-uptime/"
+    response = cloud_request(
+        network.admin, 'post', ingest_url, token, data=bytes(batch.body), headers=headers,
+        timeout=settings.CLOUD_INGEST_TIMEOUT,
+    )
+    if response.status_code not in (200, 201):
+        raise Exception(f"Cloud ingest failed for network {network.id}: {response.status_code}")
+
+
+def spool_stats():
+    """
+    Size and age of the spool, for monitoring.
+    """
+    stats = outbox_stats(
+        UploadBatch.objects.all(),
+        batches=Count('id'),
+        pings=Sum('ping_count'),
+        bytes=Sum(Length('body')),
+    )
+    stats['pings'] = stats['pings'] or 0
+    stats['bytes'] = stats['bytes'] or 0
+    stats['failing_networks'] = (
+        UploadBatch.objects.filter(attempts__gt=0).values('network').distinct().count()
+    )
+    return stats
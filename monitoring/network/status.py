@@ -0,0 +1,188 @@
+"""
+Live host status snapshot.
+
+At the end of every sweep ping_hosts publishes each host's latest result into
+one Redis hash per network (host id -> "<0|1>:<epoch seconds>"), so "is every
+host up right now?" is answered from memory instead of a latest-ping-per-host
+query over the Ping table. When the hash is missing (cold or flushed Redis)
+the snapshot is rebuilt from the database and written back.
+
+Up/down transitions found while publishing are also sent over Redis pub/sub,
+which feeds the networks/<pk>/events/ stream (network/streams.py).
+"""
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from .models import Host, Ping
+from .probes import NO_REPLY
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _status_key(network_id):
+    return f"network_status:{network_id}"
+
+
+def events_channel(network_id):
+    return f"network_events:{network_id}"
+
+
+def get_redis():
+    try:
+        return get_redis_connection("default")
+    except NotImplementedError:
+        # The cache backend is not Redis (e.g. local development).
+        return None
+
+
+def _encode(is_alive, timestamp):
+    return f"{int(bool(is_alive))}:{int(timestamp.timestamp())}"
+
+
+def _decode(value):
+    alive, epoch = value.decode().split(":")
+    return alive == "1", datetime.fromtimestamp(int(epoch), dt_timezone.utc)
+
+
+def _write_snapshots(snapshots, pipe=None):
+    """
+    Write {network_id: {host_id: (is_alive, timestamp)}} into the status
+    hashes with one pipeline.
+    """
+    redis = get_redis()
+    if redis is None or not snapshots:
+        return
+    try:
+        pipe = pipe or redis.pipeline(transaction=False)
+        for network_id, statuses in snapshots.items():
+            if not statuses:
+                continue
+            key = _status_key(network_id)
+            pipe.hset(key, mapping={
+                host_id: _encode(is_alive, timestamp)
+                for host_id, (is_alive, timestamp) in statuses.items()
+            })
+            pipe.expire(key, settings.STATUS_SNAPSHOT_TTL)
+        pipe.execute()
+    except RedisError as exc:
+        logger.warning(f"Could not publish host status snapshot: {exc}")
+
+
+def publish_status(hosts, results, now):
+    """
+    Publish one sweep's results (see record_pings) into the status hashes.
+    Every swept host is published, also in change-only storage mode.
+
+    Hosts whose state differs from the snapshot are announced on the
+    network's events channel (see events_channel) as one JSON message per
+    network. Hosts not yet in the snapshot are not announced, so a cold
+    cache does not flood the clients. Returns the number of transitions.
+    """
+    snapshots = {}
+    for host in hosts:
+        if host.network_id is None:
+            continue
+        snapshots.setdefault(host.network_id, {})[host.id] = (results.get(host.ip_address, NO_REPLY).alive, now)
+    redis = get_redis()
+    if redis is None or not snapshots:
+        return 0
+
+    network_ids = list(snapshots)
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for network_id in network_ids:
+            pipe.hmget(_status_key(network_id), list(snapshots[network_id]))
+        previous = dict(zip(network_ids, pipe.execute()))
+    except RedisError as exc:
+        logger.warning(f"Could not read host status snapshot: {exc}")
+        previous = {}
+
+    pipe = redis.pipeline(transaction=False)
+    count = 0
+    for network_id, statuses in snapshots.items():
+        transitions = [
+            {"host": host_id, "is_alive": is_alive, "timestamp": timestamp.isoformat()}
+            for (host_id, (is_alive, timestamp)), old in zip(statuses.items(), previous.get(network_id, []))
+            if old is not None and _decode(old)[0] != is_alive
+        ]
+        if transitions:
+            count += len(transitions)
+            pipe.publish(events_channel(network_id), json.dumps({"network": network_id, "transitions": transitions}))
+    _write_snapshots(snapshots, pipe)
+    return count
+
+
+def _read_snapshot(network_id):
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        raw = redis.hgetall(_status_key(network_id))
+    except RedisError as exc:
+        logger.warning(f"Could not read host status snapshot: {exc}")
+        return None
+    if not raw:
+        return None
+    return {int(host_id): _decode(value) for host_id, value in raw.items()}
+
+
+def _snapshot_from_db(network_id):
+    """
+    Latest ping of each host of the network, one index lookup per host on
+    (host, timestamp).
+    """
+    latest = Ping.objects.filter(host=OuterRef('pk')).order_by('-timestamp')
+    rows = (
+        Host.objects.filter(network_id=network_id)
+        .annotate(
+            last_alive=Subquery(latest.values('is_alive')[:1]),
+            last_timestamp=Subquery(latest.values('timestamp')[:1]),
+        )
+        .filter(last_timestamp__isnull=False)
+        .values_list('id', 'last_alive', 'last_timestamp')
+    )
+    return {host_id: (is_alive, timestamp) for host_id, is_alive, timestamp in rows}
+
+
+def network_status(network):
+    """
+    Return (source, {host_id: (is_alive, timestamp)}) for a network, where
+    source is "cache" or "database".
+    """
+    statuses = _read_snapshot(network.id)
+    if statuses is not None:
+        return "cache", statuses
+    statuses = _snapshot_from_db(network.id)
+    _write_snapshots({network.id: statuses})
+    return "database", statuses
+
+
+def status_report(network):
+    """
+    Status of every host of a network. A host whose latest result is older
+    than PING_STATE_VALID_SECONDS, or that was never swept, is unknown (None).
+    """
+    source, statuses = network_status(network)
+    stale_before = timezone.now() - timedelta(seconds=settings.PING_STATE_VALID_SECONDS)
+    hosts = []
+    summary = {"up": 0, "down": 0, "unknown": 0}
+    for host_id, name, ip_address in (
+        Host.objects.filter(network=network).order_by('id').values_list('id', 'name', 'ip_address')
+    ):
+        is_alive, timestamp = statuses.get(host_id, (None, None))
+        if timestamp is not None and timestamp < stale_before:
+            is_alive = None
+        summary["unknown" if is_alive is None else "up" if is_alive else "down"] += 1
+        hosts.append({
+            "host": host_id,
+            "name": name,
+            "ip_address": ip_address,
+            "is_alive": is_alive,
+            "timestamp": timestamp,
+        })
+    return {"network": network.pk, "source": source, "summary": summary, "hosts": hosts}
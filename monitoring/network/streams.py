@@ -0,0 +1,212 @@
+"""
+Server-sent events stream of host up/down transitions.
+
+The ping sweep publishes each network's transitions to a Redis pub/sub
+channel (see network/status.py). Every server process holds one pub/sub
+connection, subscribed to the channels of the networks someone is watching,
+and fans the messages out to its clients, so watching clients add neither
+database load beyond authentication nor Redis connections.
+
+The view only works when the project is served through monitoring/asgi.py,
+as run.sh does with uvicorn. Under WSGI, including `manage.py runserver`,
+Django would read the endless stream into memory before sending anything,
+so the view answers 501 there instead.
+
+Browsers' EventSource cannot set headers, so besides the Authorization
+header the stream accepts ?token=, which must be a short-lived stream token
+for that one network (issue_stream_token, served by networks/<pk>/events/token/)
+rather than the long-lived API token, which would end up in access logs.
+"""
+import asyncio
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+from .models import Network
+from .status import events_channel
+import logging
+
+logger = logging.getLogger(__name__)
+
+STREAM_TOKEN_SALT = "network-events"
+# Messages a client may fall behind by before it is disconnected; its
+# EventSource then reconnects and carries on from the current state.
+CLIENT_BACKLOG = 100
+
+
+def issue_stream_token(user, network):
+    """
+    A signed token that lets `user` open `network`'s event stream for
+    STATUS_STREAM_TOKEN_TTL seconds.
+    """
+    return signing.dumps({"user": user.pk, "network": network.pk}, salt=STREAM_TOKEN_SALT)
+
+
+async def _authenticate(request, network_id):
+    """
+    Resolve the user from the Authorization header ("Token <key>") or from a
+    stream token for this network in ?token=.
+    """
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Token '):
+        try:
+            token = await Token.objects.select_related('user').aget(key=header[len('Token '):].strip())
+        except Token.DoesNotExist:
+            return None
+        user = token.user
+    elif request.GET.get('token'):
+        try:
+            claims = signing.loads(
+                request.GET['token'], salt=STREAM_TOKEN_SALT, max_age=settings.STATUS_STREAM_TOKEN_TTL,
+            )
+        except signing.BadSignature:
+            return None
+        if claims.get("network") != network_id:
+            return None
+        user = await get_user_model().objects.filter(pk=claims.get("user")).afirst()
+    else:
+        return None
+    return user if user is not None and user.is_active else None
+
+
+class _Subscriptions:
+    """
+    The process's shared Redis pub/sub connection. A channel is subscribed
+    while at least one client watches it, and a reader task puts each message
+    on the queue of every client watching its channel. A client's queue gets
+    None when its stream should end.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.loop = None
+        self.client = None
+        self.pubsub = None
+        self.reader = None
+        self.queues = {}
+
+    async def subscribe(self, channel):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # The connection belongs to another event loop (e.g. async_to_sync).
+            self._reset()
+            self.loop = loop
+        queue = asyncio.Queue(maxsize=CLIENT_BACKLOG)
+        watchers = self.queues.setdefault(channel, set())
+        watchers.add(queue)
+        if len(watchers) == 1:
+            if self.pubsub is None:
+                self.client = aioredis.from_url(settings.CACHES['default']['LOCATION'])
+                self.pubsub = self.client.pubsub()
+            try:
+                await self.pubsub.subscribe(channel)
+            except RedisError as exc:
+                await self.close(exc)
+                raise
+            if self.reader is None:
+                self.reader = asyncio.create_task(self.read())
+        return queue
+
+    async def unsubscribe(self, channel, queue):
+        watchers = self.queues.get(channel)
+        if watchers is None or queue not in watchers:
+            return
+        watchers.discard(queue)
+        if not watchers:
+            del self.queues[channel]
+            try:
+                await self.pubsub.unsubscribe(channel)
+            except RedisError as exc:
+                await self.close(exc)
+
+    async def read(self):
+        try:
+            while True:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+                if message is None:
+                    continue
+                channel, data = message['channel'].decode(), message['data'].decode()
+                for queue in list(self.queues.get(channel, ())):
+                    try:
+                        queue.put_nowait(data)
+                    except asyncio.QueueFull:
+                        # Too slow a client; end its stream rather than buffer for it.
+                        self._end(queue)
+        except RedisError as exc:
+            await self.close(exc)
+
+    async def close(self, exc):
+        """
+        Drop the connection after a Redis error, ending every stream; the next
+        client opens a new one.
+        """
+        logger.warning(f"Event stream connection closed: {exc}")
+        client, pubsub, reader, queues = self.client, self.pubsub, self.reader, self.queues
+        self.client = self.pubsub = self.reader = None
+        self.queues = {}
+        for watchers in queues.values():
+            for queue in watchers:
+                self._end(queue)
+        if reader is not None and reader is not asyncio.current_task():
+            reader.cancel()
+        if pubsub is not None:
+            await pubsub.aclose()
+            await client.aclose()
+
+    @staticmethod
+    def _end(queue):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+_subscriptions = _Subscriptions()
+
+
+async def _event_stream(network_id):
+    channel = events_channel(network_id)
+    try:
+        queue = await _subscriptions.subscribe(channel)
+    except RedisError:
+        return
+    try:
+        yield f"retry: {settings.STATUS_STREAM_RETRY_MS}\n\n"
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), timeout=settings.STATUS_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle stream.
+                yield ": keepalive\n\n"
+                continue
+            if data is None:
+                break
+            yield f"event: transitions\ndata: {data}\n\n"
+    finally:
+        await _subscriptions.unsubscribe(channel, queue)
+
+
+async def network_events(request, pk):
+    """
+    Stream a network's host transitions as server-sent events. Each
+    "transitions" event carries {"network", "transitions": [{"host",
+    "is_alive", "timestamp"}]} for one sweep.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Event streams need the ASGI server (monitoring/asgi.py)."}, status=501)
+    user = await _authenticate(request, pk)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided or are invalid."}, status=401)
+    if not await Network.objects.filter(pk=pk, admin=user).aexists():
+        return JsonResponse({"error": "Network not found."}, status=404)
+
+    response = StreamingHttpResponse(_event_stream(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Disable response buffering in nginx.
+    response['X-Accel-Buffering'] = 'no'
+    return response
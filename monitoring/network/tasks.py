@@ -1,31 +1,54 @@
-import subprocess
-from celery import shared_task
-import requests
+import time
+from celery import group, shared_task
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
-from .models import Network, Host, Ping
-from .utils import get_cloud_token
+from django.core.cache import cache
+from redis.exceptions import RedisError
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.db.models.functions import Mod
+from .cloud_sync import cloud_sync_stats, due_objects, replicate_next
+from .models import ExportCursor, Network, Host, SweepRun, UploadBatch
+from .outbox import claim_oldest_due, schedule_retry
+from .spool import SpoolFull, deliver_batch, spool_next_batch, spool_stats
+from .probes import NO_REPLY, get_prober
+from .recorder import record_pings
+from .retention import prune_pings
+from .rollups import prune_rollups, roll_up_next_batch
+from .scheduler import apply_results, pop_due, sync_schedule
+from .status import get_redis, publish_status
+from .timescale import is_hypertable
 import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task(
-    autoretry_for=(requests.RequestException, Exception),
-    retry_kwargs={'max_retries': 10},
-    retry_backoff=True,           # Exponential backoff (starts at 1s, doubles)
-    retry_backoff_max=3600,       # Max backoff is 1 hour
-    retry_jitter=True             # Add randomness to avoid thundering herd
-)
+@shared_task
 def submit_ping_data():
     """
-    Every 5 minutes, aggregate ping data for each network (from the last 5 minutes)
-    and send it to the cloud API's ingest endpoint.
+    Every 5 minutes, fan the cloud export out to one submit_network_ping_data
+    task per network, which moves the network's new pings into the local
+    upload spool and then drains it.
+    """
+    network_ids = Network.objects.filter(cloud_pk__isnull=False).values_list('id', flat=True)
+    uploads = group(submit_network_ping_data.s(network_id) for network_id in network_ids)
+    uploads.apply_async()
+    logger.info(f"Dispatched ping data upload for {len(uploads.tasks)} networks")
+
 
-    If the cloud API is unreachable, this task will retry up to 10 times with
-    exponential backoff (up to 1 hour between attempts).
+@shared_task
+def submit_network_ping_data(network_id):
+    """
+    Spool one network's pings that have not been exported yet, in batches of
+    CLOUD_EXPORT_BATCH_SIZE after the network's ExportCursor, then drain the
+    network's spool to the cloud.
 
-    Expected payload:
+    Each batch is encoded into an UploadBatch and the cursor advances in the
+    same transaction, so nothing is skipped or spooled twice. A run spools at
+    most CLOUD_EXPORT_MAX_BATCHES batches and then requeues itself if there is
+    more backlog; a concurrent run for the same network skips the locked cursor.
+
+    Expected payload (default "json" format, see network/encoding.py for "compact"):
     {
       "network": <network_id>,
       "network_admin": <network_admin_identifier>,
@@ -35,84 +58,305 @@ def submit_ping_data():
       ]
     }
     """
-    time_threshold = timezone.now() - timedelta(minutes=5)
-    networks = Network.objects.all()
-
-    for network in networks:
-        if not network.cloud_pk:
-            continue
-        # Retrieve pings for this network in the last 5 minutes.
-        pings = Ping.objects.filter(network=network, timestamp__gte=time_threshold)
-        if not pings.exists():
-            continue  # nothing to send for this network
-
-        # Build the data array
-        data = []
-        for ping in pings:
-            data.append({
-                "host": ping.host.cloud_pk,
-                "is_alive": ping.is_alive,
-                "time": ping.timestamp.isoformat() if ping.timestamp else timezone.now().isoformat(),
-                "timestamp": ping.timestamp.isoformat() if ping.timestamp else timezone.now().isoformat(),
-            })
-
-        payload = {
-            "network": network.cloud_pk,
-            "network_admin": network.admin.username,
-            "data": data,
-        }
-        print(f"Payload: {payload}")
-        logger.info(f"Payload: {payload}")
-
-        # Obtain a fresh token using the network admin's credentials.
-        token, error = get_cloud_token(network.admin)
-        if not token:
-            print(f"Token error: {error}")
-            print(f"Payload: {payload}")
-            raise Exception(f"Failed to obtain cloud token for network {network.id}: {error}")
-
-        headers = {"Authorization": f"Bearer {token}"}
-        ingest_url = settings.CLOUD_INGEST_URL  # e.g., "https://cloud.example.com/api/ingest-uptime/"
+    network = Network.objects.filter(pk=network_id, cloud_pk__isnull=False).first()
+    if network is None:
+        return
+    ExportCursor.objects.get_or_create(network=network)
+
+    try:
+        for _ in range(settings.CLOUD_EXPORT_MAX_BATCHES):
+            batch = spool_next_batch(network)
+            if batch is None:
+                break
+            logger.info(f"Spooled {batch.ping_count} pings ({len(batch.body)} bytes) for network {network.id}")
+        else:
+            # Still behind after a full run: keep catching up in a fresh task.
+            submit_network_ping_data.delay(network_id)
+    except SpoolFull as exc:
+        logger.warning(f"{exc}; leaving pings in the Ping table until it drains")
+
+    drain_network_spool.delay(network_id)
+
+
+@shared_task
+def drain_upload_spool():
+    """
+    Every minute, drain the upload spool of every network with pending
+    batches, and log the spool size and age.
+    """
+    network_ids = UploadBatch.objects.values_list('network_id', flat=True).distinct()
+    group(drain_network_spool.s(network_id) for network_id in network_ids).apply_async()
+    logger.info(f"Upload spool: {spool_stats()}")
+
+
+@shared_task
+def drain_network_spool(network_id):
+    """
+    Deliver a network's spooled batches to the cloud in order, deleting each
+    once it is acknowledged. At most SPOOL_DRAIN_MAX_BATCHES are sent per run,
+    which bounds the upload rate after an outage. A failed batch is kept and
+    retried with exponential backoff, and blocks the batches behind it so the
+    cloud always receives them in order. Each batch is claimed in a short
+    transaction and uploaded after it commits (see network/outbox.py).
+    """
+    network = Network.objects.select_related('admin').filter(pk=network_id).first()
+    if network is None:
+        return 0
+    sent = 0
+    while sent < settings.SPOOL_DRAIN_MAX_BATCHES:
         try:
-            response = requests.post(ingest_url, json=payload, headers=headers, timeout=10)
-            if response.status_code not in (200, 201):
-                print(f"API error: {response.status_code}")
-                print(f"Payload: {payload}")
-                raise Exception(f"Cloud ingest failed for network {network.id}")
-            else:
-                logger.info(f"Successfully ingested ping data for network {network.id}")
-                # Optionally: mark these pings as sent to avoid duplicates.
-                # pings.update(sent=True)
+            # Claiming the oldest batch makes this the only drainer of the network.
+            batch = claim_oldest_due(UploadBatch.objects.filter(network=network))
+        except OperationalError:
+            logger.info(f"Spool of network {network.id} is already being drained")
+            break
+        if batch is None:
+            break
+        try:
+            deliver_batch(network, batch)
         except Exception as exc:
-            print(f"Exception: {exc}")
-            print(f"Payload: {payload}")
-            raise
+            logger.warning(f"Upload of batch {batch.id} for network {network.id} failed: {exc}")
+            schedule_retry(batch, exc, settings.SPOOL_RETRY_BACKOFF, settings.SPOOL_RETRY_BACKOFF_MAX)
+            break
+        batch.delete()
+        sent += 1
+    if sent:
+        logger.info(f"Successfully ingested {sent} spooled batches for network {network.id}")
+    return sent
 
 
-def alive(ip):
+@shared_task
+def replicate_cloud_sync():
     """
-    Test if a host is reachable.
-    Returns True if the host is reachable, False otherwise.
+    Every minute, fan the cloud sync outbox (CLOUD_SYNC_MODE = "async") out
+    to one replicate_cloud_object task per object with a due entry. This
+    picks up retries; new entries are replicated as soon as they commit.
     """
-    command = ["fping", ip]
-    result = subprocess.run(
-        command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    return result.returncode == 0
+    objects = due_objects()
+    if not objects:
+        return
+    group(replicate_cloud_object.s(object_type, object_id) for object_type, object_id in objects).apply_async()
+    logger.info(f"Cloud sync outbox: {cloud_sync_stats()}")
+
+
+@shared_task
+def replicate_cloud_object(object_type, object_id):
+    """
+    Replicate an object's outbox entries to the cloud in order, at most
+    CLOUD_SYNC_MAX_ENTRIES per run. A failed entry is retried with
+    exponential backoff and blocks the entries behind it until it succeeds
+    or is marked failed.
+    """
+    replicated = 0
+    while replicated < settings.CLOUD_SYNC_MAX_ENTRIES:
+        try:
+            if not replicate_next(object_type, object_id):
+                break
+        except OperationalError:
+            logger.info(f"Cloud sync of {object_type} {object_id} is already in progress")
+            break
+        replicated += 1
+    if replicated:
+        logger.info(f"Replicated {replicated} changes of {object_type} {object_id} to the cloud")
+    return replicated
 
 
 @shared_task
 def ping_hosts():
     """
-    Fetch all hosts from the DB, ping each one,
-    and record the result in the PingResult model.
+    Start a sweep: record a SweepRun and fan out one ping_shard task per
+    shard (PING_SWEEP_SHARDS), so sweep capacity grows with the number of
+    Celery workers. Also marks sweeps that never finished within
+    PING_SHARD_LOCK_TIMEOUT as abandoned and prunes sweep records older than
+    PING_SWEEP_HISTORY_DAYS. Does nothing with PING_SCHEDULER = "adaptive"
+    (see probe_tick).
     """
-    hosts = Host.objects.all()
-    for host in hosts:
-        status = alive(host.ip_address)
-        # Create a new PingResult (timestamp is set automatically)
-        Ping.objects.create(host=host, is_alive=status, network=host.network)
-        logger.info(f"Pinged host {host.ip_address} ({host.name or ''}): {'alive' if status else 'down'}")
+    if settings.PING_SCHEDULER == "adaptive":
+        return
+    abandoned = SweepRun.objects.filter(
+        finished_at__isnull=True,
+        abandoned=False,
+        started_at__lt=timezone.now() - timedelta(seconds=settings.PING_SHARD_LOCK_TIMEOUT),
+    ).update(abandoned=True)
+    if abandoned:
+        logger.warning(f"Marked {abandoned} unfinished sweeps as abandoned")
+    shards = max(1, settings.PING_SWEEP_SHARDS)
+    sweep = SweepRun.objects.create(shards=shards)
+    group(ping_shard.s(sweep.id, shard, shards) for shard in range(shards)).apply_async(
+        expires=settings.PING_SHARD_EXPIRES,
+    )
+    SweepRun.objects.filter(
+        started_at__lt=timezone.now() - timedelta(days=settings.PING_SWEEP_HISTORY_DAYS)
+    ).delete()
+    logger.info(f"Dispatched sweep {sweep.id} in {shards} shards")
+
 
+def _shard_lock_key(shard, shards):
+    return f"ping_shard_lock:{shards}:{shard}"
+
+
+def _finish_shard(sweep_id, hosts=0, alive=0, skipped=False):
+    """
+    Fan-in: add a shard's counts to its SweepRun; the last shard to report
+    marks the sweep finished.
+    """
+    SweepRun.objects.filter(pk=sweep_id).update(
+        shards_done=F('shards_done') + 1,
+        shards_skipped=F('shards_skipped') + int(skipped),
+        hosts=F('hosts') + hosts,
+        alive=F('alive') + alive,
+    )
+    finished = SweepRun.objects.filter(
+        pk=sweep_id, finished_at__isnull=True, abandoned=False, shards_done__gte=F('shards'),
+    ).update(finished_at=timezone.now())
+    if finished:
+        sweep = SweepRun.objects.get(pk=sweep_id)
+        duration = (sweep.finished_at - sweep.started_at).total_seconds()
+        logger.info(
+            f"Sweep {sweep.id} finished in {duration:.2f}s: {sweep.alive}/{sweep.hosts} hosts alive, "
+            f"{sweep.shards_skipped} of {sweep.shards} shards skipped"
+        )
+
+
+@shared_task
+def ping_shard(sweep_id, shard, shards):
+    """
+    Sweep the hosts with id % shards == shard with the configured backend
+    (PROBE_BACKEND), record the results in the Ping model with a few batched
+    inserts and publish them as the live status snapshot (network/status.py).
+
+    A cache lock per shard makes a shard skip this sweep while its previous
+    sweep is still running, instead of piling up. A shard that fails still
+    reports to its sweep, as skipped.
+    """
+    lock_key = _shard_lock_key(shard, shards)
+    if not cache.add(lock_key, sweep_id, timeout=settings.PING_SHARD_LOCK_TIMEOUT):
+        logger.warning(f"Shard {shard}/{shards} is still sweeping; skipping it in sweep {sweep_id}")
+        _finish_shard(sweep_id, skipped=True)
+        return
+    try:
+        hosts = list(Host.objects.annotate(shard=Mod('id', shards)).filter(shard=shard))
+        prober = get_prober()
+        started = time.monotonic()
+        results = prober.probe_many([host.ip_address for host in hosts])
+        logger.info(
+            f"Swept {len(hosts)} hosts of shard {shard}/{shards} with {prober.name} "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+
+        record_pings(hosts, results)
+        publish_status(hosts, results, timezone.now())
+        for host in hosts:
+            result = results.get(host.ip_address, NO_REPLY)
+            if result.alive:
+                logger.info(
+                    f"Pinged host {host.ip_address} ({host.name or ''}): alive, "
+                    f"rtt {result.rtt_avg / 1000:.2f} ms, loss {result.loss}%"
+                )
+            else:
+                logger.info(f"Pinged host {host.ip_address} ({host.name or ''}): down")
+    except Exception:
+        logger.exception(f"Shard {shard}/{shards} failed in sweep {sweep_id}")
+        _finish_shard(sweep_id, skipped=True)
+        raise
+    finally:
+        if cache.get(lock_key) == sweep_id:
+            cache.delete(lock_key)
+    _finish_shard(sweep_id, len(hosts), sum(1 for host in hosts if results.get(host.ip_address, NO_REPLY).alive))
+
+
+@shared_task
+def probe_tick():
+    """
+    Every PROBE_TICK_SECONDS with PING_SCHEDULER = "adaptive", dispatch the
+    hosts whose next-due time has passed (network/scheduler.py) in
+    probe_hosts tasks of at most PROBE_TICK_BATCH hosts.
+    """
+    if settings.PING_SCHEDULER != "adaptive":
+        return
+    redis = get_redis()
+    if redis is None:
+        logger.error("Adaptive probe scheduling needs the Redis cache backend")
+        return
+    # The lock only spans the dispatch; probe_hosts runs in other workers.
+    if not cache.add("probe_tick_lock", 1, timeout=settings.PROBE_TICK_SECONDS * 2):
+        return
+    try:
+        sync_schedule(redis)
+        due = pop_due(redis)
+    finally:
+        cache.delete("probe_tick_lock")
+    if not due:
+        return
+    batch = settings.PROBE_TICK_BATCH
+    group(probe_hosts.s(due[i:i + batch]) for i in range(0, len(due), batch)).apply_async(
+        expires=settings.PROBE_LEASE_SECONDS,
+    )
+    logger.info(f"Dispatched {len(due)} due hosts")
+
+
+@shared_task
+def probe_hosts(host_ids):
+    """
+    Probe the given hosts, schedule each one's next probe and record the
+    results, holding back unconfirmed failures of hosts that were up.
+    """
+    redis = get_redis()
+    hosts = list(Host.objects.filter(pk__in=host_ids))
+    prober = get_prober()
+    started = time.monotonic()
+    results = prober.probe_many([host.ip_address for host in hosts])
+    logger.info(f"Probed {len(hosts)} hosts with {prober.name} in {time.monotonic() - started:.2f}s")
+
+    try:
+        record = apply_results(redis, hosts, results)
+    except RedisError as exc:
+        # Keep the results; the hosts become due again when their lease ends.
+        logger.warning(f"Could not update the probe schedule: {exc}")
+        record = hosts
+    if len(record) < len(hosts):
+        logger.info(f"Confirming {len(hosts) - len(record)} failed probes before recording them")
+    record_pings(record, results)
+    publish_status(record, results, timezone.now())
+
+
+@shared_task
+def update_uptime_rollups():
+    """
+    Every minute, fold new pings into the per-host and per-network uptime
+    rollups (minute, hour and day buckets), at most ROLLUP_MAX_BATCHES
+    batches of ROLLUP_BATCH_SIZE pings per run, then prune expired buckets.
+    """
+    total = 0
+    for _ in range(settings.ROLLUP_MAX_BATCHES):
+        count = roll_up_next_batch()
+        if count is None:
+            logger.info("Uptime rollup already in progress")
+            return total
+        if not count:
+            break
+        total += count
+    pruned = prune_rollups()
+    logger.info(f"Rolled up {total} pings, pruned {pruned} expired rollups")
+    return total
+
+
+@shared_task
+def enforce_ping_retention():
+    """
+    Prune pings older than PING_RETENTION_DAYS in chunks of
+    PING_RETENTION_DELETE_BATCH rows, PING_RETENTION_SLEEP seconds apart, so
+    no single DELETE locks the table (see network/retention.py). With
+    PING_ARCHIVE_DIR set they are archived there first.
+
+    On TimescaleDB the retention policy drops whole chunks instead,
+    so this task does nothing there.
+    """
+    if not settings.PING_RETENTION_DAYS or is_hypertable(connection):
+        return 0
+    cutoff = timezone.now() - timedelta(days=settings.PING_RETENTION_DAYS)
+    return prune_pings(
+        cutoff,
+        archive_dir=settings.PING_ARCHIVE_DIR or None,
+        file_format=settings.PING_ARCHIVE_FORMAT,
+    )
@@ -0,0 +1,117 @@
+import asyncio
+
+
+class FakeRedis:
+    """
+    The Redis hash, sorted set and publish commands used by the network app,
+    in memory. Members and fields are kept as given; values are stored as
+    bytes. Published messages are collected in `published`.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.zsets = {}
+        self.ttls = {}
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hmget(self, key, fields):
+        values = self.hashes.get(key, {})
+        return [values.get(field) for field in fields]
+
+    def hgetall(self, key):
+        return {str(field).encode(): value for field, value in self.hashes.get(key, {}).items()}
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({
+            field: value if isinstance(value, bytes) else str(value).encode() for field, value in mapping.items()
+        })
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def zadd(self, key, mapping, nx=False, xx=False):
+        scores = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            if (nx and member in scores) or (xx and member not in scores):
+                continue
+            scores[member] = score
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+
+    def zrange(self, key, start, end):
+        members = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        return [str(member).encode() for member, _ in members[start:None if end == -1 else end + 1]]
+
+    def zrangebyscore(self, key, low, high, start=0, num=None):
+        members = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        due = [str(member).encode() for member, score in members if low <= score <= high]
+        return due[start:None if num is None else start + num]
+
+
+class FakePipeline:
+    """
+    Queues FakeRedis commands and runs them on execute(), which returns
+    their results.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+class FakePubSub:
+    """
+    An async Redis pub/sub connection. publish() delivers to the subscribed
+    channels; fail() makes the next read raise.
+    """
+
+    def __init__(self):
+        self.channels = set()
+        self.messages = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.channels.add(channel)
+
+    async def unsubscribe(self, channel):
+        self.channels.discard(channel)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        message = await self.messages.get()
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    def publish(self, channel, data):
+        if channel in self.channels:
+            self.messages.put_nowait({"type": "message", "channel": channel.encode(), "data": data.encode()})
+
+    def fail(self, exc):
+        self.messages.put_nowait(exc)
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,115 @@
+import csv
+import io
+import itertools
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from network.models import CloudSyncEntry, Host, Network
+
+
+def cloud_response(status_code, body=None):
+    response = mock.Mock(status_code=status_code, text='')
+    response.json.return_value = body or {}
+    return response
+
+
+@override_settings(CLOUD_SYNC_MODE='sync', API_CACHE_TTL=0, BULK_MAX_ROWS=10)
+class BulkHostTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='user')
+        self.network = Network.objects.create(name='lab', admin=self.user, cloud_pk=7)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        token = mock.patch('network.views.get_cloud_token', return_value=('cloud-token', None))
+        token.start()
+        self.addCleanup(token.stop)
+        self.cloud_ids = itertools.count(100)
+        self.cloud = mock.patch('network.bulk.cloud_request', side_effect=self.accept)
+        self.cloud_request = self.cloud.start()
+        self.addCleanup(self.cloud.stop)
+
+    def accept(self, user, method, url, token, **kwargs):
+        if method == 'post':
+            if kwargs['json']['ip_address'] == '10.0.0.99':
+                return cloud_response(409)
+            return cloud_response(201, {"id": next(self.cloud_ids)})
+        return cloud_response(204 if method == 'delete' else 200)
+
+    def host(self, ip, **fields):
+        return Host.objects.create(ip_address=ip, network=self.network, user=self.user, **fields)
+
+    def test_json_create_writes_the_hosts_the_cloud_accepted(self):
+        rows = [{"ip_address": "10.0.0.1", "name": "a", "network": self.network.pk},
+                {"ip_address": "10.0.0.99", "name": "b", "network": self.network.pk}]
+        response = self.client.post('/api/v1/hosts/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['succeeded'], response.data['failed']), (1, 1))
+        created, failed = response.data['results']
+        self.assertEqual((created['status'], created['cloud_pk']), ('created', 100))
+        self.assertEqual(failed['status'], 'error')
+        self.assertEqual(list(Host.objects.values_list('ip_address', 'cloud_pk')), [('10.0.0.1', 100)])
+        self.assertEqual(self.cloud_request.call_args_list[0].kwargs['json']['network'], 7)
+
+    def test_csv_create(self):
+        body = 'ip_address,name,network,device_type\n10.0.0.1,a,{0},firewall\n10.0.0.2,b,{0},\n'.format(self.network.pk)
+        response = self.client.post('/api/v1/hosts/bulk/', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(Host.objects.values_list('ip_address', 'device_type')),
+            [('10.0.0.1', 'firewall'), ('10.0.0.2', Host._meta.get_field('device_type').default)],
+        )
+
+    def test_one_invalid_row_rejects_the_request_before_the_cloud(self):
+        rows = [{"ip_address": "10.0.0.1", "network": self.network.pk},
+                {"ip_address": "10.0.0.1", "network": self.network.pk},
+                {"ip_address": "not-an-ip", "network": self.network.pk}]
+        response = self.client.post('/api/v1/hosts/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['details']), {1, 2})
+        self.cloud_request.assert_not_called()
+        self.assertFalse(Host.objects.exists())
+        oversized = [{"ip_address": f"10.0.1.{i}", "network": self.network.pk} for i in range(11)]
+        self.assertEqual(self.client.post('/api/v1/hosts/bulk/', oversized, format='json').status_code, 400)
+
+    def test_update_and_delete(self):
+        first, second = self.host('10.0.0.1', cloud_pk=1), self.host('10.0.0.2', cloud_pk=2)
+        response = self.client.put('/api/v1/hosts/bulk/', {"hosts": [{"id": first.pk, "name": "core"}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Host.objects.get(pk=first.pk).name, 'core')
+        response = self.client.delete('/api/v1/hosts/bulk/', {"ids": [first.pk, second.pk]}, format='json')
+        self.assertEqual((response.status_code, response.data['succeeded']), (200, 2))
+        self.assertFalse(Host.objects.exists())
+
+    def test_csv_export(self):
+        self.host('10.0.0.1', name='a')
+        self.host('10.0.0.2', name='b')
+        response = self.client.get('/api/v1/hosts/bulk/', {'format': 'csv', 'fields': 'ip_address,name'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(response.content.decode())))
+        self.assertEqual(rows, [{'ip_address': '10.0.0.1', 'name': 'a'}, {'ip_address': '10.0.0.2', 'name': 'b'}])
+
+    def test_hosts_the_local_write_rejects_are_removed_from_the_cloud(self):
+        rows = [{"ip_address": "10.0.0.1", "network": self.network.pk},
+                {"ip_address": "10.0.0.2", "network": self.network.pk}]
+
+        def refuse_one_delete(user, method, url, token, **kwargs):
+            if method == 'delete' and kwargs['data']['ip_address'] == '10.0.0.2':
+                return cloud_response(503)
+            return self.accept(user, method, url, token, **kwargs)
+
+        self.cloud_request.side_effect = refuse_one_delete
+        # E.g. another request took one of the addresses during the cloud calls.
+        conflict = IntegrityError('UNIQUE constraint failed: network_host.ip_address')
+        with mock.patch.object(Host.objects, 'bulk_create', side_effect=conflict):
+            response = self.client.post('/api/v1/hosts/bulk/', rows, format='json')
+        self.assertEqual((response.status_code, response.data['failed']), (207, 2))
+        self.assertFalse(Host.objects.exists())
+        deletes = [call.kwargs['data']['ip_address'] for call in self.cloud_request.call_args_list
+                   if call.args[1] == 'delete']
+        self.assertEqual(sorted(deletes), ['10.0.0.1', '10.0.0.2'])
+        # The delete the cloud refused is left to the outbox.
+        entry = CloudSyncEntry.objects.get()
+        self.assertEqual((entry.action, entry.object_id, entry.payload['ip_address']), ('delete', -entry.cloud_pk, '10.0.0.2'))
@@ -0,0 +1,107 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from network.cloud_sync import cloud_sync_stats, due_objects, enqueue, replicate_next
+from network.models import CloudSyncEntry, Host, Network, Ping
+from network.spool import next_export_batch
+
+
+def cloud_response(status_code, body=None):
+    response = mock.Mock(status_code=status_code, text='')
+    response.json.return_value = body or {}
+    return response
+
+
+@override_settings(CLOUD_SYNC_MODE='async', CLOUD_SYNC_MAX_ATTEMPTS=3, CLOUD_SYNC_RETRY_BACKOFF=30,
+                   CLOUD_SYNC_RETRY_BACKOFF_MAX=3600, OUTBOX_LEASE_SECONDS=120, CLOUD_EXPORT_SETTLE_SECONDS=0)
+class CloudSyncOutboxTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='user')
+        self.network = Network.objects.create(name='lab', admin=self.user)
+        self.create = enqueue(self.user, self.network, 'create', {"name": "lab"})
+        self.update = enqueue(self.user, self.network, 'update', {"name": "core"})
+        token = mock.patch('network.cloud_sync.get_cloud_token', return_value=('cloud-token', None))
+        token.start()
+        self.addCleanup(token.stop)
+        cloud = mock.patch('network.cloud_sync.cloud_request', return_value=cloud_response(201, {"id": 42}))
+        self.cloud_request = cloud.start()
+        self.addCleanup(cloud.stop)
+
+    def replicate(self):
+        return replicate_next('network', self.network.pk)
+
+    def test_entries_replicate_in_order_and_back_fill_the_cloud_id(self):
+        self.assertTrue(self.replicate())
+        self.assertEqual(Network.objects.get(pk=self.network.pk).cloud_pk, 42)
+        self.assertTrue(self.replicate())
+        self.assertFalse(CloudSyncEntry.objects.exists())
+        (create_call, update_call) = self.cloud_request.call_args_list
+        self.assertEqual(create_call.args[1], 'post')
+        self.assertEqual(create_call.kwargs['headers'], {"Idempotency-Key": f"cloud-sync-{self.create.pk}"})
+        self.assertEqual((update_call.args[1], update_call.args[2][-4:]), ('put', '/42/'))
+
+    def test_entry_is_claimed_before_the_cloud_call(self):
+        def send(*args, **kwargs):
+            entry = CloudSyncEntry.objects.get(pk=self.create.pk)
+            self.assertGreater(entry.next_attempt_at, timezone.now() + timedelta(seconds=100))
+            # Another worker finds the queue claimed.
+            self.assertFalse(self.replicate())
+            return cloud_response(201, {"id": 42})
+
+        self.cloud_request.side_effect = send
+        self.assertTrue(self.replicate())
+
+    def test_transient_failure_backs_off_and_blocks_the_entries_behind_it(self):
+        self.cloud_request.return_value = cloud_response(503)
+        self.assertFalse(self.replicate())
+        entry = CloudSyncEntry.objects.get(pk=self.create.pk)
+        self.assertEqual((entry.attempts, entry.failed_at), (1, None))
+        self.assertAlmostEqual((entry.next_attempt_at - timezone.now()).total_seconds(), 30, delta=5)
+        self.assertFalse(self.replicate())
+        self.assertEqual(self.cloud_request.call_count, 1)
+        self.assertEqual(cloud_sync_stats()['failing'], 1)
+
+    def test_retryable_statuses_are_not_given_up_on_at_once(self):
+        for status_code in (401, 429, 500):
+            CloudSyncEntry.objects.filter(pk=self.create.pk).update(next_attempt_at=None, attempts=0)
+            self.cloud_request.return_value = cloud_response(status_code)
+            self.replicate()
+            self.assertIsNone(CloudSyncEntry.objects.get(pk=self.create.pk).failed_at, status_code)
+
+    def test_rejected_entry_fails_and_unblocks_the_queue(self):
+        self.cloud_request.return_value = cloud_response(400)
+        self.assertFalse(self.replicate())
+        failed = CloudSyncEntry.objects.get(pk=self.create.pk)
+        self.assertIsNotNone(failed.failed_at)
+        self.assertIn('400', failed.last_error)
+        CloudSyncEntry.objects.filter(pk=self.update.pk).update(next_attempt_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(due_objects(), [])
+        CloudSyncEntry.objects.filter(pk=self.update.pk).update(next_attempt_at=None)
+        self.assertEqual((cloud_sync_stats()['entries'], cloud_sync_stats()['failed']), (1, 1))
+        # The update behind it is tried next; the network never got a cloud id.
+        self.assertFalse(self.replicate())
+        self.assertIn('no cloud id', CloudSyncEntry.objects.get(pk=self.update.pk).last_error)
+
+    def test_entry_fails_after_max_attempts(self):
+        self.cloud_request.return_value = cloud_response(503)
+        for _ in range(3):
+            CloudSyncEntry.objects.filter(pk=self.create.pk).update(next_attempt_at=None)
+            self.replicate()
+        entry = CloudSyncEntry.objects.get(pk=self.create.pk)
+        self.assertEqual(entry.attempts, 3)
+        self.assertIsNotNone(entry.failed_at)
+
+    def test_failed_host_create_releases_the_export_hold(self):
+        self.network.cloud_pk = 7
+        self.network.save()
+        host = Host.objects.create(ip_address='10.0.0.1', network=self.network, user=self.user)
+        entry = enqueue(self.user, host, 'create', {"ip_address": "10.0.0.1"})
+        Ping.objects.create(host=host, network=self.network, is_alive=True)
+        self.assertEqual(next_export_batch(self.network, 0), [])
+        self.cloud_request.return_value = cloud_response(422)
+        self.assertFalse(replicate_next('host', host.pk))
+        self.assertIsNotNone(CloudSyncEntry.objects.get(pk=entry.pk).failed_at)
+        [row] = next_export_batch(self.network, 0)
+        self.assertEqual(row[1:3], (None, True))
@@ -0,0 +1,71 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from network.utils import cloud_request, get_cloud_token, invalidate_cloud_token
+
+
+def cloud_response(status_code, body=None, text=''):
+    response = mock.Mock(status_code=status_code, text=text)
+    response.json.return_value = body or {}
+    return response
+
+
+@override_settings(CLOUD_API_LOGIN_URL='http://cloud/login/', CLOUD_TOKEN_TTL=3600, CLOUD_TOKEN_EXPIRY_MARGIN=60)
+class CloudTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username='admin', cloud_api_password='secret')
+        self.tokens = iter(['first', 'second'])
+        cloud = mock.patch('network.utils.cloud')
+        self.cloud = cloud.start()
+        self.addCleanup(cloud.stop)
+        self.cloud.post.side_effect = lambda url, json: cloud_response(200, {"token": next(self.tokens)})
+        # The local memory cache has no locks of its own.
+        lock = mock.patch.object(cache, 'lock', create=True)
+        self.lock = lock.start()
+        self.addCleanup(lock.stop)
+
+    def test_token_is_cached_until_it_expires(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.assertEqual(get_cloud_token(self.user), ('first', None))
+        self.assertEqual(get_cloud_token(self.user), ('first', None))
+        self.cloud.post.assert_called_once_with('http://cloud/login/', json={"username": "admin", "password": "secret"})
+        self.lock.assert_called_once_with(f'cloud_token:{self.user.pk}:lock', timeout=30, blocking_timeout=10)
+        self.lock.return_value.release.assert_called_once()
+        self.assertEqual(cache_set.call_args.args[2], 3540)
+
+    def test_shorter_login_expiry_wins(self):
+        self.cloud.post.side_effect = None
+        self.cloud.post.return_value = cloud_response(200, {"token": "short", "expires_in": 600})
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            get_cloud_token(self.user)
+        self.assertEqual(cache_set.call_args.args[2], 540)
+
+    def test_failed_login_is_not_cached(self):
+        self.cloud.post.side_effect = None
+        self.cloud.post.return_value = cloud_response(403, text='bad credentials')
+        self.assertEqual(get_cloud_token(self.user), (None, 'bad credentials'))
+        self.assertEqual(get_cloud_token(self.user), (None, 'bad credentials'))
+        self.assertEqual(self.cloud.post.call_count, 2)
+
+    def test_rejected_token_is_replaced_and_the_request_retried_once(self):
+        token, _ = get_cloud_token(self.user)
+        sent = []
+
+        def request(method, url, headers):
+            sent.append(dict(headers))
+            return cloud_response(401 if len(sent) == 1 else 200)
+
+        self.cloud.request.side_effect = request
+        response = cloud_request(self.user, 'get', 'http://cloud/hosts/', token, headers={"X-Test": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sent, [{"X-Test": "1", "Authorization": "Bearer first"},
+                                {"X-Test": "1", "Authorization": "Bearer second"}])
+        self.assertEqual(get_cloud_token(self.user), ('second', None))
+
+    def test_stale_rejection_keeps_the_newer_token(self):
+        get_cloud_token(self.user)
+        invalidate_cloud_token(self.user, 'older')
+        self.assertEqual(get_cloud_token(self.user), ('first', None))
+        self.cloud.post.assert_called_once()
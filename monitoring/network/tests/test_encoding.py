@@ -0,0 +1,46 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from network.encoding import build_compact_payload, encode_ping_payload
+from network.models import Network
+
+T0 = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class CompactPayloadTests(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create(username='admin')
+        self.network = Network.objects.create(name='lab', admin=admin, cloud_pk=7)
+        self.rows = [
+            (11, True, T0, 400, 500, 600, 0, 150),
+            (12, False, T0 + timedelta(minutes=1)),
+            (11, True, T0 + timedelta(minutes=1, seconds=1), None, 800, 900, 33, None),
+        ]
+
+    def test_columns(self):
+        payload = build_compact_payload(self.network, self.rows)
+        self.assertEqual(payload['format'], 'compact-v1')
+        self.assertEqual(payload['network'], 7)
+        self.assertEqual(payload['network_admin'], 'admin')
+        self.assertEqual(payload['count'], 3)
+        self.assertEqual(payload['host'], [11, 12, 11])
+        self.assertEqual(payload['alive'], 'BQ==')  # bits 0 and 2
+        self.assertEqual(payload['t0'], int(T0.timestamp() * 1000))
+        self.assertEqual(payload['dt'], [0, 60000, 1000])
+        self.assertEqual(payload['rtt_avg'], [500, None, 800])
+        self.assertEqual(payload['loss'], [0, None, 33])
+        self.assertEqual(payload['jitter'], [150, None, None])
+
+    def test_gzip_round_trip(self):
+        body, headers = encode_ping_payload(self.network, self.rows, payload_format='compact', compression='gzip')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(body)), build_compact_payload(self.network, self.rows))
+
+    def test_uncompressed_json(self):
+        body, headers = encode_ping_payload(self.network, self.rows, payload_format='json', compression='none')
+        self.assertNotIn('Content-Encoding', headers)
+        data = json.loads(body)['data']
+        self.assertEqual([ping['host'] for ping in data], [11, 12, 11])
+        self.assertEqual(data[1]['rtt_avg'], None)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from network.models import ExportCursor, Host, Network, Ping, UploadBatch
+from network.spool import spool_next_batch
+
+
+@override_settings(CLOUD_EXPORT_SETTLE_SECONDS=0, CLOUD_INGEST_FORMAT='json', CLOUD_INGEST_COMPRESSION='gzip')
+class ExportCursorTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username='admin')
+
+    def network_with_pings(self, host_count):
+        network = Network.objects.create(name=f'lab-{host_count}', admin=self.admin, cloud_pk=host_count)
+        hosts = Host.objects.bulk_create([
+            Host(ip_address=f'10.{host_count}.{i // 200}.{i % 200 + 1}', network=network, user=self.admin,
+                 cloud_pk=host_count * 1000 + i)
+            for i in range(host_count)
+        ])
+        Ping.objects.bulk_create([Ping(host=host, network=network, is_alive=True, rtt_avg=500) for host in hosts])
+        ExportCursor.objects.create(network=network)
+        return Network.objects.get(pk=network.pk)
+
+    def test_spooling_does_not_query_per_host(self):
+        for host_count in (5, 200):
+            network = self.network_with_pings(host_count)
+            with self.subTest(hosts=host_count), self.assertNumQueries(8):
+                batch = spool_next_batch(network)
+            self.assertEqual(batch.ping_count, host_count)
+
+    @override_settings(CLOUD_EXPORT_BATCH_SIZE=3)
+    def test_cursor_advances_once_per_ping(self):
+        network = self.network_with_pings(5)
+        first, second = spool_next_batch(network), spool_next_batch(network)
+        self.assertIsNone(spool_next_batch(network))
+        self.assertEqual((first.ping_count, second.ping_count), (3, 2))
+        self.assertEqual(second.first_ping_id, first.last_ping_id + 1)
+        cursor = ExportCursor.objects.get(network=network)
+        last = Ping.objects.get(pk=second.last_ping_id)
+        self.assertEqual((cursor.last_ping_id, cursor.last_timestamp), (last.pk, last.timestamp))
+
+    @override_settings(CLOUD_EXPORT_SETTLE_SECONDS=60)
+    def test_unsettled_pings_wait(self):
+        network = self.network_with_pings(2)
+        self.assertIsNone(spool_next_batch(network))
+        Ping.objects.update(timestamp=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(spool_next_batch(network).ping_count, 2)
+
+    @override_settings(CURSOR_TIMESTAMP_MARGIN_SECONDS=3600)
+    def test_scan_is_bounded_by_the_cursor_timestamp(self):
+        network = self.network_with_pings(2)
+        spool_next_batch(network)
+        host = network.hosts.first()
+        stale = Ping.objects.create(host=host, network=network, is_alive=True)
+        Ping.objects.filter(pk=stale.pk).update(timestamp=timezone.now() - timedelta(hours=2))
+        fresh = Ping.objects.create(host=host, network=network, is_alive=False)
+        batch = spool_next_batch(network)
+        self.assertEqual((batch.first_ping_id, batch.last_ping_id), (fresh.pk, fresh.pk))
+        self.assertEqual(UploadBatch.objects.filter(network=network).count(), 2)
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from network.models import Host, Network
+
+
+@override_settings(API_CACHE_TTL=0)
+class ListEndpointTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='user')
+        self.network = Network.objects.create(name='lab', admin=self.user)
+        self.hosts = [
+            Host.objects.create(ip_address=f'10.0.0.{i + 1}', name=f'host-{i}', network=self.network, user=self.user,
+                                device_type='firewall' if i == 0 else 'server')
+            for i in range(5)
+        ]
+        other = get_user_model().objects.create(username='other')
+        Host.objects.create(ip_address='10.0.1.1', user=other)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def test_lists_are_plain_arrays_without_pagination_parameters(self):
+        response = self.client.get('/api/v1/hosts/')
+        self.assertIsInstance(response.data, list)
+        self.assertEqual({host['id'] for host in response.data}, {host.id for host in self.hosts})
+        self.assertEqual([network['name'] for network in self.client.get('/api/v1/networks/').data], ['lab'])
+
+    def test_page_size_opts_into_cursor_pages(self):
+        response = self.client.get('/api/v1/hosts/', {'page_size': 2})
+        self.assertEqual(set(response.data), {'next', 'previous', 'results'})
+        seen = [host['id'] for host in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [host['id'] for host in response.data['results']]
+        self.assertEqual(seen, [host.id for host in self.hosts])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_pages_cost_the_same_queries_however_many_rows(self):
+        Host.objects.bulk_create([
+            Host(ip_address=f'10.1.{i // 200}.{i % 200 + 1}', network=self.network, user=self.user) for i in range(300)
+        ])
+        for page_size in (2, 250):
+            with self.subTest(page_size=page_size), self.assertNumQueries(2):
+                self.client.get('/api/v1/hosts/', {'page_size': page_size})
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/v1/hosts/', {'fields': 'id,ip_address', 'page_size': 1})
+        self.assertEqual(response.data['results'], [{'id': self.hosts[0].id, 'ip_address': '10.0.0.1'}])
+        self.assertEqual(self.client.get('/api/v1/hosts/', {'fields': 'id,password'}).status_code, 400)
+
+    def test_host_filters(self):
+        def ips(**params):
+            return [host['ip_address'] for host in self.client.get('/api/v1/hosts/', params).data]
+
+        self.assertEqual(ips(device_type='firewall'), ['10.0.0.1'])
+        self.assertEqual(len(ips(network=self.network.pk, ip='10.0.0.')), 5)
+        self.assertEqual(ips(ip='10.0.1.'), [])
+        self.assertEqual(self.client.get('/api/v1/hosts/', {'network': 'lab'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/hosts/', {'device_type': 'toaster'}).status_code, 400)
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from network.encoding import build_ping_payload
+from network.models import Host, Network, Ping
+from network.spool import next_export_batch
+
+
+@override_settings(CLOUD_EXPORT_SETTLE_SECONDS=0, CLOUD_EXPORT_BATCH_SIZE=1000)
+class PingPayloadTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create(username='admin')
+
+    def network_with_pings(self, host_count):
+        network = Network.objects.create(name=f'lab-{host_count}', admin=self.admin, cloud_pk=host_count)
+        hosts = Host.objects.bulk_create([
+            Host(ip_address=f'10.{host_count}.{i // 200}.{i % 200 + 1}', network=network, user=self.admin,
+                 cloud_pk=host_count * 1000 + i)
+            for i in range(host_count)
+        ])
+        Ping.objects.bulk_create([Ping(host=host, network=network, is_alive=i % 2 == 0) for i, host in enumerate(hosts)])
+        return Network.objects.select_related('admin').get(pk=network.pk)
+
+    def test_payload_costs_one_query_however_many_hosts(self):
+        for host_count in (3, 150):
+            network = self.network_with_pings(host_count)
+            with self.subTest(hosts=host_count), self.assertNumQueries(1):
+                rows = next_export_batch(network, 0)
+                payload = build_ping_payload(network, [row[1:] for row in rows])
+            self.assertEqual(len(payload['data']), host_count)
+
+    def test_payload_carries_host_cloud_ids(self):
+        network = self.network_with_pings(2)
+        rows = next_export_batch(network, 0)
+        payload = build_ping_payload(network, [row[1:] for row in rows])
+        self.assertEqual((payload['network'], payload['network_admin']), (2, 'admin'))
+        self.assertEqual([(item['host'], item['is_alive']) for item in payload['data']], [(2000, True), (2001, False)])
+        self.assertEqual(payload['data'][0]['time'], payload['data'][0]['timestamp'])
@@ -0,0 +1,57 @@
+import subprocess
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from network.probes import NO_REPLY, ProbeResult, _parse_fping_counts, fping_sweep
+
+
+class FpingSweepTests(SimpleTestCase):
+    def test_parse_fping_counts(self):
+        results = dict.fromkeys(['10.0.0.1', '10.0.0.2', '10.0.0.3'], NO_REPLY)
+        output = (
+            "10.0.0.1 : 0.50 0.60 0.40\n"
+            "10.0.0.2 : - - -\n"
+            "10.0.0.3 : 1.00 - 3.00\n"
+            "10.0.0.4 : 0.10 0.10 0.10\n"
+            "ICMP Host Unreachable from 10.0.0.254 for ICMP Echo sent to 10.0.0.2\n"
+        )
+        _parse_fping_counts(output, results, 3)
+        self.assertTrue(results['10.0.0.1'].alive)
+        self.assertFalse(results['10.0.0.2'].alive)
+        self.assertTrue(results['10.0.0.3'].alive)
+        self.assertNotIn('10.0.0.4', results)
+
+    @override_settings(PROBE_COUNT=1)
+    def test_one_fping_process_per_chunk(self):
+        def run(command, input, **kwargs):
+            lines = [f"{ip} : {'-' if ip.startswith('127.') else '0.50'}" for ip in input.split("\n")]
+            return subprocess.CompletedProcess(command, 1, stdout="", stderr="\n".join(lines))
+
+        ips = [f"10.0.0.{i}" for i in range(1, 6)] + ["127.0.0.9", "10.0.0.1"]
+        with mock.patch('network.probes.subprocess.run', side_effect=run) as fping:
+            results = fping_sweep(ips, chunk_size=4, workers=2)
+        self.assertEqual(fping.call_count, 2)
+        self.assertEqual(set(results), set(ips))
+        self.assertEqual([ip for ip, result in results.items() if not result.alive], ["127.0.0.9"])
+
+    def test_failed_fping_reports_every_target_down(self):
+        with mock.patch('network.probes.subprocess.run', side_effect=OSError("fping not found")):
+            results = fping_sweep(["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(results, {"10.0.0.1": NO_REPLY, "10.0.0.2": NO_REPLY})
+
+
+class ProbeMetricsTests(SimpleTestCase):
+    def test_from_rtts_aggregates_replies(self):
+        result = ProbeResult.from_rtts(3, [0.0005, 0.0006, 0.0004])
+        self.assertEqual(result, ProbeResult(True, 400, 500, 600, 0, 150))
+
+    def test_from_rtts_counts_lost_requests(self):
+        self.assertEqual(ProbeResult.from_rtts(3, [0.001]), ProbeResult(True, 1000, 1000, 1000, 67, None))
+        self.assertEqual(ProbeResult.from_rtts(2, []), ProbeResult(False, None, None, None, 100, None))
+        self.assertIs(ProbeResult.from_rtts(0, []), NO_REPLY)
+
+    def test_parse_fping_counts_metrics(self):
+        results = dict.fromkeys(['10.0.0.1', '10.0.0.2', '10.0.0.3'], NO_REPLY)
+        _parse_fping_counts("10.0.0.1 : 0.50 0.60 0.40\n10.0.0.2 : - - -\n10.0.0.3 : 1.00 - 3.00\n", results, 3)
+        self.assertEqual(results['10.0.0.1'], ProbeResult(True, 400, 500, 600, 0, 150))
+        self.assertEqual(results['10.0.0.2'], ProbeResult(False, None, None, None, 100, None))
+        self.assertEqual(results['10.0.0.3'], ProbeResult(True, 1000, 2000, 3000, 33, 2000))
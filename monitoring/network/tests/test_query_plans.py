@@ -0,0 +1,56 @@
+from datetime import timedelta
+from unittest import skipUnless
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from network.models import Host, Network, Ping
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are checked on PostgreSQL.')
+class PingQueryPlanTests(TestCase):
+    """
+    The hot Ping access patterns must be served by indexes, not a sequential
+    scan of network_ping.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = get_user_model().objects.create(username='admin')
+        networks = Network.objects.bulk_create([Network(name=f'network-{i}', admin=admin) for i in range(10)])
+        hosts = Host.objects.bulk_create([
+            Host(ip_address=f'10.0.{i // 256}.{i % 256}', network=networks[i % len(networks)]) for i in range(200)
+        ])
+        # One ping per host per minute for the last day, inserted in time
+        # order like the real sweep so BRIN correlation holds.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {Ping._meta.db_table} (host_id, network_id, is_alive, timestamp) "
+                f"SELECT h.id, h.network_id, true, ts FROM {Host._meta.db_table} h "
+                "CROSS JOIN generate_series(now() - interval '1 day', now(), interval '1 minute') ts "
+                "WHERE h.id = ANY(%s) ORDER BY ts",
+                [[host.id for host in hosts]],
+            )
+            cursor.execute(f'ANALYZE {Ping._meta.db_table}')
+        cls.network, cls.host = networks[0], hosts[0]
+        cls.since = timezone.now() - timedelta(minutes=5)
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan, plan)
+
+    def test_network_window(self):
+        self.assertUsesIndex(Ping.objects.filter(network=self.network, timestamp__gte=self.since))
+
+    def test_host_history(self):
+        self.assertUsesIndex(Ping.objects.filter(host=self.host, timestamp__gte=self.since).order_by('-timestamp'))
+
+    def test_export_batch(self):
+        self.assertUsesIndex(
+            Ping.objects.filter(network=self.network, id__gt=0, timestamp__gte=self.since).order_by('id')
+        )
+
+    def test_time_range(self):
+        self.assertUsesIndex(Ping.objects.filter(
+            timestamp__gte=self.since - timedelta(hours=13), timestamp__lt=self.since - timedelta(hours=12)
+        ).values('id'))
@@ -0,0 +1,90 @@
+import csv
+import io
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from network.models import Host, Network, Ping
+from network.probes import ProbeResult
+from network.recorder import record_pings
+
+
+@override_settings(PING_STORAGE_MODE='all', PING_BULK_BATCH_SIZE=2, PING_COPY_THRESHOLD=3)
+class RecordPingsTests(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create(username='admin')
+        network = Network.objects.create(name='lab', admin=admin)
+        self.hosts = [Host.objects.create(ip_address='10.0.0.1', network=network),
+                      Host.objects.create(ip_address='10.0.0.2')]
+        self.results = {'10.0.0.1': ProbeResult.from_rtts(2, [0.001, 0.003])}
+
+    def test_sweep_is_bulk_created_below_the_copy_threshold(self):
+        with self.assertNumQueries(3):
+            record_pings(self.hosts, self.results)
+        self.assertEqual(
+            list(Ping.objects.order_by('host_id').values_list('host_id', 'network_id', 'is_alive', 'rtt_avg', 'loss')),
+            [(self.hosts[0].pk, self.hosts[0].network_id, True, 2000, 0), (self.hosts[1].pk, None, False, None, None)],
+        )
+
+    def test_large_sweep_on_postgresql_is_copied(self):
+        hosts = self.hosts + [Host.objects.create(ip_address='10.0.0.3')]
+        copied = []
+        with mock.patch('network.recorder.connection') as postgresql:
+            postgresql.vendor = 'postgresql'
+            postgresql.ops.quote_name = lambda name: f'"{name}"'
+            cursor = postgresql.cursor.return_value.__enter__.return_value
+            cursor.copy_expert.side_effect = lambda sql, buffer: copied.append((sql, buffer.read()))
+            pings = record_pings(hosts, self.results)
+        self.assertEqual(len(pings), 3)
+        self.assertFalse(Ping.objects.exists())
+        [(sql, body)] = copied
+        self.assertEqual(sql, 'COPY "network_ping" (host_id, network_id, is_alive, timestamp, rtt_min, rtt_avg, '
+                              'rtt_max, loss, jitter) FROM STDIN WITH (FORMAT csv)')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][:3] + rows[0][4:], [str(hosts[0].pk), str(hosts[0].network_id), 't',
+                                                     '1000', '2000', '3000', '0', '2000'])
+        self.assertEqual(rows[1][:3] + rows[1][4:], [str(hosts[1].pk), '', 'f', '', '', '', '', ''])
+        self.assertEqual(rows[0][3], pings[0].timestamp.isoformat())
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY needs PostgreSQL.')
+    def test_copied_rows_read_back(self):
+        record_pings(self.hosts + [Host.objects.create(ip_address='10.0.0.3')], self.results)
+        self.assertEqual(Ping.objects.filter(is_alive=False, rtt_avg__isnull=True, network__isnull=True).count(), 2)
+        self.assertEqual(Ping.objects.get(is_alive=True).jitter, 2000)
+
+
+@override_settings(PING_STORAGE_MODE='changes', PING_HEARTBEAT_SECONDS=900, PING_COPY_THRESHOLD=0)
+class ChangeOnlyStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hosts = [Host.objects.create(ip_address=f'10.0.0.{i + 1}') for i in range(3)]
+        self.now = timezone.now()
+
+    def sweep(self, *alive, minutes=0):
+        results = {host.ip_address: ProbeResult.from_rtts(1, [0.001]) for host in alive}
+        with mock.patch('network.recorder.timezone.now', return_value=self.now + timedelta(minutes=minutes)):
+            with self.captureOnCommitCallbacks(execute=True):
+                pings = record_pings(self.hosts, results)
+        return [(ping.host_id, ping.is_alive) for ping in pings]
+
+    def test_only_transitions_are_written_once_states_are_known(self):
+        self.assertEqual(len(self.sweep(*self.hosts)), 3)
+        self.assertEqual(self.sweep(*self.hosts, minutes=1), [])
+        self.assertEqual(self.sweep(self.hosts[0], self.hosts[2], minutes=2), [(self.hosts[1].pk, False)])
+        self.assertEqual(Ping.objects.count(), 4)
+
+    def test_unchanged_hosts_are_written_every_heartbeat(self):
+        self.sweep(*self.hosts)
+        self.sweep(self.hosts[0], self.hosts[1], minutes=10)
+        self.assertEqual(self.sweep(self.hosts[0], self.hosts[1], minutes=14), [])
+        # The third host was last written at its transition, at minute 10.
+        self.assertEqual([host_id for host_id, _ in self.sweep(self.hosts[0], self.hosts[1], minutes=15)],
+                         [self.hosts[0].pk, self.hosts[1].pk])
+
+    def test_states_are_only_remembered_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            record_pings(self.hosts, {})
+        self.assertEqual(len(self.sweep()), 3)
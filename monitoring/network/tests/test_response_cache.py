@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from network.models import Host, Network
+from network.response_cache import response_cache_stats, user_version
+
+
+@override_settings(API_CACHE_TTL=300)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username='user')
+        self.other = get_user_model().objects.create(username='other')
+        self.network = Network.objects.create(name='lab', admin=self.user)
+        self.host = Host.objects.create(ip_address='10.0.0.1', name='router', network=self.network, user=self.user)
+
+    def get(self, url, user=None):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user or self.user)[0].key}')
+        return client.get(url)
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        first, second = self.get('/api/v1/hosts/'), self.get('/api/v1/hosts/')
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('miss', 'hit'))
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(response_cache_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_saving_a_host_invalidates_its_owner_after_commit(self):
+        url = f'/api/v1/hosts/{self.host.pk}/'
+        self.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.host.name = 'core-router'
+            self.host.save()
+        response = self.get(url)
+        self.assertEqual((response['X-Cache'], response.data['name']), ('miss', 'core-router'))
+
+    def test_moving_a_host_invalidates_both_owners_without_reading_it_back(self):
+        host = Host.objects.get(pk=self.host.pk)
+        versions = user_version(self.user.pk), user_version(self.other.pk)
+        host.user = self.other
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            host.save()
+        self.assertNotEqual(user_version(self.user.pk), versions[0])
+        self.assertNotEqual(user_version(self.other.pk), versions[1])
+
+    def test_deleting_a_network_invalidates_only_its_admin(self):
+        self.get('/api/v1/networks/')
+        self.get('/api/v1/networks/', user=self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            Network.objects.create(name='spare', admin=self.user).delete()
+        self.assertEqual(self.get('/api/v1/networks/')['X-Cache'], 'miss')
+        self.assertEqual(self.get('/api/v1/networks/', user=self.other)['X-Cache'], 'hit')
+
+    def test_errors_are_not_cached(self):
+        url = f'/api/v1/hosts/{self.host.pk}/'
+        self.assertEqual(self.get(url, user=self.other).status_code, 404)
+        self.assertEqual(self.get(url, user=self.other).status_code, 404)
+        self.assertEqual(response_cache_stats()['hits'], 0)
+
+    @override_settings(API_CACHE_TTL=0)
+    def test_zero_ttl_disables_the_cache(self):
+        self.get('/api/v1/hosts/')
+        self.assertNotIn('X-Cache', self.get('/api/v1/hosts/'))
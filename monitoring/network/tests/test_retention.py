@@ -0,0 +1,90 @@
+import csv
+import gzip
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from network import retention
+from network.models import Host, Network, Ping
+from network.retention import prune_pings
+from network.tasks import enforce_ping_retention
+
+
+class PruneTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='user')
+        self.network = Network.objects.create(name='lab', admin=self.user)
+        self.host = Host.objects.create(ip_address='10.0.0.1', network=self.network, user=self.user)
+        self.now = timezone.now()
+        self.cutoff = self.now - timedelta(days=30)
+
+    def store(self, *ages):
+        pings = []
+        for age in ages:
+            ping = Ping.objects.create(host=self.host, network=self.network, is_alive=True, rtt_avg=1500)
+            Ping.objects.filter(pk=ping.pk).update(timestamp=self.now - age)
+            pings.append(ping)
+        return pings
+
+    def test_old_pings_are_deleted_in_chunks(self):
+        self.store(*[timedelta(days=40, minutes=-i) for i in range(5)], timedelta(days=1))
+        progress = mock.Mock()
+        self.assertEqual(prune_pings(self.cutoff, batch_size=2, sleep=0, progress=progress), 5)
+        self.assertEqual([call.args[0] for call in progress.call_args_list], [2, 4, 5])
+        self.assertEqual(Ping.objects.count(), 1)
+
+    def test_dry_run_only_counts(self):
+        self.store(timedelta(days=40), timedelta(days=35), timedelta(days=1))
+        self.assertEqual(prune_pings(self.cutoff, batch_size=10, sleep=0, dry_run=True), 2)
+        self.assertEqual(Ping.objects.count(), 3)
+
+    def test_late_old_pings_beyond_the_boundary_wait(self):
+        # An old ping stored after the first ping inside the horizon.
+        _, inside, late = self.store(timedelta(days=40), timedelta(days=29, hours=23), timedelta(days=31))
+        self.assertEqual(retention._horizon_boundary(self.cutoff), inside.pk)
+        self.assertEqual(prune_pings(self.cutoff, batch_size=10, sleep=0), 1)
+        self.assertEqual(set(Ping.objects.values_list('pk', flat=True)), {inside.pk, late.pk})
+
+    def test_boundary_search_widens_past_empty_windows(self):
+        _, first_inside, _ = self.store(timedelta(days=40), timedelta(days=20), timedelta(days=1))
+        self.assertEqual(retention._horizon_boundary(self.cutoff), first_inside.pk)
+        self.assertIsNone(retention._horizon_boundary(self.now + timedelta(hours=1)))
+
+    def test_chunks_are_archived_before_they_are_deleted(self):
+        old = self.store(timedelta(days=40), timedelta(days=39), timedelta(days=38))
+        self.store(timedelta(days=1))
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(prune_pings(self.cutoff, batch_size=2, sleep=0, archive_dir=directory), 3)
+            names = sorted(os.listdir(directory))
+            self.assertEqual(names, [f'pings-{old[0].pk}-{old[1].pk}.csv.gz', f'pings-{old[2].pk}-{old[2].pk}.csv.gz'])
+            with gzip.open(os.path.join(directory, names[0]), 'rt', newline='') as archive:
+                rows = list(csv.reader(archive))
+        self.assertEqual(tuple(rows[0]), retention.ARCHIVE_COLUMNS)
+        self.assertEqual([row[0] for row in rows[1:]], [str(old[0].pk), str(old[1].pk)])
+        self.assertEqual(rows[1][retention.ARCHIVE_COLUMNS.index('rtt_avg')], '1500')
+        self.assertEqual(Ping.objects.count(), 1)
+
+    def test_failed_archive_keeps_the_chunk(self):
+        self.store(timedelta(days=40))
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(retention, 'archive_chunk', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                prune_pings(self.cutoff, batch_size=10, sleep=0, archive_dir=directory)
+        self.assertEqual(Ping.objects.count(), 1)
+
+    @mock.patch.object(retention, 'pyarrow', None)
+    def test_parquet_falls_back_to_csv_without_pyarrow(self):
+        self.assertEqual(retention.archive_format('parquet'), 'csv')
+        with self.assertRaises(ValueError):
+            retention.archive_format('xlsx')
+
+    @override_settings(PING_RETENTION_DAYS=30, PING_RETENTION_SLEEP=0, PING_ARCHIVE_DIR='')
+    def test_task_prunes_past_the_retention_horizon(self):
+        self.store(timedelta(days=40), timedelta(days=1))
+        self.assertEqual(enforce_ping_retention(), 1)
+        with override_settings(PING_RETENTION_DAYS=0):
+            self.assertEqual(enforce_ping_retention(), 0)
+        self.assertEqual(Ping.objects.count(), 1)
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from network.models import Host, HostUptimeRollup, Network, NetworkUptimeRollup, Ping, RollupCursor
+from network.rollups import _previous_records, accumulate, roll_up_next_batch
+
+T0 = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+@override_settings(PING_STATE_VALID_SECONDS=1020, CLOUD_EXPORT_SETTLE_SECONDS=0)
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='user')
+        self.network = Network.objects.create(name='lab', admin=self.user)
+        self.host = Host.objects.create(ip_address='10.0.0.1', network=self.network, user=self.user)
+
+    def row(self, minute, is_alive):
+        return (self.host.id, self.network.id, is_alive, T0 + timedelta(minutes=minute), None, None, None, None)
+
+    def store(self, *records):
+        for minute, is_alive in records:
+            ping = Ping.objects.create(host=self.host, network=self.network, is_alive=is_alive)
+            Ping.objects.filter(pk=ping.pk).update(timestamp=T0 + timedelta(minutes=minute))
+
+    def test_states_are_weighted_by_time_held(self):
+        # Change-only storage: up, down for three minutes, up, heartbeat.
+        buckets = accumulate([self.row(0, True), self.row(10, False), self.row(13, True), self.row(28, True)])
+        hour = buckets[(self.host.id, '1h', T0)]
+        self.assertEqual((hour['alive_count'], hour['total_count']), (3, 4))
+        self.assertEqual((hour['alive_seconds'], hour['known_seconds']), (1500, 1680))
+        self.assertEqual(hour['longest_outage'], 180)
+        # A minute without records still gets the state held through it.
+        minute = buckets[(self.host.id, '1m', T0 + timedelta(minutes=11))]
+        self.assertEqual((minute['total_count'], minute['alive_seconds'], minute['known_seconds']), (0, 0, 60))
+
+    @override_settings(PING_STATE_VALID_SECONDS=120)
+    def test_state_is_not_trusted_after_it_expires(self):
+        hour = accumulate([self.row(0, False), self.row(10, True)])[(self.host.id, '1h', T0)]
+        self.assertEqual((hour['alive_seconds'], hour['known_seconds']), (0, 120))
+
+    @override_settings(ROLLUP_BATCH_SIZE=2)
+    def test_batches_carry_the_previous_record(self):
+        self.store((0, True), (10, False), (13, True), (28, True))
+        while roll_up_next_batch():
+            pass
+        host_hour = HostUptimeRollup.objects.get(host=self.host, granularity='1h')
+        self.assertEqual((host_hour.alive_seconds, host_hour.known_seconds), (1500, 1680))
+        self.assertEqual(host_hour.total_count, 4)
+        network_hour = NetworkUptimeRollup.objects.get(network=self.network, granularity='1h')
+        self.assertEqual(network_hour.uptime, host_hour.uptime)
+        cursor = RollupCursor.objects.get(pk=1)
+        self.assertEqual(cursor.last_timestamp, T0 + timedelta(minutes=28))
+
+    @override_settings(ROLLUP_BATCH_SIZE=1)
+    def test_gap_longer_than_validity_still_counts_the_last_state(self):
+        self.store((0, False), (60, True), (61, True))
+        while roll_up_next_batch():
+            pass
+        first_hour = HostUptimeRollup.objects.get(host=self.host, granularity='1h', bucket=T0)
+        self.assertEqual((first_hour.alive_seconds, first_hour.known_seconds), (0, 1020))
+
+    def test_previous_records_are_looked_up_in_one_query(self):
+        for host_count in (2, 40):
+            hosts = Host.objects.bulk_create([
+                Host(ip_address=f'10.{host_count}.0.{i + 1}', network=self.network, user=self.user)
+                for i in range(host_count)
+            ])
+            # Each host has an older and a latest minute rollup, the later hosts' from hours ago.
+            for i, host in enumerate(hosts):
+                for bucket in (T0 - timedelta(hours=i, minutes=1), T0 - timedelta(hours=i)):
+                    HostUptimeRollup.objects.create(
+                        host=host, network=self.network, granularity='1m', bucket=bucket, alive_count=1,
+                        total_count=1, last_ping_at=bucket, outage_started_at=bucket if i % 2 else None,
+                    )
+            with self.subTest(hosts=host_count), self.assertNumQueries(1):
+                previous = _previous_records([host.id for host in hosts], T0)
+            self.assertEqual(previous, {
+                host.id: (T0 - timedelta(hours=i), i % 2 == 0, T0 - timedelta(hours=i) if i % 2 else None)
+                for i, host in enumerate(hosts)
+            })
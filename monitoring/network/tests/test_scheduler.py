@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from network.models import Host
+from network.probes import ProbeResult
+from network.scheduler import SCHEDULE_KEY, STATE_KEY, apply_results, pop_due, sync_schedule
+from network.tests.fakes import FakeRedis
+
+NOW = 1_000_000
+
+
+@override_settings(PROBE_INTERVAL=60, PROBE_DEVICE_INTERVALS={'firewall': 15}, PROBE_BACKOFF_AFTER=2,
+                   PROBE_MAX_INTERVAL=300, PROBE_CONFIRMATIONS=2, PROBE_CONFIRM_INTERVAL=5,
+                   PROBE_LEASE_SECONDS=30)
+class SchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.redis = FakeRedis()
+        self.host = Host.objects.create(ip_address='10.0.0.1')
+        self.redis.zsets[SCHEDULE_KEY] = {self.host.id: NOW}
+
+    def probe(self, alive, offset):
+        now = NOW + offset
+        results = {self.host.ip_address: ProbeResult.from_rtts(1, [0.001])} if alive else {}
+        recorded = apply_results(self.redis, [self.host], results, now=now)
+        return bool(recorded), self.redis.zsets[SCHEDULE_KEY][self.host.id] - now
+
+    def test_stable_host_backs_off(self):
+        intervals = [self.probe(True, offset)[1] for offset in range(0, 600, 60)]
+        self.assertEqual(intervals[:6], [60, 60, 120, 120, 240, 240])
+        self.assertEqual(max(intervals), 300)
+
+    def test_down_is_recorded_only_after_confirmation(self):
+        self.assertEqual(self.probe(True, 0), (True, 60))
+        self.assertEqual(self.probe(False, 60), (False, 5))
+        self.assertEqual(self.probe(False, 65), (False, 5))
+        self.assertEqual(self.probe(False, 70), (True, 60))
+
+    def test_recovered_host_is_not_reported_down(self):
+        self.probe(True, 0)
+        self.assertEqual(self.probe(False, 60), (False, 5))
+        self.assertEqual(self.probe(True, 65), (True, 60))
+        self.assertEqual(self.redis.hashes[STATE_KEY][self.host.id], b'1:1:0')
+
+    def test_sync_adds_new_hosts_within_their_interval_and_drops_deleted_ones(self):
+        firewall = Host.objects.create(ip_address='10.0.0.2', device_type='firewall')
+        self.redis.zsets[SCHEDULE_KEY][9999] = NOW
+        sync_schedule(self.redis, now=NOW)
+        schedule = self.redis.zsets[SCHEDULE_KEY]
+        self.assertEqual(set(schedule), {self.host.id, firewall.id})
+        self.assertEqual(schedule[self.host.id], NOW)
+        self.assertTrue(NOW <= schedule[firewall.id] <= NOW + 15)
+
+    def test_due_hosts_are_leased(self):
+        self.assertEqual(pop_due(self.redis, now=NOW, limit=10), [self.host.id])
+        self.assertEqual(self.redis.zsets[SCHEDULE_KEY][self.host.id], NOW + 30)
+        self.assertEqual(pop_due(self.redis, now=NOW + 1, limit=10), [])
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from network.models import Network, UploadBatch
+from network.spool import spool_stats
+from network.tasks import drain_network_spool
+
+
+def cloud_response(status_code):
+    return mock.Mock(status_code=status_code, text='')
+
+
+@override_settings(SPOOL_DRAIN_MAX_BATCHES=10, SPOOL_RETRY_BACKOFF=30, SPOOL_RETRY_BACKOFF_MAX=3600,
+                   OUTBOX_LEASE_SECONDS=120)
+class SpoolDrainTests(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create(username='admin')
+        self.network = Network.objects.create(name='lab', admin=admin, cloud_pk=7)
+        self.batches = [
+            UploadBatch.objects.create(network=self.network, first_ping_id=first, last_ping_id=first + 9,
+                                       ping_count=10, body=b'{}', headers={'Content-Type': 'application/json'})
+            for first in (1, 11, 21)
+        ]
+        token = mock.patch('network.spool.get_cloud_token', return_value=('cloud-token', None))
+        token.start()
+        self.addCleanup(token.stop)
+        cloud = mock.patch('network.spool.cloud_request', return_value=cloud_response(201))
+        self.cloud_request = cloud.start()
+        self.addCleanup(cloud.stop)
+
+    def idempotency_keys(self):
+        return [call.kwargs['headers']['Idempotency-Key'] for call in self.cloud_request.call_args_list]
+
+    def test_batches_are_delivered_in_order_and_deleted(self):
+        self.assertEqual(drain_network_spool(self.network.pk), 3)
+        self.assertEqual(self.idempotency_keys(), ['7-1-10', '7-11-20', '7-21-30'])
+        self.assertFalse(UploadBatch.objects.exists())
+
+    def test_batch_is_claimed_before_the_upload(self):
+        def upload(*args, **kwargs):
+            if self.cloud_request.call_count == 1:
+                batch = UploadBatch.objects.get(pk=self.batches[0].pk)
+                self.assertGreater(batch.next_attempt_at, timezone.now() + timedelta(seconds=100))
+                # A concurrent drain finds the spool claimed.
+                self.assertEqual(drain_network_spool(self.network.pk), 0)
+            return cloud_response(201)
+
+        self.cloud_request.side_effect = upload
+        self.assertEqual(drain_network_spool(self.network.pk), 3)
+        self.assertEqual(self.cloud_request.call_count, 3)
+
+    def test_failed_batch_backs_off_and_blocks_the_batches_behind_it(self):
+        self.cloud_request.return_value = cloud_response(503)
+        self.assertEqual(drain_network_spool(self.network.pk), 0)
+        failed = UploadBatch.objects.get(pk=self.batches[0].pk)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('503', failed.last_error)
+        self.assertEqual(drain_network_spool(self.network.pk), 0)
+        self.assertEqual(self.cloud_request.call_count, 1)
+        self.assertEqual(UploadBatch.objects.count(), 3)
+        self.assertEqual(spool_stats()['failing_networks'], 1)
@@ -0,0 +1,73 @@
+import json
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from network.models import Host, Network, Ping
+from network.probes import ProbeResult
+from network.status import events_channel, publish_status, status_report
+from network.tests.fakes import FakeRedis
+
+
+@override_settings(PING_STATE_VALID_SECONDS=300, STATUS_SNAPSHOT_TTL=3600, API_CACHE_TTL=0)
+class StatusSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='user')
+        self.network = Network.objects.create(name='lab', admin=self.user)
+        self.hosts = [
+            Host.objects.create(ip_address=f'10.0.0.{i + 1}', name=f'host-{i}', network=self.network, user=self.user)
+            for i in range(3)
+        ]
+        self.redis = FakeRedis()
+        redis = mock.patch('network.status.get_redis', return_value=self.redis)
+        self.get_redis = redis.start()
+        self.addCleanup(redis.stop)
+
+    def sweep(self, *alive, now=None):
+        results = {host.ip_address: ProbeResult.from_rtts(1, [0.001]) for host in alive}
+        return publish_status(self.hosts, results, now or timezone.now())
+
+    def test_transitions_are_published_once_the_snapshot_is_warm(self):
+        self.assertEqual(self.sweep(*self.hosts), 0)
+        self.assertEqual(self.redis.published, [])
+        self.assertEqual(self.sweep(self.hosts[0], self.hosts[2]), 1)
+        self.assertEqual(self.sweep(self.hosts[0], self.hosts[2]), 0)
+        [(channel, message)] = self.redis.published
+        self.assertEqual(channel, events_channel(self.network.pk))
+        message = json.loads(message)
+        self.assertEqual(message['network'], self.network.pk)
+        self.assertEqual([(t['host'], t['is_alive']) for t in message['transitions']], [(self.hosts[1].pk, False)])
+
+    def test_report_is_served_from_the_snapshot(self):
+        self.sweep(self.hosts[0], now=timezone.now())
+        Host.objects.filter(pk=self.hosts[1].pk).update(network=None)
+        Host.objects.create(ip_address='10.0.0.9', network=self.network)
+        self.hosts = self.hosts[2:]
+        self.sweep(now=timezone.now() - timedelta(minutes=10))
+        with self.assertNumQueries(1):
+            report = status_report(self.network)
+        self.assertEqual(report['source'], 'cache')
+        self.assertEqual([host['is_alive'] for host in report['hosts']], [True, None, None])
+        self.assertEqual(report['summary'], {'up': 1, 'down': 0, 'unknown': 2})
+
+    def test_cold_snapshot_is_rebuilt_from_the_latest_pings_and_written_back(self):
+        for host, states in zip(self.hosts, ([False, True], [True, False])):
+            for is_alive in states:
+                Ping.objects.create(host=host, network=self.network, is_alive=is_alive)
+        report = status_report(self.network)
+        self.assertEqual(report['source'], 'database')
+        self.assertEqual([host['is_alive'] for host in report['hosts']], [True, False, None])
+        self.assertEqual(self.redis.ttls, {f'network_status:{self.network.pk}': 3600})
+        self.assertEqual(status_report(self.network)['source'], 'cache')
+
+    def test_status_endpoint_without_redis(self):
+        self.get_redis.return_value = None
+        self.assertEqual(self.sweep(*self.hosts), 0)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        response = client.get(f'/api/v1/networks/{self.network.pk}/status/')
+        self.assertEqual((response.status_code, response.data['source']), (200, 'database'))
+        self.assertEqual(response.data['summary'], {'up': 0, 'down': 0, 'unknown': 3})
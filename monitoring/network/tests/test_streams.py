@@ -0,0 +1,57 @@
+from unittest import mock
+from redis.exceptions import ConnectionError
+from django.test import SimpleTestCase, override_settings
+from network.status import events_channel
+from network.streams import _event_stream, _Subscriptions
+from .fakes import FakePubSub
+
+
+CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'redis://redis:6379/1'}}
+
+
+@override_settings(CACHES=CACHES, STATUS_STREAM_KEEPALIVE=5, STATUS_STREAM_RETRY_MS=1000)
+class EventStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.pubsub = FakePubSub()
+        client = mock.Mock(pubsub=mock.Mock(return_value=self.pubsub), aclose=mock.AsyncMock())
+        from_url = mock.patch('network.streams.aioredis.from_url', return_value=client)
+        self.from_url = from_url.start()
+        self.addCleanup(from_url.stop)
+        subscriptions = mock.patch('network.streams._subscriptions', _Subscriptions())
+        subscriptions.start()
+        self.addCleanup(subscriptions.stop)
+
+    async def open_streams(self, *network_ids):
+        streams = [_event_stream(network_id) for network_id in network_ids]
+        for stream in streams:
+            self.assertEqual(await anext(stream), "retry: 1000\n\n")
+        return streams
+
+    async def test_clients_share_one_connection_and_subscription(self):
+        first, second, other = await self.open_streams(1, 1, 2)
+        self.assertEqual(self.pubsub.channels, {events_channel(1), events_channel(2)})
+        self.pubsub.publish(events_channel(1), '{"network": 1}')
+        for stream in (first, second):
+            self.assertEqual(await anext(stream), 'event: transitions\ndata: {"network": 1}\n\n')
+        self.from_url.assert_called_once_with('redis://redis:6379/1')
+        await first.aclose()
+        await other.aclose()
+        self.assertEqual(self.pubsub.channels, {events_channel(1)})
+        await second.aclose()
+        self.assertEqual(self.pubsub.channels, set())
+
+    @override_settings(STATUS_STREAM_KEEPALIVE=0.01)
+    async def test_idle_stream_gets_keepalives(self):
+        [stream] = await self.open_streams(1)
+        self.assertEqual(await anext(stream), ": keepalive\n\n")
+        await stream.aclose()
+
+    async def test_lost_connection_ends_every_stream_and_the_next_client_reconnects(self):
+        streams = await self.open_streams(1, 2)
+        self.pubsub.fail(ConnectionError('Connection closed by server.'))
+        with self.assertLogs('network.streams', 'WARNING'):
+            for stream in streams:
+                with self.assertRaises(StopAsyncIteration):
+                    await anext(stream)
+        await self.open_streams(1)
+        self.assertEqual(self.from_url.call_count, 2)
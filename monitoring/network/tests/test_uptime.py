@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from network.models import Host, HostUptimeRollup, Network
+from network.uptime import align, uptime_series
+
+T0 = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class UptimeTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='user')
+        self.network = Network.objects.create(name='lab', admin=self.user)
+        self.host = Host.objects.create(ip_address='10.0.0.1', network=self.network, user=self.user)
+        for minute, alive_seconds, known_seconds, rtt_sum in ((0, 60, 60, 1000), (1, 0, 60, 0), (2, 30, 30, 3000)):
+            HostUptimeRollup.objects.create(
+                host=self.host, network=self.network, granularity='1m', bucket=T0 + timedelta(minutes=minute),
+                alive_count=1, total_count=1, alive_seconds=alive_seconds, known_seconds=known_seconds,
+                rtt_count=1 if rtt_sum else 0, rtt_sum=rtt_sum, rtt_max=rtt_sum or None,
+            )
+
+    def test_align_widens_to_whole_slots(self):
+        start, end = align(T0 + timedelta(minutes=7), T0 + timedelta(minutes=52), timedelta(minutes=15))
+        self.assertEqual((start, end), (T0, T0 + timedelta(hours=1)))
+        self.assertEqual(align(T0, T0 + timedelta(hours=1), timedelta(hours=1)), (T0, T0 + timedelta(hours=1)))
+
+    def test_series_is_downsampled_and_weighted_by_known_seconds(self):
+        points, summary = uptime_series(
+            HostUptimeRollup.objects.filter(host=self.host), T0, T0 + timedelta(minutes=4), 2, '1m',
+        )
+        self.assertEqual([point['start'] for point in points], [T0, T0 + timedelta(minutes=2)])
+        self.assertEqual([point['uptime'] for point in points], [0.5, 1.0])
+        self.assertEqual([point['total'] for point in points], [2, 1])
+        self.assertEqual([point['rtt_avg'] for point in points], [1.0, 3.0])
+        self.assertEqual(summary['uptime'], 90 / 150)
+        self.assertEqual(summary['known_seconds'], 150)
+        self.assertEqual(summary['rtt_avg'], 2.0)
+        self.assertEqual(summary['rtt_max'], 3.0)
+
+    def test_api_returns_points_and_honours_etag(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        url = f'/api/v1/hosts/{self.host.pk}/uptime/'
+        params = {'from': T0.isoformat(), 'to': (T0 + timedelta(minutes=4)).isoformat(), 'points': 2, 'bucket': '1m'}
+        response = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['points']), 2)
+        self.assertEqual(response.data['summary']['uptime'], 90 / 150)
+        cached = client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(client.get(url, {**params, 'points': 0}).status_code, 400)
+        other = get_user_model().objects.create(username='other')
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        self.assertEqual(client.get(url, params).status_code, 404)
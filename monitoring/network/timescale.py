@@ -0,0 +1,117 @@
+"""
+TimescaleDB support for the Ping table.
+
+When the database has the timescaledb extension available, network_ping is
+turned into a hypertable partitioned on `timestamp` with native compression
+and a retention policy. On plain PostgreSQL every helper here is a no-op and
+retention falls back to the enforce_ping_retention task.
+"""
+from django.conf import settings
+from django.db import DatabaseError, transaction
+import logging
+
+logger = logging.getLogger(__name__)
+
+PING_TABLE = 'network_ping'
+
+
+def timescale_available(connection):
+    """
+    Return True if the timescaledb extension can be used on this connection.
+    """
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'timescaledb'")
+        return cursor.fetchone() is not None
+
+
+def is_hypertable(connection, table=PING_TABLE):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")
+        if cursor.fetchone() is None:
+            return False
+        cursor.execute(
+            "SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = %s",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_ping_hypertable(connection):
+    """
+    Convert network_ping into a hypertable partitioned on `timestamp`.
+
+    TimescaleDB requires the partitioning column in every unique index, so the
+    primary key becomes (id, timestamp); Django still treats `id` as the pk.
+    Returns True if the table is a hypertable afterwards.
+    """
+    if is_hypertable(connection):
+        return True
+    if not timescale_available(connection):
+        logger.info("TimescaleDB not available; keeping network_ping as a plain table")
+        return False
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS timescaledb")
+                cursor.execute(
+                    "SELECT conname FROM pg_constraint "
+                    "WHERE conrelid = %s::regclass AND contype = 'p'",
+                    [PING_TABLE],
+                )
+                pkey = cursor.fetchone()[0]
+                cursor.execute(f'ALTER TABLE {PING_TABLE} DROP CONSTRAINT "{pkey}"')
+                cursor.execute(f'ALTER TABLE {PING_TABLE} ADD PRIMARY KEY (id, "timestamp")')
+                cursor.execute(
+                    "SELECT create_hypertable(%s, 'timestamp', "
+                    "chunk_time_interval => make_interval(days => %s), migrate_data => true)",
+                    [PING_TABLE, settings.PING_CHUNK_INTERVAL_DAYS],
+                )
+    except DatabaseError as exc:
+        logger.warning(f"Could not convert {PING_TABLE} to a hypertable: {exc}")
+        return False
+    logger.info(f"Converted {PING_TABLE} to a TimescaleDB hypertable")
+    return True
+
+
+def apply_ping_policies(connection):
+    """
+    (Re)apply compression and retention policies from settings:
+    PING_COMPRESS_AFTER_DAYS and PING_RETENTION_DAYS (0 disables either).
+    """
+    if not is_hypertable(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT compression_enabled FROM timescaledb_information.hypertables "
+            "WHERE hypertable_name = %s",
+            [PING_TABLE],
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f"ALTER TABLE {PING_TABLE} SET (timescaledb.compress, "
+                "timescaledb.compress_segmentby = 'host_id', "
+                "timescaledb.compress_orderby = 'timestamp DESC')"
+            )
+
+        cursor.execute("SELECT remove_compression_policy(%s, if_exists => true)", [PING_TABLE])
+        if settings.PING_COMPRESS_AFTER_DAYS:
+            cursor.execute(
+                "SELECT add_compression_policy(%s, make_interval(days => %s))",
+                [PING_TABLE, settings.PING_COMPRESS_AFTER_DAYS],
+            )
+
+        cursor.execute("SELECT remove_retention_policy(%s, if_exists => true)", [PING_TABLE])
+        if settings.PING_RETENTION_DAYS:
+            cursor.execute(
+                "SELECT add_retention_policy(%s, make_interval(days => %s))",
+                [PING_TABLE, settings.PING_RETENTION_DAYS],
+            )
+    retain = f"{settings.PING_RETENTION_DAYS} days" if settings.PING_RETENTION_DAYS else "forever"
+    logger.info(
+        f"Applied policies to {PING_TABLE}: compress after {settings.PING_COMPRESS_AFTER_DAYS} days, retain {retain}"
+    )
+    return True
@@ -0,0 +1,143 @@
+"""
+Uptime queries over the pre-aggregated HostUptimeRollup / NetworkUptimeRollup
+tables, which serve the uptime API instead of raw pings. How a record's state
+is held over time is decided when the rollups are built (network/rollups.py).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from .rollups import GRANULARITIES, METRIC_COUNTS
+
+
+# -----------------------------
+# ROLLUP QUERIES
+# -----------------------------
+
+def granularity_retention(granularity):
+    days = {
+        '1m': settings.ROLLUP_MINUTE_RETENTION_DAYS,
+        '1h': settings.ROLLUP_HOUR_RETENTION_DAYS,
+    }.get(granularity)
+    return timedelta(days=days) if days else None
+
+
+def choose_granularity(start, end, points):
+    """
+    Pick the coarsest rollup granularity that still gives at least one bucket
+    per point over [start, end), skipping granularities whose buckets have
+    already been pruned at `start`.
+    """
+    slot = (end - start) / points
+    now = timezone.now()
+    chosen = None
+    for granularity, width in GRANULARITIES.items():
+        retention = granularity_retention(granularity)
+        if retention and start < now - retention:
+            continue
+        if chosen is None or width <= slot:
+            chosen = granularity
+    return chosen or '1d'
+
+
+def align(start, end, width):
+    """
+    Widen [start, end) to multiples of `width` since the epoch, so repeated
+    queries over a sliding window hit the same slots (and the same ETag).
+    """
+    seconds = width.total_seconds()
+    start_epoch = start.timestamp() // seconds * seconds
+    end_epoch = -(-end.timestamp() // seconds) * seconds
+    return (
+        datetime.fromtimestamp(start_epoch, dt_timezone.utc),
+        datetime.fromtimestamp(end_epoch, dt_timezone.utc),
+    )
+
+
+def uptime_series(rollups, start, end, points, granularity):
+    """
+    Downsample rollup rows of one granularity over [start, end) into at most
+    `points` equal-width slots. Returns (points, summary). Uptime is the
+    alive share of the seconds the state was known. Each slot also
+    carries the mean RTT, peak RTT and mean jitter in milliseconds and the
+    mean loss in percent, or None where nothing was measured.
+    """
+    width = GRANULARITIES[granularity]
+    slot_count = max(1, min(points, int((end - start) / width)))
+    slot = (end - start) / slot_count
+    slots = [
+        {
+            "start": start + slot * i,
+            "alive": 0,
+            "total": 0,
+            "alive_seconds": 0.0,
+            "known_seconds": 0.0,
+            "longest_outage": 0,
+            "first_seen": None,
+            "last_seen": None,
+            "rtt_max": None,
+            **dict.fromkeys(METRIC_COUNTS, 0),
+        }
+        for i in range(slot_count)
+    ]
+    rows = (
+        rollups.filter(granularity=granularity, bucket__gte=start, bucket__lt=end)
+        .values_list('bucket', 'alive_count', 'total_count', 'alive_seconds', 'known_seconds', 'longest_outage',
+                     'first_seen', 'last_seen', 'rtt_max', *METRIC_COUNTS)
+    )
+    for row in rows:
+        bucket, alive, total, alive_seconds, known_seconds, longest_outage, first_seen, last_seen, rtt_max = row[:9]
+        metrics = row[9:]
+        entry = slots[min(int((bucket - start) / slot), slot_count - 1)]
+        entry["alive"] += alive
+        entry["total"] += total
+        entry["alive_seconds"] += alive_seconds
+        entry["known_seconds"] += known_seconds
+        entry["longest_outage"] = max(entry["longest_outage"], longest_outage)
+        if first_seen and (entry["first_seen"] is None or first_seen < entry["first_seen"]):
+            entry["first_seen"] = first_seen
+        if last_seen and (entry["last_seen"] is None or last_seen > entry["last_seen"]):
+            entry["last_seen"] = last_seen
+        if rtt_max is not None:
+            entry["rtt_max"] = max(entry["rtt_max"] or 0, rtt_max)
+        for field, value in zip(METRIC_COUNTS, metrics):
+            entry[field] += value
+
+    totals = {field: sum(entry[field] for entry in slots) for field in METRIC_COUNTS}
+    for entry in slots:
+        entry["uptime"] = _ratio(entry["alive_seconds"], entry["known_seconds"])
+        entry.update(_metric_means(entry))
+        entry["rtt_max"] = _millis(entry["rtt_max"])
+        for field in METRIC_COUNTS:
+            del entry[field]
+    alive = sum(entry["alive"] for entry in slots)
+    total = sum(entry["total"] for entry in slots)
+    alive_seconds = sum(entry["alive_seconds"] for entry in slots)
+    known_seconds = sum(entry["known_seconds"] for entry in slots)
+    peaks = [entry["rtt_max"] for entry in slots if entry["rtt_max"] is not None]
+    summary = {
+        "alive": alive,
+        "total": total,
+        "alive_seconds": alive_seconds,
+        "known_seconds": known_seconds,
+        "uptime": _ratio(alive_seconds, known_seconds),
+        "longest_outage": max(entry["longest_outage"] for entry in slots),
+        **_metric_means(totals),
+        "rtt_max": max(peaks, default=None),
+    }
+    return slots, summary
+
+
+def _millis(micros):
+    return None if micros is None else micros / 1000
+
+
+def _ratio(part, whole):
+    return part / whole if whole else None
+
+
+def _metric_means(sums):
+    return {
+        "rtt_avg": _millis(_ratio(sums["rtt_sum"], sums["rtt_count"])),
+        "jitter": _millis(_ratio(sums["jitter_sum"], sums["jitter_count"])),
+        "loss": _ratio(sums["loss_sum"], sums["loss_count"]),
+    }
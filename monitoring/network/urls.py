@@ -1,17 +1,29 @@
 from django.urls import path
 from .views import (
-    CreateNetworkView, ListNetworkView, NetworkDetailView,
-    CreateHostView, ListHostView, HostDetailView
+    CreateNetworkView, ListNetworkView, NetworkDetailView, NetworkStatusView, NetworkEventsTokenView,
+    CreateHostView, ListHostView, HostDetailView, BulkHostView,
+    HostUptimeView, NetworkUptimeView,
+    MetricsView,
 )
+from .streams import network_events
 
 urlpatterns = [
     # Network endpoints
     path('networks/', ListNetworkView.as_view(), name='list-networks'),
     path('networks/create/', CreateNetworkView.as_view(), name='create-network'),
     path('networks/<int:pk>/', NetworkDetailView.as_view(), name='network-detail'),
+    path('networks/<int:pk>/status/', NetworkStatusView.as_view(), name='network-status'),
+    path('networks/<int:pk>/events/', network_events, name='network-events'),
+    path('networks/<int:pk>/events/token/', NetworkEventsTokenView.as_view(), name='network-events-token'),
+    path('networks/<int:pk>/uptime/', NetworkUptimeView.as_view(), name='network-uptime'),
 
     # Host endpoints
     path('hosts/', ListHostView.as_view(), name='list-hosts'),
     path('hosts/create/', CreateHostView.as_view(), name='create-host'),
+    path('hosts/bulk/', BulkHostView.as_view(), name='bulk-hosts'),
     path('hosts/<int:pk>/', HostDetailView.as_view(), name='host-detail'),
+    path('hosts/<int:pk>/uptime/', HostUptimeView.as_view(), name='host-uptime'),
+
+    # Metrics endpoints
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -1,10 +1,48 @@
+from contextlib import contextmanager
 import requests
+from redis.exceptions import RedisError
 from django.conf import settings
+from django.core.cache import cache
+from monitoring import cloud
+import logging
 
-def get_cloud_token(user):
+logger = logging.getLogger(__name__)
+
+
+def _token_cache_key(user):
+    return f"cloud_token:{user.pk}"
+
+
+@contextmanager
+def _single_flight(key):
+    """
+    Hold a short Redis lock so only one worker logs in for a given user at a
+    time; the others wait and then pick the fresh token up from the cache.
+    If Redis is unavailable the caller simply proceeds without the lock.
     """
-    Given a user, call the cloud API login endpoint with the user's credentials
-    (using their stored cloud_api_password) to get a fresh token.
+    lock = None
+    try:
+        lock = cache.lock(f"{key}:lock", timeout=30, blocking_timeout=10)
+        if not lock.acquire():
+            lock = None
+    except (RedisError, AttributeError) as exc:
+        logger.warning(f"Could not lock {key}, logging in without it: {exc}")
+        lock = None
+    try:
+        yield
+    finally:
+        if lock is not None:
+            try:
+                lock.release()
+            except RedisError:
+                pass
+
+
+def _login(user):
+    """
+    Call the cloud API login endpoint with the user's credentials
+    (using their stored cloud_api_password).
+    Returns (token, error, ttl) where ttl is how long the token may be cached.
     """
     login_url = settings.CLOUD_API_LOGIN_URL
     payload = {
@@ -12,11 +50,62 @@ def get_cloud_token(user):
         "password": user.cloud_api_password,
     }
     try:
-        response = requests.post(login_url, json=payload, timeout=5)
+        response = cloud.post(login_url, json=payload)
     except requests.RequestException as exc:
-        return None, str(exc)
+        return None, str(exc), None
     if response.status_code == 200:
         data = response.json()
         token = data.get('token')
+        ttl = settings.CLOUD_TOKEN_TTL
+        if data.get('expires_in'):
+            ttl = min(ttl, int(data['expires_in']))
+        return token, None, max(ttl - settings.CLOUD_TOKEN_EXPIRY_MARGIN, 1)
+    return None, response.text, None
+
+
+def get_cloud_token(user):
+    """
+    Given a user, return a cloud API token for authenticated requests.
+    Tokens are cached in Redis per user until they expire; on a miss a single
+    worker logs in with the user's stored cloud_api_password.
+    Returns (token, error).
+    """
+    key = _token_cache_key(user)
+    token = cache.get(key)
+    if token:
         return token, None
-    return None, response.text
+    with _single_flight(key):
+        token = cache.get(key)
+        if token:
+            return token, None
+        token, error, ttl = _login(user)
+        if token:
+            cache.set(key, token, ttl)
+        return token, error
+
+
+def invalidate_cloud_token(user, token):
+    """
+    Drop a token the cloud rejected. Only removes it if it is still the cached
+    one, so concurrent 401s do not throw away a token another worker just fetched.
+    """
+    key = _token_cache_key(user)
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def cloud_request(user, method, url, token, **kwargs):
+    """
+    Send an authenticated request to the cloud API on behalf of `user`.
+    If the cloud rejects the token (401), it is invalidated, a new one is
+    fetched and the request is retried once.
+    """
+    headers = {**kwargs.pop('headers', {}), "Authorization": f"Bearer {token}"}
+    response = cloud.request(method, url, headers=headers, **kwargs)
+    if response.status_code == 401:
+        invalidate_cloud_token(user, token)
+        token, error = get_cloud_token(user)
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+            response = cloud.request(method, url, headers=headers, **kwargs)
+    return response
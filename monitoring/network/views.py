@@ -3,11 +3,29 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.settings import api_settings
+import hashlib
+from datetime import timedelta
 from django.conf import settings
-from .models import Network, Host
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .cloud_sync import as_payload, cloud_sync_stats, enqueue, host_delete_payload, is_async
+from .bulk import BulkValidationError, bulk_create_hosts, bulk_delete_hosts, bulk_update_hosts
+from .csv_format import CSVParser, CSVRenderer
+from .models import Network, Host, HostUptimeRollup, NetworkUptimeRollup, RollupCursor, SweepRun
+from .pagination import ListCursorPagination
+from .response_cache import cached_response, response_cache_stats
+from .rollups import GRANULARITIES
 from .serializers import NetworkSerializer, HostSerializer
-from .utils import get_cloud_token
+from .utils import get_cloud_token, cloud_request
+from .spool import spool_stats
+from .scheduler import schedule_stats
+from .status import status_report
+from .streams import issue_stream_token
+from .uptime import align, choose_granularity, uptime_series
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,26 +34,52 @@ logger = logging.getLogger(__name__)
 # NETWORK VIEWS
 # -----------------------------
 
+def paginated_list(request, view, queryset, serializer_class):
+    """
+    Serialize a list view, honouring ?fields= (sparse fieldsets) and loading
+    only the selected columns from the database. Pagination is opt-in: only
+    with ?cursor= or ?page_size= is one cursor page returned, wrapped in
+    {next, previous, results}; otherwise the plain list of all results.
+    """
+    try:
+        fields = serializer_class.parse_fields(request.query_params.get('fields'))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if fields is not None:
+        # The primary key is always needed for the cursor.
+        queryset = queryset.only('id', *fields)
+    if not {'cursor', 'page_size'} & set(request.query_params):
+        serializer = serializer_class(queryset, many=True, fields=fields)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+    paginator = ListCursorPagination()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = serializer_class(page, many=True, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
+
+
 class ListNetworkView(APIView):
     """
     Endpoint to list all networks for the authenticated user.
     For network admins, only networks where they are the admin are returned.
+    Results can be cursor paginated (?cursor=, ?page_size=) and support
+    sparse fieldsets (?fields=id,name).
     """
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @cached_response
     def get(self, request):
         user = request.user
         # For simplicity, assume that only network admins create networks.
         networks = Network.objects.filter(admin=user)
-        serializer = NetworkSerializer(networks, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_list(request, self, networks, NetworkSerializer)
 
 
 class NetworkDetailView(APIView):
     """
     Retrieve, update, or delete a network.
-    Update and delete actions first call the corresponding cloud API endpoint.
+    Update and delete actions first call the corresponding cloud API endpoint,
+    or with CLOUD_SYNC_MODE = "async" commit locally and queue the cloud call.
     """
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
@@ -47,6 +91,7 @@ class NetworkDetailView(APIView):
         except Network.DoesNotExist:
             return None
 
+    @cached_response
     def get(self, request, pk):
         network = self.get_object(pk, request.user)
         if not network:
@@ -60,6 +105,15 @@ class NetworkDetailView(APIView):
         if not network:
             return Response({"error": "Network not found."}, status=status.HTTP_404_NOT_FOUND)
 
+        if is_async():
+            serializer = NetworkSerializer(network, data=request.data, partial=True)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                serializer.save()
+                enqueue(user, network, 'update', as_payload(request.data))
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
         # Obtain a fresh cloud token
         token, error = get_cloud_token(user)
         if not token:
@@ -68,12 +122,11 @@ class NetworkDetailView(APIView):
 
         payload = request.data.copy()
 
-        headers = {"Authorization": f"Bearer {token}"}
         # Construct the cloud endpoint URL (assumes RESTful URL with network id)
         cloud_network_url = f"{settings.CLOUD_NETWORK_CREATE_URL}{network.cloud_pk}/"
 
         try:
-            cloud_response = requests.put(cloud_network_url, json=payload, headers=headers, timeout=5)
+            cloud_response = cloud_request(user, 'put', cloud_network_url, token, json=payload)
         except requests.RequestException as exc:
             logger.error(f"Failed to update network on cloud: {exc}")
             return Response({"error": "Failed to update network on cloud", "details": str(exc)},
@@ -94,14 +147,18 @@ class NetworkDetailView(APIView):
         network = self.get_object(pk, user)
         if not network:
             return Response({"error": "Network not found."}, status=status.HTTP_404_NOT_FOUND)
+        if is_async():
+            with transaction.atomic():
+                enqueue(user, network, 'delete')
+                network.delete()
+            return Response({"message": "Network deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
         token, error = get_cloud_token(user)
         if not token:
             return Response({"error": "Failed to obtain cloud token", "details": error},
                             status=status.HTTP_400_BAD_REQUEST)
-        headers = {"Authorization": f"Bearer {token}"}
         cloud_network_url = f"{settings.CLOUD_NETWORK_CREATE_URL}{network.cloud_pk}/"
         try:
-            cloud_response = requests.delete(cloud_network_url, headers=headers, timeout=5)
+            cloud_response = cloud_request(user, 'delete', cloud_network_url, token)
         except requests.RequestException as exc:
             logger.error(f"Failed to delete network on cloud: {exc}")
             return Response({"error": "Failed to delete network on cloud", "details": str(exc)},
@@ -124,6 +181,17 @@ class CreateNetworkView(APIView):
 
     def post(self, request):
         user = request.user
+        if is_async():
+            local_data = request.data.copy()
+            local_data['admin'] = user.id
+            serializer = NetworkSerializer(data=local_data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                network = serializer.save()
+                enqueue(user, network, 'create', as_payload(request.data))
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
         # Obtain a fresh token from the cloud API.
         token, error = get_cloud_token(user)
         if not token:
@@ -135,10 +203,9 @@ class CreateNetworkView(APIView):
         # Prepare payload from request data.
         payload = request.data.copy()
 
-        headers = {"Authorization": f"Bearer {token}"}
         cloud_network_url = settings.CLOUD_NETWORK_CREATE_URL
         try:
-            cloud_response = requests.post(cloud_network_url, json=payload, headers=headers, timeout=5)
+            cloud_response = cloud_request(user, 'post', cloud_network_url, token, json=payload)
         except requests.RequestException as exc:
             logger.error(f"Failed to create network on cloud: {exc}")
             return Response(
@@ -164,6 +231,47 @@ class CreateNetworkView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class NetworkStatusView(APIView):
+    """
+    Current status of every host in a network, served from the live status
+    snapshot that each sweep publishes to Redis (rebuilt from the latest
+    pings when the cache is cold).
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self, pk, user):
+        try:
+            return Network.objects.get(pk=pk, admin=user)
+        except Network.DoesNotExist:
+            return None
+
+    def get(self, request, pk):
+        network = self.get_object(pk, request.user)
+        if not network:
+            return Response({"error": "Network not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status_report(network), status=status.HTTP_200_OK)
+
+
+class NetworkEventsTokenView(APIView):
+    """
+    Issue a short-lived token for a network's event stream, for clients
+    (browsers' EventSource) that can only authenticate with ?token=.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            network = Network.objects.get(pk=pk, admin=request.user)
+        except Network.DoesNotExist:
+            return Response({"error": "Network not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {"token": issue_stream_token(request.user, network), "expires_in": settings.STATUS_STREAM_TOKEN_TTL},
+            status=status.HTTP_201_CREATED,
+        )
+
+
 # -----------------------------
 # HOST VIEWS
 # -----------------------------
@@ -171,22 +279,43 @@ class CreateNetworkView(APIView):
 class ListHostView(APIView):
     """
     Endpoint to list all hosts for the authenticated user.
+    Filters: ?network=<id>, ?device_type=<type>[,<type>...], ?ip=<prefix>.
+    Results can be cursor paginated (?cursor=, ?page_size=) and support
+    sparse fieldsets (?fields=id,name,ip_address).
     """
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @cached_response
     def get(self, request):
         user = request.user
-        # Assuming hosts are linked to the user; you could also filter by network if needed.
         hosts = Host.objects.filter(user=user)
-        serializer = HostSerializer(hosts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        params = request.query_params
+
+        if params.get('network'):
+            try:
+                hosts = hosts.filter(network_id=int(params['network']))
+            except ValueError:
+                return Response({"error": "'network' must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if params.get('device_type'):
+            device_types = params['device_type'].split(',')
+            valid = {choice for choice, _ in Host.DEVICE_TYPE_CHOICES}
+            if not set(device_types) <= valid:
+                return Response(
+                    {"error": f"'device_type' must be one of {', '.join(sorted(valid))}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            hosts = hosts.filter(device_type__in=device_types)
+        if params.get('ip'):
+            hosts = hosts.filter(ip_address__startswith=params['ip'])
+        return paginated_list(request, self, hosts, HostSerializer)
 
 
 class HostDetailView(APIView):
     """
     Retrieve, update, or delete a host.
-    Update and delete actions first call the corresponding cloud API endpoint.
+    Update and delete actions first call the corresponding cloud API endpoint,
+    or with CLOUD_SYNC_MODE = "async" commit locally and queue the cloud call.
     """
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
@@ -198,6 +327,7 @@ class HostDetailView(APIView):
         except Host.DoesNotExist:
             return None
 
+    @cached_response
     def get(self, request, pk):
         host = self.get_object(pk, request.user)
         if not host:
@@ -212,6 +342,14 @@ class HostDetailView(APIView):
         host = self.get_object(pk, user)
         if not host:
             return Response({"error": "Host not found."}, status=status.HTTP_404_NOT_FOUND)
+        if is_async():
+            serializer = HostSerializer(host, data=request.data, partial=True)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                serializer.save(user=user)
+                enqueue(user, host, 'update', as_payload(request.data))
+            return Response(serializer.data, status=status.HTTP_200_OK)
         token, error = get_cloud_token(user)
         if not token:
             return Response({"error": "Failed to obtain cloud token", "details": error},
@@ -220,12 +358,11 @@ class HostDetailView(APIView):
         payload = request.data.copy()
         payload['network'] = host.network.cloud_pk
         logger.info(f"payloadfor cloud: {payload}")
-        headers = {"Authorization": f"Bearer {token}"}
         cloud_host_url = f"{settings.CLOUD_HOST_UPDATE_URL}{host_id}/"
         
         logger.info(f"cloud_host_url: {cloud_host_url}")
         try:
-            cloud_response = requests.put(cloud_host_url, json=payload, headers=headers, timeout=5)
+            cloud_response = cloud_request(user, 'put', cloud_host_url, token, json=payload)
         except requests.RequestException as exc:
             logger.error(f"Failed to update host on cloud: {exc}")
             return Response({"error": "Failed to update host on cloud", "details": str(exc)},
@@ -247,11 +384,15 @@ class HostDetailView(APIView):
         host = self.get_object(pk, user)
         if not host:
             return Response({"error": "Host not found."}, status=status.HTTP_404_NOT_FOUND)
+        if is_async():
+            with transaction.atomic():
+                enqueue(user, host, 'delete', host_delete_payload(host))
+                host.delete()
+            return Response({"message": "Host deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
         token, error = get_cloud_token(user)
         if not token:
             return Response({"error": "Failed to obtain cloud token", "details": error},
                             status=status.HTTP_400_BAD_REQUEST)
-        headers = {"Authorization": f"Bearer {token}"}
         cloud_host_url = f"{settings.CLOUD_HOST_DELETE_URL}"
         payload = {
             "ip_address": host.ip_address,
@@ -259,7 +400,7 @@ class HostDetailView(APIView):
             "network": host.network,
         }
         try:
-            cloud_response = requests.delete(cloud_host_url, data=payload, headers=headers, timeout=5)
+            cloud_response = cloud_request(user, 'delete', cloud_host_url, token, data=payload)
         except requests.RequestException as exc:
             logger.error(f"Failed to delete host on cloud: {exc}")
             return Response({"error": "Failed to delete host on cloud", "details": str(exc)},
@@ -282,6 +423,15 @@ class CreateHostView(APIView):
 
     def post(self, request):
         user = request.user
+        if is_async():
+            serializer = HostSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                host = serializer.save(user=user)
+                enqueue(user, host, 'create', as_payload(request.data))
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
         token, error = get_cloud_token(user)
         if not token:
             return Response(
@@ -292,10 +442,9 @@ class CreateHostView(APIView):
         payload = request.data.copy()
         payload['network'] = network.cloud_pk
 
-        headers = {"Authorization": f"Bearer {token}"}
         cloud_host_url = settings.CLOUD_HOST_CREATE_URL
         try:
-            cloud_response = requests.post(cloud_host_url, json=payload, headers=headers, timeout=5)
+            cloud_response = cloud_request(user, 'post', cloud_host_url, token, json=payload)
         except requests.RequestException as exc:
             logger.error(f"Failed to create host on cloud: {exc}")
             return Response(
@@ -321,3 +470,220 @@ class CreateHostView(APIView):
             host = serializer.save(user=user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BulkHostView(APIView):
+    """
+    Bulk host import and export, as JSON or CSV (Content-Type: text/csv).
+    GET exports the user's hosts (?format=csv for CSV, ?fields= to trim).
+    POST creates, PUT updates (each row has an "id") and DELETE deletes
+    (rows with an "id", or {"ids": [...]}) up to BULK_MAX_ROWS hosts. All
+    rows are validated first; cloud calls then run in parallel with one
+    token (or are queued, with CLOUD_SYNC_MODE = "async") and the local
+    writes happen in one transaction. Returns a result
+    per row, with 207 if some rows failed on the cloud.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, CSVParser]
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [CSVRenderer]
+
+    def get(self, request):
+        try:
+            fields = HostSerializer.parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        hosts = Host.objects.filter(user=request.user).order_by('id')
+        if fields is not None:
+            hosts = hosts.only('id', *fields)
+        serializer = HostSerializer(hosts, many=True, fields=fields)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        return self.run(request, bulk_create_hosts, status.HTTP_201_CREATED)
+
+    def put(self, request):
+        return self.run(request, bulk_update_hosts, status.HTTP_200_OK)
+
+    def delete(self, request):
+        return self.run(request, bulk_delete_hosts, status.HTTP_200_OK)
+
+    def run(self, request, action, success_status):
+        rows = request.data
+        if isinstance(rows, dict):
+            if 'ids' in rows:
+                rows = [{"id": pk} for pk in rows['ids']] if isinstance(rows['ids'], list) else None
+            else:
+                rows = rows.get('hosts')
+        token = None
+        if not is_async():
+            token, error = get_cloud_token(request.user)
+            if not token:
+                return Response({"error": "Failed to obtain cloud token", "details": error},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results = action(request.user, token, rows)
+        except BulkValidationError as e:
+            return Response({"error": "Validation failed.", "details": e.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        failed = sum(1 for result in results if result["status"] == "error")
+        return Response(
+            {"succeeded": len(results) - failed, "failed": failed, "results": results},
+            status=success_status if not failed else status.HTTP_207_MULTI_STATUS,
+        )
+
+
+# -----------------------------
+# UPTIME VIEWS
+# -----------------------------
+
+class UptimeView(APIView):
+    """
+    Base view for uptime history served from the rollup tables.
+
+    Query parameters:
+      - from / to: ISO 8601 datetimes (default: the last 24 hours).
+      - bucket: force the rollup granularity (1m, 1h or 1d); by default the
+        coarsest one that still fills the requested points is used.
+      - points: number of points returned (default UPTIME_DEFAULT_POINTS,
+        at most UPTIME_MAX_POINTS), whatever the range.
+
+    The range is aligned to the point width, and the response carries an ETag
+    that only changes when the rollups advance, so polling clients can send
+    If-None-Match and get a 304.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    kind = None
+
+    def get_object(self, pk, user):
+        raise NotImplementedError
+
+    def get_rollups(self, obj):
+        raise NotImplementedError
+
+    def parse_range(self, params):
+        now = timezone.now()
+        end = parse_datetime(params['to']) if params.get('to') else now
+        if end is None:
+            raise ValueError("Invalid 'to' datetime.")
+        start = parse_datetime(params['from']) if params.get('from') else end - timedelta(days=1)
+        if start is None:
+            raise ValueError("Invalid 'from' datetime.")
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start)
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end)
+        if start >= end:
+            raise ValueError("'from' must be before 'to'.")
+
+        try:
+            points = int(params.get('points', settings.UPTIME_DEFAULT_POINTS))
+        except ValueError:
+            raise ValueError("'points' must be an integer.")
+        if not 1 <= points <= settings.UPTIME_MAX_POINTS:
+            raise ValueError(f"'points' must be between 1 and {settings.UPTIME_MAX_POINTS}.")
+
+        granularity = params.get('bucket') or choose_granularity(start, end, points)
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"'bucket' must be one of {', '.join(GRANULARITIES)}.")
+
+        # Points are whole buckets wide, and the range a whole number of points.
+        width = GRANULARITIES[granularity]
+        buckets = max(1, -(-(end - start) // width))
+        points = min(points, buckets)
+        slot = width * -(-buckets // points)
+        aligned_start, end = align(start, end, slot)
+        # Alignment can add a partial slot at the start; drop it if over budget.
+        if (end - aligned_start) / slot > points:
+            aligned_start += slot
+        return aligned_start, end, granularity, int((end - aligned_start) / slot)
+
+    def get(self, request, pk):
+        obj = self.get_object(pk, request.user)
+        if not obj:
+            return Response({"error": f"{self.kind.capitalize()} not found."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            start, end, granularity, points = self.parse_range(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rolled_up_to = RollupCursor.objects.filter(pk=1).values_list('last_ping_id', flat=True).first() or 0
+        etag_source = f"{self.kind}:{obj.pk}:{start.isoformat()}:{end.isoformat()}:{granularity}:{points}:{rolled_up_to}"
+        etag = f'"{hashlib.sha1(etag_source.encode()).hexdigest()}"'
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        series, summary = uptime_series(self.get_rollups(obj), start, end, points, granularity)
+        data = {
+            self.kind: obj.pk,
+            "from": start,
+            "to": end,
+            "bucket": granularity,
+            "summary": summary,
+            "points": series,
+        }
+        return Response(data, status=status.HTTP_200_OK, headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+
+
+class HostUptimeView(UptimeView):
+    """
+    Uptime history of a host owned by the authenticated user.
+    """
+    kind = "host"
+
+    def get_object(self, pk, user):
+        try:
+            return Host.objects.get(pk=pk, user=user)
+        except Host.DoesNotExist:
+            return None
+
+    def get_rollups(self, host):
+        return HostUptimeRollup.objects.filter(host=host)
+
+
+class NetworkUptimeView(UptimeView):
+    """
+    Uptime history of a network administered by the authenticated user.
+    """
+    kind = "network"
+
+    def get_object(self, pk, user):
+        try:
+            return Network.objects.get(pk=pk, admin=user)
+        except Network.DoesNotExist:
+            return None
+
+    def get_rollups(self, network):
+        return NetworkUptimeRollup.objects.filter(network=network)
+
+
+# -----------------------------
+# METRICS VIEWS
+# -----------------------------
+
+class MetricsView(APIView):
+    """
+    Operational metrics for staff users: size and age of the upload spool
+    and of the cloud sync outbox, the last completed sweep and the number of
+    abandoned ones, response cache
+    hits and misses and, with adaptive scheduling, the probe schedule.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        last_sweep = (
+            SweepRun.objects.filter(finished_at__isnull=False).order_by('-started_at')
+            .values('started_at', 'finished_at', 'shards', 'shards_skipped', 'hosts', 'alive').first()
+        )
+        data = {
+            "spool": spool_stats(),
+            "cloud_sync": cloud_sync_stats(),
+            "last_sweep": last_sweep,
+            "abandoned_sweeps": SweepRun.objects.filter(abandoned=True).count(),
+            "response_cache": response_cache_stats(),
+        }
+        if settings.PING_SCHEDULER == "adaptive":
+            data["schedule"] = schedule_stats()
+        return Response(data, status=status.HTTP_200_OK)
@@ -10,5 +10,6 @@ python manage.py migrate
 # Create superuser from env vars (safe to run multiple times)
 python manage.py create_superuser_from_env
 
-# Start Django server
-python manage.py runserver 0.0.0.0:8000 
\ No newline at end of file
+# Serve the ASGI application (the event streams need it). Extra arguments,
+# e.g. the compose file's command, are passed on to uvicorn.
+exec uvicorn monitoring.asgi:application --host 0.0.0.0 --port 8000 "$@" 
\ No newline at end of file